@@ -0,0 +1,218 @@
+"""
+batch.py contains the batch solver, which solves the loading problem of many independent models that share a mesh in
+one pass.
+
+The models differ only in their material parameters, thickness, and applied load. The elements of all models are
+stacked into one vectorized element block, with the nodes of each model numbered after the nodes of the models before
+it, so the quadrature points of every model are evaluated in one array pass. The stiffness matrices of the models are
+assembled into a stack of small dense matrices, and the Newton iterations of all models are solved with one batched
+dense solve. Models whose load step has converged are frozen: their elements are not evaluated and their
+displacements are not updated until the next load step.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import numpy
+
+import constants
+import vectorized
+
+
+class BatchSolver:
+    """Loading solver for a batch of independent copies of a prepared model with different material parameters,
+    thicknesses, or applied loads. Each parameter is either None, to use the value of the prepared model for every
+    model, or an array with one value for each model of the batch.
+
+    :param prepared_model: model.PreparedModel whose mesh, degrees of freedom, and quadrature points are shared by the
+    models of the batch. Its load step quantity and load type are used for every model
+    :param numpy.ndarray first_lame_parameters: first Lame parameter of the material of each model
+    :param numpy.ndarray shear_moduli: shear modulus of the material of each model
+    :param numpy.ndarray thicknesses: membrane thickness of each model
+    :param numpy.ndarray applied_loads: applied load vector of each model, shaped (model, 3)
+    :ivar int batch_size: number of models in the batch
+    :ivar numpy.ndarray node_positions: current positions of the nodes of each model, shaped (model, node, 3)
+    :ivar numpy.ndarray failed: whether the Newton iterations of each model failed to converge in a load step, or met
+    an element whose plane stress solve did not converge or whose Jacobian is not positive, or a singular stiffness
+    matrix. A failed model is frozen without stopping the other models
+    :ivar numpy.ndarray load_steps: load magnitude of each converged load step of each model, shaped (model, step)
+    :ivar numpy.ndarray maximum_deflections: maximum transverse deflection of each load step of each model
+    :ivar numpy.ndarray newton_iterations: Newton iterations of each load step of each model
+    """
+
+    def __init__(self, prepared_model, first_lame_parameters=None, shear_moduli=None, thicknesses=None,
+                 applied_loads=None):
+        self.model = prepared_model
+        block = vectorized.ElementBlock.from_model(prepared_model)
+        batch_sizes = [len(values) for values in (first_lame_parameters, shear_moduli, thicknesses, applied_loads)
+                       if values is not None]
+        self.batch_size = max(batch_sizes, default=1)
+
+        def element_parameters(values, model_values):
+            """Return the parameter of each element of each model, shaped (model, element)."""
+            if values is None:
+                return numpy.broadcast_to(model_values, (self.batch_size, block.element_quantity))
+            return numpy.broadcast_to(numpy.asarray(values, dtype=float)[:, None],
+                                      (self.batch_size, block.element_quantity))
+
+        first_lame_parameters = element_parameters(first_lame_parameters, block.first_lame_parameters)
+        shear_moduli = element_parameters(shear_moduli, block.shear_moduli)
+        thicknesses = element_parameters(thicknesses, block.thicknesses)
+        if applied_loads is None:
+            applied_loads = prepared_model.applied_load
+        self.applied_loads = numpy.broadcast_to(numpy.asarray(applied_loads, dtype=float), (self.batch_size, 3))
+        self.node_quantity = prepared_model.node_quantity
+        self.element_quantity = block.element_quantity
+        self.global_dof_quantity = prepared_model.global_dof_quantity
+        self.unknown_dof_indices = prepared_model.unknown_dof_indices
+        node_reference_positions = numpy.zeros((self.node_quantity, 3))
+        for node in prepared_model.nodes:
+            node_reference_positions[node.global_id] = node.reference_position
+        # Stack the elements of every model, with the nodes of each model after the nodes of the models before it
+        node_offsets = self.node_quantity * numpy.arange(self.batch_size)
+        self.block = vectorized.ElementBlock(
+            element_type=block.element_type,
+            constitutive_model=block.constitutive_model,
+            quadrature_class=block.quadrature_class,
+            connectivity=(block.connectivity[None, :, :] + node_offsets[:, None, None]).reshape(
+                -1, block.connectivity.shape[1]),
+            node_reference_positions=numpy.tile(node_reference_positions, (self.batch_size, 1)),
+            first_lame_parameters=first_lame_parameters.ravel(),
+            shear_moduli=shear_moduli.ravel(),
+            thicknesses=thicknesses.ravel())
+        # Global degree of freedom and stiffness matrix entry of each element entry, the same for every model
+        self.element_dof_indices = block.element_dof_indices().reshape(self.element_quantity, -1)
+        self.element_matrix_indices = (self.element_dof_indices[:, :, None] * self.global_dof_quantity
+                                       + self.element_dof_indices[:, None, :])
+        self.node_positions = None
+        self.failed = numpy.zeros(self.batch_size, dtype=bool)
+        self.load_steps = None
+        self.maximum_deflections = None
+        self.newton_iterations = None
+
+    def assemble_force_arrays(self, element_force_arrays, model_indices):
+        """Return the unrolled global force arrays of a set of models from the force arrays of their elements.
+
+        :param numpy.ndarray element_force_arrays: force array of each element of the models, in model order
+        :param numpy.ndarray model_indices: indices of the models
+        """
+        model_quantity = len(model_indices)
+        slots = numpy.arange(model_quantity)[:, None, None] * self.global_dof_quantity
+        return numpy.bincount((slots + self.element_dof_indices[None]).ravel(),
+                              weights=element_force_arrays.ravel(),
+                              minlength=model_quantity * self.global_dof_quantity).reshape(model_quantity, -1)
+
+    def external_force_arrays(self, current_loads):
+        """Return the unrolled global external force array of each model for its current load, shaped
+        (model, global degree of freedom).
+
+        :param numpy.ndarray current_loads: current load vector of each model, shaped (model, 3)
+        """
+        element_loads = numpy.repeat(current_loads, self.element_quantity, axis=0)
+        element_force_arrays = self.block.external_force_arrays(
+            self.node_positions.reshape(-1, 3), element_loads, self.model.balloon_internal_pressure)
+        return self.assemble_force_arrays(element_force_arrays, numpy.arange(self.batch_size))
+
+    def solve(self):
+        """Solve the loading problem of every model of the batch with Newton's method, incrementing the loads in the
+        load steps of the prepared model."""
+        step_quantity = self.model.step_quantity
+        # Every model starts from the perturbed reference configuration of the prepared model
+        self.model.reset()
+        self.model.apply_initial_perturbation(update=False)
+        self.node_positions = numpy.tile(self.model.current_node_positions(), (self.batch_size, 1, 1))
+        self.model.reset()
+        self.block.stretch_ratios[...] = 1.
+        self.failed[...] = False
+        self.load_steps = numpy.full((self.batch_size, step_quantity), numpy.nan)
+        self.maximum_deflections = numpy.full((self.batch_size, step_quantity), numpy.nan)
+        self.newton_iterations = numpy.zeros((self.batch_size, step_quantity), dtype=int)
+        for load_step_index in range(step_quantity):
+            current_loads = self.applied_loads * (load_step_index + 1) / step_quantity
+            # The load is computed in the configuration at the start of the load step
+            external_force_arrays = self.external_force_arrays(current_loads)
+            active = ~self.failed
+            while active.any():
+                model_indices = numpy.flatnonzero(active)
+                internal_force_arrays, stiffness_matrices, failed = self.update(model_indices)
+                residuals = (external_force_arrays[model_indices][:, self.unknown_dof_indices]
+                             - internal_force_arrays[:, self.unknown_dof_indices])
+                # Count every evaluation of the residual as an iteration, including the converged one, as the
+                # Newton corrector of the model does
+                self.newton_iterations[model_indices, load_step_index] += 1
+                # Freeze the models that have converged, and fail the models out of iterations or with failed elements
+                converged = ~failed & (abs(residuals).max(axis=1, initial=0) <= constants.NEWTON_METHOD_TOLERANCE)
+                out_of_iterations = (self.newton_iterations[model_indices, load_step_index]
+                                     > constants.NEWTON_METHOD_MAXIMUM_ITERATIONS)
+                failed |= ~converged & out_of_iterations
+                self.failed[model_indices[failed]] = True
+                continuing = ~converged & ~failed
+                active[model_indices[~continuing]] = False
+                if not continuing.any():
+                    break
+                # Solve the stiffness matrix systems of the continuing models together
+                upper_stiffness_matrices = stiffness_matrices[continuing][
+                    :, self.unknown_dof_indices[:, None], self.unknown_dof_indices[None, :]]
+                continuing_indices = model_indices[continuing]
+                try:
+                    unknown_displacements = numpy.linalg.solve(upper_stiffness_matrices,
+                                                               residuals[continuing][:, :, None])[:, :, 0]
+                except numpy.linalg.LinAlgError:
+                    # Solve the models one at a time, and fail the models whose stiffness matrix is singular
+                    unknown_displacements, singular = self.solve_separately(upper_stiffness_matrices,
+                                                                            residuals[continuing])
+                    self.failed[continuing_indices[singular]] = True
+                    active[continuing_indices[singular]] = False
+                    unknown_displacements = unknown_displacements[~singular]
+                    continuing_indices = continuing_indices[~singular]
+                node_positions = self.node_positions.reshape(self.batch_size, -1)
+                node_positions[continuing_indices[:, None], self.unknown_dof_indices[None, :]] += (
+                    unknown_displacements)
+            # Save the maximum deflection and load size of the models that converged
+            converged_models = ~self.failed
+            self.load_steps[converged_models, load_step_index] = abs(current_loads[converged_models, 2])
+            self.maximum_deflections[converged_models, load_step_index] = abs(
+                self.node_positions[converged_models, :, 2]).max(axis=1)
+
+    @staticmethod
+    def solve_separately(stiffness_matrices, residuals):
+        """Solve the stiffness matrix system of each model on its own, and return the displacements of the models
+        and whether the stiffness matrix of each model is singular. The displacements of singular models are zero.
+
+        :param numpy.ndarray stiffness_matrices: stiffness matrix of each model, shaped (model, dof, dof)
+        :param numpy.ndarray residuals: residual of each model, shaped (model, dof)
+        """
+        displacements = numpy.zeros(residuals.shape)
+        singular = numpy.zeros(len(residuals), dtype=bool)
+        for model_index in range(len(residuals)):
+            try:
+                displacements[model_index] = numpy.linalg.solve(stiffness_matrices[model_index],
+                                                                residuals[model_index])
+            except numpy.linalg.LinAlgError:
+                singular[model_index] = True
+        return displacements, singular
+
+    def update(self, model_indices):
+        """Update the elements of a set of models for their current node positions in one pass, and return the
+        unrolled global internal force arrays and stiffness matrices of the models, and whether each model has an
+        element whose plane stress solve did not converge or whose Jacobian is not positive. The results of those
+        models are not meaningful.
+
+        :param numpy.ndarray model_indices: indices of the models
+        """
+        model_quantity = len(model_indices)
+        if model_quantity == self.batch_size:
+            block = self.block
+        else:
+            element_indices = (model_indices[:, None] * self.element_quantity
+                               + numpy.arange(self.element_quantity)[None, :]).ravel()
+            block = self.block.subset(element_indices)
+        block.update(self.node_positions.reshape(-1, 3), raise_errors=False)
+        if block is not self.block:
+            self.block.set_subset_state(element_indices, block)
+        internal_force_arrays = self.assemble_force_arrays(block.internal_force_arrays, model_indices)
+        slots = numpy.arange(model_quantity)[:, None, None, None] * self.global_dof_quantity ** 2
+        stiffness_matrices = numpy.bincount(
+            (slots + self.element_matrix_indices[None]).ravel(), weights=block.stiffness_matrices.ravel(),
+            minlength=model_quantity * self.global_dof_quantity ** 2).reshape(
+            model_quantity, self.global_dof_quantity, self.global_dof_quantity)
+        failed = block.failed_elements.reshape(model_quantity, self.element_quantity).any(axis=1)
+        return internal_force_arrays, stiffness_matrices, failed
@@ -0,0 +1,301 @@
+"""
+caches.py contains the persistent on-disk caches that let repeated analyses reuse the work of earlier runs.
+
+Every cache is a directory of entries. Each entry is a directory of .npy files, one for each array it holds, so the
+arrays of an entry can be read back memory mapped. The directory also holds an index of the entries, with the size,
+last use, and metadata of each, written atomically as JSON. When the entries of a cache grow larger than its maximum
+size, the least recently used entries are evicted.
+
+The mesh cache keys the preprocessed mesh of a model (see model.Model.preprocessing_tables) by a hash of the inputs
+that define the mesh, so later models on the same mesh load the nodes, connectivity, degree of freedom maps, reference
+geometry, and sparsity pattern memory mapped, instead of triangulating, creating the midpoint nodes, and renumbering
+again.
+
+The result cache keys the converged results of an analysis by a hash of every parameter of model.Model that changes
+them. An analysis that was run before is read from the cache without solving. An analysis on the same mesh with a
+different material, thickness, or applied load is warm started from the converged displacements of the cached
+analysis with the nearest parameters.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy
+
+import constants
+import exceptions
+import model
+
+
+def corner_prescribed_displacements(prescribed_displacements, corner_node_quantity):
+    """Return the prescribed displacements of the corner nodes of a mesh. A model adds the midpoint nodes of quadratic
+    elements to the dictionary of prescribed displacements it is given, so only the corner nodes identify the mesh.
+
+    :param dict prescribed_displacements: dictionary keying node ID to the prescribed displacements of the node
+    :param int corner_node_quantity: number of corner nodes, which have the IDs before the midpoint nodes
+    """
+    return {node_id: prescribed_displacements[node_id] for node_id in range(corner_node_quantity)}
+
+
+def parameter_hash(parameters):
+    """Return the hexadecimal SHA-256 hash of a dictionary of parameters. Arrays are hashed by their shape and values,
+    lists of numbers are hashed as arrays, classes by their qualified names, and other objects (such as material
+    instances) by their class and attributes.
+
+    :param dict parameters: parameters to hash
+    """
+    digest = hashlib.sha256()
+    update_hash(digest, parameters)
+    return digest.hexdigest()
+
+
+def update_hash(digest, value):
+    """Add a value to a hash in a form that does not depend on how equal values are represented.
+
+    :param digest: hashlib hash object
+    :param value: value to add
+    """
+    if isinstance(value, (list, tuple)):
+        try:
+            array = numpy.asarray(value)
+        except ValueError:
+            # Ragged lists are hashed item by item
+            array = None
+        if array is not None and array.dtype.kind in 'biuf':
+            value = array
+    if isinstance(value, numpy.ndarray):
+        if value.dtype.kind not in 'biuf':
+            # Arrays of other values (such as None) are hashed item by item
+            update_hash(digest, value.tolist())
+            return
+        value = numpy.ascontiguousarray(value, dtype=float)
+        digest.update(('array' + str(value.shape)).encode())
+        digest.update(value.tobytes())
+    elif isinstance(value, dict):
+        digest.update(('dict' + str(len(value))).encode())
+        for key in sorted(value, key=str):
+            update_hash(digest, str(key))
+            update_hash(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(('list' + str(len(value))).encode())
+        for item in value:
+            update_hash(digest, item)
+    elif isinstance(value, type):
+        digest.update(('class' + value.__module__ + '.' + value.__qualname__).encode())
+    elif isinstance(value, (bool, numpy.bool_, str)) or value is None:
+        digest.update(repr(value).encode())
+    elif isinstance(value, (int, float, numpy.number)):
+        digest.update(repr(float(value)).encode())
+    else:
+        digest.update(('object' + type(value).__qualname__).encode())
+        update_hash(digest, vars(value))
+
+
+class DiskCache:
+    """Size bounded cache of arrays in a directory, with least recently used eviction.
+
+    :param str directory: directory of the cache, which is created if it does not exist
+    :param int maximum_size: largest total size of the entries in bytes
+    """
+
+    def __init__(self, directory, maximum_size):
+        self.directory = directory
+        self.maximum_size = maximum_size
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, 'index.json')
+
+    def entry_path(self, key):
+        """Return the path of the directory of an entry.
+
+        :param str key: key of the entry
+        """
+        return os.path.join(self.directory, key)
+
+    def evict(self, index):
+        """Remove the least recently used entries until the entries fit in the maximum size.
+
+        :param dict index: index of the entries, which is updated
+        """
+        total_size = sum(entry['size'] for entry in index.values())
+        for key in sorted(index, key=lambda key: index[key]['last_used']):
+            if total_size <= self.maximum_size:
+                break
+            total_size -= index.pop(key)['size']
+            shutil.rmtree(self.entry_path(key), ignore_errors=True)
+
+    def read(self, key, mmap_mode=None):
+        """Return the arrays of an entry as a dictionary, or None if the cache does not have the entry. Reading an
+        entry marks it as the most recently used.
+
+        :param str key: key of the entry
+        :param str mmap_mode: memory map mode of the arrays (see numpy.load), or None to read them into memory
+        """
+        index = self.read_index()
+        path = self.entry_path(key)
+        if key not in index or not os.path.isdir(path):
+            return None
+        arrays = {file_name[:-len('.npy')]: numpy.load(os.path.join(path, file_name), mmap_mode=mmap_mode)
+                  for file_name in os.listdir(path)}
+        index[key]['last_used'] = time.time()
+        self.write_index(index)
+        return arrays
+
+    def read_index(self):
+        """Return the index of the entries, keying each entry to its size, last use time, and metadata."""
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as index_file:
+            return json.load(index_file)
+
+    def write(self, key, arrays, metadata=None):
+        """Add an entry to the cache, replacing any entry with the same key, and evict the least recently used entries
+        if the cache is full.
+
+        :param str key: key of the entry
+        :param dict arrays: arrays of the entry, keyed by name
+        :param dict metadata: JSON serializable data saved in the index with the entry
+        """
+        # Write the entry to a temporary directory, so readers never see a partial entry
+        temporary_path = tempfile.mkdtemp(dir=self.directory)
+        for name, array in arrays.items():
+            numpy.save(os.path.join(temporary_path, name + '.npy'), numpy.asarray(array))
+        size = sum(os.path.getsize(os.path.join(temporary_path, file_name))
+                   for file_name in os.listdir(temporary_path))
+        path = self.entry_path(key)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temporary_path, path)
+        index = self.read_index()
+        index[key] = {'size': size, 'last_used': time.time(), 'metadata': metadata}
+        self.evict(index)
+        self.write_index(index)
+
+    def write_index(self, index):
+        """Replace the index of the entries.
+
+        :param dict index: index of the entries
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.json')
+        with os.fdopen(file_descriptor, 'w') as index_file:
+            json.dump(index, index_file)
+        os.replace(temporary_path, self.index_path)
+
+
+class MeshCache(DiskCache):
+    """Cache of the preprocessed meshes of models, which is given to model.Model as its mesh_cache.
+
+    :param str directory: directory of the cache, which is created if it does not exist
+    :param int maximum_size: largest total size of the entries in bytes
+    """
+
+    def __init__(self, directory, maximum_size=constants.MESH_CACHE_MAXIMUM_SIZE):
+        super(MeshCache, self).__init__(directory, maximum_size)
+
+    @staticmethod
+    def key(model):
+        """Return the key of the preprocessed mesh of a model, which must be computed before the mesh is created.
+
+        :param model: model.Model whose mesh has not been created
+        """
+        mesh_parameters = {name: getattr(model, name) for name in constants.MESH_CACHE_PARAMETERS}
+        mesh_parameters['prescribed_displacements'] = corner_prescribed_displacements(model.prescribed_displacements,
+                                                                                      model.corner_node_quantity)
+        return parameter_hash(mesh_parameters)
+
+
+class ResultCache(DiskCache):
+    """Cache of the converged results of analyses, which returns the results of analyses that were run before and warm
+    starts new analyses from the nearest cached analysis on the same mesh.
+
+    :param str directory: directory of the cache, which is created if it does not exist
+    :param int maximum_size: largest total size of the entries in bytes
+    """
+
+    def __init__(self, directory, maximum_size=constants.RESULT_CACHE_MAXIMUM_SIZE):
+        super(ResultCache, self).__init__(directory, maximum_size)
+
+    @staticmethod
+    def keys(parameters):
+        """Return the key of the results of an analysis, and the key shared by the analyses on the same mesh that
+        differ only in their material, thickness, and applied load.
+
+        :param dict parameters: keyword arguments of model.Model
+        """
+        material = parameters['material']
+        result_parameters = {name: value for name, value in parameters.items()
+                             if name not in constants.RESULT_CACHE_IGNORED_PARAMETERS}
+        # Materials are identified by their properties, not their names
+        result_parameters['material'] = [material.first_lame_parameter, material.shear_modulus]
+        result_parameters['prescribed_displacements'] = corner_prescribed_displacements(
+            parameters['prescribed_displacements'], parameters['corner_node_quantity'])
+        neighbor_parameters = {name: value for name, value in result_parameters.items()
+                               if name not in constants.RESULT_CACHE_NEIGHBOR_PARAMETERS}
+        return parameter_hash(result_parameters), parameter_hash(neighbor_parameters)
+
+    def nearest(self, neighbor_key, load_case):
+        """Return the key of the cached analysis on the same mesh with the nearest material, thickness, and applied
+        load, or None if there is none. The distance between two analyses is the sum of the relative differences of
+        their parameters.
+
+        :param str neighbor_key: key shared by the analyses on the same mesh
+        :param list load_case: first Lame parameter, shear modulus, thickness, and applied load components
+        """
+        load_case = numpy.asarray(load_case, dtype=float)
+        nearest_key = None
+        nearest_distance = float('inf')
+        for key, entry in self.read_index().items():
+            if entry['metadata']['neighbor_key'] != neighbor_key:
+                continue
+            cached_load_case = numpy.asarray(entry['metadata']['load_case'], dtype=float)
+            scales = numpy.maximum(numpy.maximum(abs(load_case), abs(cached_load_case)), numpy.finfo(float).tiny)
+            distance = (abs(load_case - cached_load_case) / scales).sum()
+            if distance < nearest_distance:
+                nearest_key = key
+                nearest_distance = distance
+        return nearest_key
+
+    def solve(self, parameters):
+        """Return the results of an analysis, from the cache if it was run before, or by running it and adding its
+        results to the cache. A new analysis is warm started from the nearest cached analysis on the same mesh, and
+        run again from the reference configuration if the warm start fails.
+
+        The results are a dictionary of arrays: 'load_steps', 'maximum_deflections', 'newton_iterations',
+        'converged_displacements' (total unknown displacements of each load step), and 'node_positions' (final node
+        positions in the input numbering).
+
+        :param dict parameters: keyword arguments of model.Model
+        """
+        key, neighbor_key = self.keys(parameters)
+        results = self.read(key)
+        if results is not None:
+            return results
+        material = parameters['material']
+        load_case = ([material.first_lame_parameter, material.shear_modulus, parameters['membrane_thickness']]
+                     + numpy.asarray(parameters['applied_load'], dtype=float).tolist())
+        nearest_key = self.nearest(neighbor_key, load_case)
+        # The model adds its midpoint nodes to the prescribed displacements, so each model is given a copy
+        prescribed_displacements = parameters['prescribed_displacements']
+        analysis = None
+        if nearest_key is not None:
+            nearest_results = self.read(nearest_key)
+            try:
+                analysis = model.Model(**dict(parameters, prescribed_displacements=dict(prescribed_displacements),
+                                              warm_start_displacements=list(
+                                                  nearest_results['converged_displacements'])))
+            except exceptions.BaseException:
+                # The warm start may be too far from the solution
+                analysis = None
+        if analysis is None:
+            analysis = model.Model(**dict(parameters, prescribed_displacements=dict(prescribed_displacements),
+                                          warm_start_displacements=None))
+        results = {'load_steps': numpy.asarray(analysis.load_steps, dtype=float),
+                   'maximum_deflections': numpy.asarray(analysis.maximum_deflections, dtype=float),
+                   'newton_iterations': numpy.asarray(analysis.newton_iterations, dtype=int),
+                   'converged_displacements': numpy.asarray(analysis.converged_displacements, dtype=float),
+                   'node_positions': analysis.input_numbering(analysis.current_node_positions())}
+        self.write(key, results, {'neighbor_key': neighbor_key, 'load_case': load_case})
+        return results
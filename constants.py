@@ -11,5 +11,169 @@ FLOATING_POINT_TOLERANCE = 1e-12
 NUMERICAL_DIFFERENTIATION_TOLERANCE = 1e-4
 """The tolerated error for numerical differentiation verification tests."""
 
+IMPLEMENTATION_TOLERANCE = 1e-9
+"""The tolerated relative error between the element quantities or global quantities computed by two implementations of
+the same calculation, such as the element objects and the vectorized element block, in verification tests. The
+implementations add the same terms in different orders, and solve the plane stress condition to a tolerance."""
+
 NEWTON_METHOD_TOLERANCE = 1e-8
 """The tolerated error for convergence when solving using Newton's method."""
+
+NEWTON_METHOD_MAXIMUM_ITERATIONS = 30
+"""The maximum number of Newton iterations of a load step of a model in a batch before the model is marked as failed
+and frozen, so the other models of the batch can continue."""
+
+PLANE_STRESS_RELATIVE_TOLERANCE = 1e-13
+"""The tolerated transverse Kirchhoff stress when enforcing plane stress, as a fraction of the stiffness of the material
+(the first Lame parameter plus twice the shear modulus), since the round-off error of the stress grows with the
+stiffness. It is never tighter than NEWTON_METHOD_TOLERANCE."""
+
+SECANT_PREDICTOR = 'secant'
+"""Predictor that extrapolates the initial guess for a load step from the last two converged solutions."""
+
+TANGENT_PREDICTOR = 'tangent'
+"""Predictor that computes the initial guess for a load step from the last factorized stiffness matrix."""
+
+ARC_LENGTH_DESIRED_ITERATIONS = 4
+"""The number of corrector iterations per step that the adaptive arc length control aims for."""
+
+ARC_LENGTH_MAXIMUM_ITERATIONS = 15
+"""The maximum number of corrector iterations in an arc-length step before the step is restarted with half the arc
+length."""
+
+ARC_LENGTH_MAXIMUM_GROWTH = 2.
+"""The maximum factor by which the arc length may grow between consecutive steps."""
+
+ARC_LENGTH_MINIMUM_FRACTION = 1e-4
+"""The smallest arc length allowed, as a fraction of the initial arc length, before the arc-length solver gives up."""
+
+ARC_LENGTH_MAXIMUM_STEP_FACTOR = 10
+"""The maximum number of arc-length steps, as a multiple of the number of load steps."""
+
+ARC_LENGTH_RELATIVE_TOLERANCE = 1e-9
+"""The tolerated residual of the arc-length corrector as a fraction of the largest reference external force, so the
+tolerance follows the scale of the load. It is never tighter than NEWTON_METHOD_TOLERANCE."""
+
+ELEMENT_CHUNK_SIZE = 256
+"""The number of elements evaluated together by the vectorized element computations when the results of all elements
+are not needed at once."""
+
+DYNAMIC_RELAXATION_MASS_FACTOR = .5
+"""The fictitious mass of a node as a multiple of the Gershgorin bound of its stiffness. Explicit integration with a
+unit time step is stable for factors of at least 0.25."""
+
+DYNAMIC_RELAXATION_MAXIMUM_ITERATIONS = 100000
+"""The maximum number of pseudo-time steps for one load step of the dynamic relaxation solver."""
+
+ITERATIVE_REFINEMENT_TOLERANCE = 1e-15
+"""The normwise backward error at which the iterative refinement of a single precision factorization stops, which is
+about the accuracy of a double precision factorization."""
+
+ITERATIVE_REFINEMENT_STALL_RATIO = .5
+"""The fraction by which each refinement iteration must reduce the residual before the mixed precision solver falls back
+to a double precision factorization."""
+
+MATRIX_NORM_BLOCK_SIZE = 256
+"""The number of rows of a dense matrix whose absolute values are summed together when its infinity norm is computed, so
+the temporary array is a small block of rows instead of a copy of the matrix."""
+
+HILBERT_CURVE_ORDER = 16
+"""The order of the Hilbert curve used to order the elements, which fills a grid of 2^order cells per side."""
+
+MULTIGRID_COARSEST_SIZE = 3
+"""The smallest size parameter of a mesh generator used for the coarsest level of a multigrid hierarchy."""
+
+MULTIGRID_SMOOTHING_STEPS = 2
+"""The number of Gauss-Seidel sweeps before and after each coarse level correction of a multigrid V-cycle. One sweep
+leaves enough high frequency error that the conjugate gradient iterations grow quickly with the mesh size."""
+
+ITERATIVE_SOLVER_TOLERANCE = 1e-10
+"""The reduction of the residual norm, relative to the right hand side, at which an iterative linear solver stops."""
+
+ITERATIVE_SOLVER_MAXIMUM_ITERATIONS = 200
+"""The maximum number of iterations of an iterative linear solver before it falls back to a direct factorization."""
+
+REDUCTION_BLOCK_SIZE = 64
+"""The number of values summed together in each block of a reproducible blocked sum. The blocks are fixed by the
+position of the values, so the sum does not depend on how the values were computed in parallel."""
+
+LOAD_CASE_PARAMETERS = ('applied_load', 'step_quantity', 'balloon_internal_pressure', 'predictor',
+                        'warm_start_displacements', 'step_callback', 'checkpoint_path', 'checkpoint_interval',
+                        'restart_path', 'visualization_sink', 'solve_loading_problem', 'solve_displacement_problem',
+                        'solve_arc_length_problem', 'solve_dynamic_relaxation_problem',
+                        'solve_domain_decomposition_problem')
+"""The parameters of model.Model that a load case of a prepared model can set. The others define the mesh, material,
+and quadrature, which are prepared once."""
+
+JOB_SERVER_MODEL_CACHE_SIZE = 8
+"""The number of prepared models kept by each worker process of the job server, so jobs on a mesh that a worker has
+already prepared skip the preprocessing."""
+
+JOB_SERVER_PARAMETERS = ('mesh', 'material', 'constitutive_model', 'quadrature_class', 'element_type',
+                         'degrees_of_freedom', 'membrane_thickness', 'applied_load', 'step_quantity',
+                         'solve_loading_problem', 'solve_displacement_problem', 'solve_arc_length_problem',
+                         'solve_dynamic_relaxation_problem', 'balloon_internal_pressure', 'predictor', 'renumber_mesh',
+                         'warm_start_displacements')
+"""The parameters a model definition submitted to the job server can set. Parameters that name files on the server
+(such as checkpoint_path and restart_path) or that take objects are not accepted from clients."""
+
+JOB_SERVER_MESH_INPUTS = ('node_reference_positions_2d', 'node_reference_positions_3d', 'edges', 'corner_node_quantity',
+                          'prescribed_displacements', 'membrane_side_length', 'connectivity_table')
+"""The mesh inputs of model.Model a mesh given explicitly in a model definition submitted to the job server can set."""
+
+JOB_SERVER_MESH_GENERATORS = ('disc', 'sphere_octant', 'square_sheet')
+"""The functions of meshes.py a model definition submitted to the job server can create its mesh with."""
+
+JOB_SERVER_MESH_READERS = ('read_arrays', 'read_gmsh', 'read_tables')
+"""The functions of mesh_readers.py a model definition submitted to the job server can read its mesh with. Their
+parameters ending in 'path' are confined to the mesh directory of the server."""
+
+JOB_SERVER_CLASSES = {'material': ('AluminumAlloy', 'Brass', 'Copper', 'Glass', 'Lead', 'TitaniumAlloy'),
+                      'constitutive_model': ('Neohookean',),
+                      'element_type': ('TriangularLinearElement', 'TriangularQuadraticElement'),
+                      'quadrature_class': ('GaussQuadratureOnePoint', 'GaussQuadratureThreePoint')}
+"""The class names a model definition submitted to the job server can give for each class parameter."""
+
+JOB_SERVER_SHUTDOWN_TIMEOUT = 5.
+"""The number of seconds the job server waits for a worker process to stop when it shuts down before terminating it."""
+
+RESULT_CACHE_MAXIMUM_SIZE = 2 ** 30
+"""The default largest total size in bytes of the entries of a result cache, above which the least recently used
+entries are evicted."""
+
+RESULT_CACHE_IGNORED_PARAMETERS = ('linear_solver', 'element_engine', 'subdomain_quantity', 'warm_start_displacements',
+                                   'plot', 'step_callback', 'mesh_cache', 'checkpoint_path', 'checkpoint_interval',
+                                   'restart_path', 'visualization_sink')
+"""The parameters of model.Model that do not change the converged results of an analysis, so they are not part of the
+key of its cached results."""
+
+RESULT_CACHE_NEIGHBOR_PARAMETERS = ('material', 'membrane_thickness', 'applied_load')
+"""The parameters of model.Model in which analyses on the same mesh can differ and still be warm started from each
+other."""
+
+MESH_CACHE_MAXIMUM_SIZE = 2 ** 32
+"""The default largest total size in bytes of the entries of a mesh cache, above which the least recently used entries
+are evicted."""
+
+MESH_CACHE_PARAMETERS = ('node_reference_positions_2d', 'node_reference_positions_3d', 'edges', 'corner_node_quantity',
+                         'prescribed_displacements', 'element_type', 'quadrature_class', 'degrees_of_freedom',
+                         'renumber_mesh', 'connectivity_table')
+"""The parameters of model.Model that define its preprocessed mesh, which are the key of the mesh in a mesh cache. The
+quadrature class is included because the reference geometry is computed at the first quadrature point."""
+
+RESULTS_FIELDS = ('node_positions', 'displacements', 'strain_energies', 'kirchhoff_stresses', 'stretch_ratios')
+"""The fields written at every converged load step by a results writer by default."""
+
+FRAME_DECIMATION = 1
+"""The default number of configurations of the membrane per frame rendered by a frame sink."""
+
+FRAME_QUEUE_SIZE = 16
+"""The number of frames a frame sink queues for its render process before it drops new frames, so the solver never
+waits for the renderer."""
+
+GMSH_ELEMENT_NODE_QUANTITIES = {1: 2, 2: 3, 8: 3, 9: 6, 15: 1}
+"""Number of nodes of each Gmsh element type that is read: lines, triangles, quadratic lines, quadratic triangles, and
+points. Elements of other types are skipped."""
+
+GMSH_TRIANGLE_TYPES = (2, 9)
+"""Gmsh element types of the linear and quadratic triangles, which are the elements of the mesh."""
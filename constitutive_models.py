@@ -52,6 +52,19 @@ class Neohookean:
         return (strain_energy_density, first_piola_kirchhoff_stress, kirchhoff_stress, tangent_moduli,
                 tangent_moduli_effective_2d)
 
+    @classmethod
+    def first_piola_kirchhoff_stress_array(cls, first_lame_parameter, shear_modulus, deformation_gradients):
+        """Compute the 3D first Piola-Kirchhoff stress for a stack of deformation gradients at once.
+
+        :param numpy.ndarray first_lame_parameter: first Lame parameter, broadcastable to the stack shape
+        :param numpy.ndarray shear_modulus: shear modulus, broadcastable to the stack shape
+        :param numpy.ndarray deformation_gradients: array of 3x3 deformation gradients with shape (..., 3, 3)
+        """
+        log_jacobians = numpy.log(numpy.linalg.det(deformation_gradients))
+        return ((first_lame_parameter * log_jacobians - shear_modulus)[..., None, None]
+                * numpy.swapaxes(numpy.linalg.inv(deformation_gradients), -1, -2)
+                + numpy.asarray(shear_modulus)[..., None, None] * deformation_gradients)
+
     @classmethod
     def first_piola_kirchhoff_stress(cls, material, deformation_gradient, dimension=3, test=False):
         """Compute the first Piola-Kirchhoff stress for the material from the deformation gradient under
@@ -117,6 +130,38 @@ class Neohookean:
                       numpy.trace(numpy.dot(deformation_gradient.T, deformation_gradient)) - 3))
         return result
 
+    @classmethod
+    def strain_energy_density_array(cls, first_lame_parameter, shear_modulus, deformation_gradients):
+        """Compute the strain energy density for a stack of deformation gradients at once.
+
+        :param numpy.ndarray first_lame_parameter: first Lame parameter, broadcastable to the stack shape
+        :param numpy.ndarray shear_modulus: shear modulus, broadcastable to the stack shape
+        :param numpy.ndarray deformation_gradients: array of 3x3 deformation gradients with shape (..., 3, 3)
+        """
+        log_jacobians = numpy.log(numpy.linalg.det(deformation_gradients))
+        return (first_lame_parameter / 2 * log_jacobians ** 2
+                - shear_modulus * log_jacobians
+                + shear_modulus / 2 * (numpy.einsum('...ij,...ij->...', deformation_gradients,
+                                                    deformation_gradients) - 3))
+
+    @classmethod
+    def tangent_moduli_array(cls, first_lame_parameter, shear_modulus, deformation_gradients):
+        """Compute the full 3D tangent moduli for a stack of deformation gradients at once.
+
+        :param numpy.ndarray first_lame_parameter: first Lame parameter, broadcastable to the stack shape
+        :param numpy.ndarray shear_modulus: shear modulus, broadcastable to the stack shape
+        :param numpy.ndarray deformation_gradients: array of 3x3 deformation gradients with shape (..., 3, 3)
+        """
+        first_lame_parameter = numpy.asarray(first_lame_parameter)[..., None, None, None, None]
+        shear_modulus = numpy.asarray(shear_modulus)[..., None, None, None, None]
+        log_jacobians = numpy.log(numpy.linalg.det(deformation_gradients))[..., None, None, None, None]
+        F_inverse = numpy.linalg.inv(deformation_gradients)
+        identity = numpy.eye(3)
+        return (first_lame_parameter * numpy.einsum('...lk,...ji->...ijkl', F_inverse, F_inverse)
+                - (first_lame_parameter * log_jacobians - shear_modulus)
+                * numpy.einsum('...jk,...li->...ijkl', F_inverse, F_inverse)
+                + shear_modulus * numpy.einsum('ik,jl->ijkl', identity, identity))
+
     @classmethod
     def tangent_moduli(cls, material, deformation_gradient, dimension=3, test=False):
         """Compute the tangent moduli for the material from the deformation gradient under
@@ -0,0 +1,661 @@
+"""
+engine.py contains the element engines that update the elements of a model and assemble the global quantities from
+the vectorized element computations.
+
+The elements are split into chunks of constants.ELEMENT_CHUNK_SIZE elements, so the arrays of each chunk fit in cache,
+and the chunks are evaluated by a pool of threads. NumPy releases the GIL for the array operations, so the chunks are
+evaluated concurrently. By default the engines are reproducible: the chunk results are assembled in element order and
+the strain energy is a blocked sum (see reductions.py), so the global quantities are bitwise identical for any number
+of threads and chunk size. Otherwise, each thread assembles the force array of its chunk and the chunk results are
+added as the threads finish, which is faster but not reproducible.
+
+The colored engine also assembles the chunks concurrently. The elements are colored so that no two elements of a color
+share a node, so the threads can add the elements of one color to the global force array and to the data array of the
+sparse stiffness matrix without locks or private copies of the global arrays.
+
+The out-of-core engine keeps the per-element arrays in memory mapped files, for meshes whose element state and
+element stiffness matrices do not fit in memory: the connectivity, reference geometry, quadrature point state, element
+results, and sparse assembly map. The files are filled one chunk of elements at a time when the engine is prepared,
+and the model does not create the quadrature point objects of its elements. Each chunk is updated in place in the
+mapped files and its results are written to them, and the global force arrays and the sparse stiffness matrix are
+assembled from the files one chunk at a time, so only the chunks being evaluated, the global arrays, and the sparse
+stiffness matrix stay in memory. The sparse stiffness matrix is never made dense, and is solved iteratively.
+
+The process engine evaluates the elements in worker processes instead, for element computations that hold the GIL.
+The node positions, quadrature point state, and element results are kept in shared memory, so each worker updates
+its range of elements in place and only the commands are sent between the processes. The parent waits at a barrier
+until every worker has finished, then assembles the global quantities in element order.
+
+The cost of an element varies with its type, quadrature, and the plane stress iterations of its quadrature points, so
+equal numbers of elements can take very different times. The engines record the cost of the elements in each update
+and schedule the next update with it: the threaded engines queue the slowest chunks first, so the threads that take
+the next chunk from the queue finish together, and the process engine splits the elements into ranges of equal cost.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+from concurrent.futures import as_completed, ThreadPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import time
+
+import numpy
+import scipy.sparse
+
+import constants
+import reductions
+import renumbering
+import substructuring
+import vectorized
+
+
+def balanced_ranges(element_costs, range_quantity):
+    """Split the elements into contiguous ranges of equal total cost, and return the first and last (exclusive)
+    element of each range. The elements are split into ranges of equal size if no cost is known.
+
+    :param numpy.ndarray element_costs: cost of each element
+    :param int range_quantity: number of ranges
+    """
+    element_quantity = len(element_costs)
+    cumulative_costs = numpy.cumsum(element_costs)
+    if element_quantity == 0 or not cumulative_costs[-1] > 0:
+        boundaries = numpy.linspace(0, element_quantity, range_quantity + 1).astype(int)
+    else:
+        targets = cumulative_costs[-1] * numpy.arange(1, range_quantity) / range_quantity
+        # Each range ends before or after the element whose cost crosses the target, whichever is closer
+        crossing_elements = numpy.searchsorted(cumulative_costs, targets)
+        costs_before = numpy.where(crossing_elements > 0, cumulative_costs[crossing_elements - 1], 0.)
+        ends = numpy.where(targets - costs_before < cumulative_costs[crossing_elements] - targets, crossing_elements,
+                           crossing_elements + 1)
+        boundaries = numpy.concatenate(([0], ends, [element_quantity]))
+    return list(zip(boundaries[:-1].tolist(), boundaries[1:].tolist()))
+
+
+def element_worker(connection, barrier, block, shared_arrays, chunk_size):
+    """Update ranges of the elements of a block in shared memory for the commands sent by the parent process, until
+    it is told to stop. The worker waits at the barrier after each update.
+
+    :param connection: end of the pipe to the parent process
+    :param barrier: multiprocessing.Barrier shared by the parent and all workers
+    :param block: vectorized.ElementBlock of all elements of the model
+    :param dict shared_arrays: name, shape, and data type of the shared memory of each shared array
+    :param int chunk_size: number of elements updated together
+    """
+    memories = {}
+    arrays = {}
+    for array_name, (memory_name, shape, dtype) in shared_arrays.items():
+        memories[array_name], arrays[array_name] = shared_array(shape, dtype, memory_name)
+    # The quadrature point state of the block lives in shared memory
+    block.stretch_ratios = arrays['stretch_ratios']
+    block.plane_stress_iterations = arrays['plane_stress_iterations']
+    while True:
+        command, arguments = connection.recv()
+        if command == 'stop':
+            break
+        start, stop, stiffness = arguments
+        try:
+            for chunk_start in range(start, stop, chunk_size):
+                chunk_stop = min(chunk_start + chunk_size, stop)
+                chunk = block.chunk(chunk_start, chunk_stop)
+                start_time = time.perf_counter()
+                chunk.update(arrays['node_positions'], stiffness=stiffness)
+                # Share the time of the chunk between its elements by their plane stress iterations
+                weights = 1 + chunk.plane_stress_iterations.sum(axis=1)
+                arrays['element_costs'][chunk_start:chunk_stop] = (
+                    (time.perf_counter() - start_time) * weights / weights.sum())
+                arrays['strain_energies'][chunk_start:chunk_stop] = chunk.strain_energies
+                arrays['internal_force_arrays'][chunk_start:chunk_stop] = chunk.internal_force_arrays
+                if stiffness:
+                    arrays['stiffness_matrices'][chunk_start:chunk_stop] = chunk.stiffness_matrices
+        except Exception as error:
+            connection.send(('error', type(error), error.args, error.__dict__))
+        barrier.wait()
+    # Release the views of the shared memory before closing it
+    block.stretch_ratios = block.stretch_ratios.copy()
+    block.plane_stress_iterations = block.plane_stress_iterations.copy()
+    arrays.clear()
+    for memory in memories.values():
+        memory.close()
+    connection.close()
+
+
+def shared_array(shape, dtype=float, name=None):
+    """Create a block of shared memory for an array, or attach to an existing one, and return the shared memory and
+    an array that views it.
+
+    :param tuple shape: shape of the array
+    :param dtype: data type of the array
+    :param str name: name of the existing shared memory, or None to create it
+    """
+    size = max(int(numpy.prod(shape)) * numpy.dtype(dtype).itemsize, 1)
+    if name is None:
+        memory = shared_memory.SharedMemory(create=True, size=size)
+    else:
+        memory = shared_memory.SharedMemory(name=name)
+    return memory, numpy.ndarray(shape, dtype=dtype, buffer=memory.buf)
+
+
+class ThreadedEngine:
+    """Element engine that evaluates the chunks of a vectorized element block on a pool of threads.
+
+    :param int worker_quantity: number of threads, or None for the number of CPUs. One thread evaluates the chunks
+    serially in this thread
+    :param int chunk_size: number of elements in each chunk
+    :param bool reproducible: whether to add the element results in an order independent of the threads
+    :param bool compensated: whether to add the element strain energies with compensated summation
+    :ivar block: vectorized.ElementBlock of all elements of the model, which holds the quadrature point state
+    :ivar list chunks: chunks of the block, which share its state arrays
+    :ivar numpy.ndarray chunk_times: time of each chunk in the last update, which orders the chunks in the next
+    :cvar bool out_of_core: whether the element state is kept only in the files of the engine, so the model does not
+    create the quadrature points of its element objects and the stiffness matrix is sparse
+    """
+
+    out_of_core = False
+
+    def __init__(self, worker_quantity=None, chunk_size=constants.ELEMENT_CHUNK_SIZE, reproducible=True,
+                 compensated=False):
+        if worker_quantity is None:
+            worker_quantity = os.cpu_count()
+        self.worker_quantity = worker_quantity
+        self.chunk_size = chunk_size
+        self.reproducible = reproducible
+        self.compensated = compensated
+        self.block = None
+        self.chunks = []
+        self.chunk_times = None
+        self.element_dof_indices = None
+        self.global_dof_quantity = 0
+        self.executor = None
+
+    def close(self):
+        """Stop the threads."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def external_force_array(self, node_positions, current_load, balloon_internal_pressure):
+        """Return the unrolled global external force array for the current load.
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes, indexed by global ID
+        :param numpy.ndarray current_load: vector of current transverse load applied to the membrane (force/area)
+        :param bool balloon_internal_pressure: whether the load is an internal pressure normal to the balloon
+        """
+        return vectorized.assemble_force_array(
+            self.block.external_force_arrays(node_positions, current_load, balloon_internal_pressure),
+            self.element_dof_indices, self.global_dof_quantity)
+
+    def map(self, function, ordered=True):
+        """Call a function for every chunk, on the threads if there is more than one, and return the results in chunk
+        order, or in the order the threads finish. The chunks are queued from the slowest to the fastest in the last
+        call, and the time of each chunk is recorded.
+
+        :param function: function of a chunk
+        :param bool ordered: whether to return the results in chunk order
+        """
+        def timed_function(chunk_index):
+            start_time = time.perf_counter()
+            result = function(self.chunks[chunk_index])
+            self.chunk_times[chunk_index] = time.perf_counter() - start_time
+            return result
+
+        if self.executor is None:
+            return [timed_function(chunk_index) for chunk_index in range(len(self.chunks))]
+        chunk_order = numpy.argsort(-self.chunk_times, kind='stable')
+        futures = {chunk_index: self.executor.submit(timed_function, chunk_index) for chunk_index in chunk_order}
+        if ordered:
+            return [futures[chunk_index].result() for chunk_index in range(len(self.chunks))]
+        return [future.result() for future in as_completed(futures.values())]
+
+    def prepare(self, model):
+        """Create the element block and its chunks for the elements of a model.
+
+        :param model: model.Model whose quadrature points have been created
+        """
+        self.block = vectorized.ElementBlock.from_model(model)
+        self.chunks = [self.block.chunk(start, min(start + self.chunk_size, self.block.element_quantity))
+                       for start in range(0, self.block.element_quantity, self.chunk_size)]
+        self.chunk_times = numpy.zeros(len(self.chunks))
+        self.element_dof_indices = self.block.element_dof_indices()
+        self.global_dof_quantity = model.global_dof_quantity
+        self.close()
+        if self.worker_quantity > 1 and len(self.chunks) > 1:
+            self.executor = ThreadPoolExecutor(max_workers=self.worker_quantity)
+
+    def strain_energy(self):
+        """Return the global strain energy as the blocked sum of the element strain energies, in element order."""
+        return reductions.blocked_sum(numpy.concatenate([chunk.strain_energies for chunk in self.chunks]),
+                                      self.compensated)
+
+    def update(self, node_positions, stiffness=True):
+        """Update all elements for the current node positions, and return the global strain energy, unrolled
+        internal force array, and unrolled stiffness matrix (None if not computed).
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes, indexed by global ID
+        :param bool stiffness: whether to compute the stiffness matrix
+        """
+        if self.reproducible:
+            self.map(lambda chunk: chunk.update(node_positions, stiffness=stiffness))
+            strain_energy = self.strain_energy()
+            internal_force_array = vectorized.assemble_force_array(
+                numpy.concatenate([chunk.internal_force_arrays for chunk in self.chunks]), self.element_dof_indices,
+                self.global_dof_quantity)
+        else:
+            # Each thread also sums and assembles its chunk, and the chunk results are added as the threads finish
+            chunk_results = self.map(lambda chunk: self.update_chunk(chunk, node_positions, stiffness), ordered=False)
+            strain_energy = sum(chunk_strain_energy for chunk_strain_energy, _ in chunk_results)
+            internal_force_array = sum(chunk_force_array for _, chunk_force_array in chunk_results)
+        if not stiffness:
+            return strain_energy, internal_force_array, None
+        stiffness_matrix = vectorized.assemble_stiffness_matrix(
+            numpy.concatenate([chunk.stiffness_matrices for chunk in self.chunks]), self.element_dof_indices,
+            self.global_dof_quantity)
+        return strain_energy, internal_force_array, stiffness_matrix
+
+    def update_chunk(self, chunk, node_positions, stiffness):
+        """Update the elements of a chunk, and return the strain energy and unrolled internal force array of the
+        chunk.
+
+        :param chunk: vectorized.ElementBlock of the chunk
+        :param numpy.ndarray node_positions: current 3D positions of all nodes, indexed by global ID
+        :param bool stiffness: whether to compute the stiffness matrices
+        """
+        chunk.update(node_positions, stiffness=stiffness)
+        return chunk.strain_energies.sum(), vectorized.assemble_force_array(
+            chunk.internal_force_arrays, chunk.element_dof_indices(), self.global_dof_quantity)
+
+
+class ColoredEngine(ThreadedEngine):
+    """Element engine that also assembles the global quantities on the threads, one element color at a time. Each
+    entry of the global arrays receives the contributions of its elements in color order, so the assembly is
+    reproducible for any number of threads.
+
+    :param int worker_quantity: number of threads, or None for the number of CPUs
+    :param int chunk_size: number of elements in each chunk
+    :param bool compensated: whether to add the element strain energies, force arrays, and stiffness matrices with
+    compensated summation
+    :ivar list color_groups: for each color, the indices of its elements split into one group per thread
+    :ivar stiffness_matrix: global stiffness matrix as a scipy.sparse.csr_matrix, whose data array the threads assemble
+    into
+    """
+
+    def __init__(self, worker_quantity=None, chunk_size=constants.ELEMENT_CHUNK_SIZE, compensated=False):
+        super().__init__(worker_quantity, chunk_size, compensated=compensated)
+        self.color_groups = []
+        self.data_indices = None
+        self.stiffness_matrix = None
+
+    def assemble(self, element_indices, element_force_arrays, element_stiffness_matrices, internal_force_array,
+                 compensations):
+        """Add a group of elements of one color to the global internal force array and the sparse stiffness matrix.
+        The elements of the group share no node with the other elements of the color, so the additions do not race.
+
+        :param numpy.ndarray element_indices: indices of the elements of the group
+        :param numpy.ndarray element_force_arrays: internal force arrays of all elements
+        :param numpy.ndarray element_stiffness_matrices: stiffness matrices of all elements, or None
+        :param numpy.ndarray internal_force_array: global internal force array to add to
+        :param tuple compensations: rounding errors of the internal force array and the stiffness matrix data, or None
+        """
+        dof_indices = self.element_dof_indices[element_indices].ravel()
+        data_indices = self.data_indices[element_indices].ravel()
+        if compensations is None:
+            internal_force_array[dof_indices] += element_force_arrays[element_indices].ravel()
+            if element_stiffness_matrices is not None:
+                self.stiffness_matrix.data[data_indices] += element_stiffness_matrices[element_indices].ravel()
+            return
+        reductions.compensated_add(internal_force_array, compensations[0], dof_indices,
+                                   element_force_arrays[element_indices].ravel())
+        if element_stiffness_matrices is not None:
+            reductions.compensated_add(self.stiffness_matrix.data, compensations[1], data_indices,
+                                       element_stiffness_matrices[element_indices].ravel())
+
+    def prepare(self, model):
+        """Create the element block and its chunks for the elements of a model, color the elements, and create the
+        sparse stiffness matrix.
+
+        :param model: model.Model whose quadrature points have been created
+        """
+        super().prepare(model)
+        # Color the elements by their corner nodes, which every pair of elements with a shared node also shares. The
+        # colors and sparsity pattern of a preprocessed mesh are loaded with it
+        if model.mesh_tables is not None:
+            colors = numpy.asarray(model.mesh_tables['element_colors'])
+        else:
+            colors = renumbering.element_colors(model.connectivity_table)
+        group_quantity = self.worker_quantity if self.executor is not None else 1
+        self.color_groups = []
+        for color in range(colors.max() + 1):
+            element_indices = numpy.flatnonzero(colors == color)
+            self.color_groups.append([group for group in numpy.array_split(element_indices, group_quantity)
+                                      if group.size])
+        if model.mesh_tables is not None:
+            row_pointers = model.mesh_tables['row_pointers']
+            column_indices = model.mesh_tables['column_indices']
+            self.data_indices = model.mesh_tables['data_indices']
+        else:
+            row_pointers, column_indices, self.data_indices = vectorized.sparse_pattern(self.element_dof_indices,
+                                                                                        self.global_dof_quantity)
+        self.stiffness_matrix = scipy.sparse.csr_matrix(
+            (numpy.zeros(column_indices.size), column_indices, row_pointers),
+            shape=(self.global_dof_quantity, self.global_dof_quantity))
+
+    def update(self, node_positions, stiffness=True):
+        """Update all elements for the current node positions, and return the global strain energy, unrolled
+        internal force array, and unrolled dense stiffness matrix (None if not computed). The sparse stiffness matrix
+        is kept in the stiffness_matrix attribute.
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes, indexed by global ID
+        :param bool stiffness: whether to compute the stiffness matrix
+        """
+        self.map(lambda chunk: chunk.update(node_positions, stiffness=stiffness))
+        strain_energy = self.strain_energy()
+        element_force_arrays = numpy.concatenate([chunk.internal_force_arrays for chunk in self.chunks])
+        element_stiffness_matrices = None
+        if stiffness:
+            element_stiffness_matrices = numpy.concatenate([chunk.stiffness_matrices for chunk in self.chunks])
+            self.stiffness_matrix.data[:] = 0.
+        internal_force_array = numpy.zeros(self.global_dof_quantity)
+        compensations = None
+        if self.compensated:
+            compensations = (numpy.zeros_like(internal_force_array), numpy.zeros_like(self.stiffness_matrix.data))
+        # The colors are assembled one after another, and the groups of each color concurrently
+        for groups in self.color_groups:
+            if self.executor is None:
+                for group in groups:
+                    self.assemble(group, element_force_arrays, element_stiffness_matrices, internal_force_array,
+                                  compensations)
+            else:
+                list(self.executor.map(lambda group: self.assemble(
+                    group, element_force_arrays, element_stiffness_matrices, internal_force_array, compensations),
+                    groups))
+        if self.compensated:
+            internal_force_array += compensations[0]
+            self.stiffness_matrix.data += compensations[1]
+        if not stiffness:
+            return strain_energy, internal_force_array, None
+        return strain_energy, internal_force_array, self.stiffness_matrix.toarray()
+
+
+class OutOfCoreEngine(ThreadedEngine):
+    """Element engine that keeps the per-element arrays in memory mapped files in a directory, and streams them
+    through memory one chunk at a time. The global stiffness matrix is returned as a sparse matrix, which is solved
+    iteratively by default (see solvers.ConjugateGradientSolver), and the model does not create the quadrature point
+    objects of its elements, whose state is kept in the mapped files instead.
+
+    :param str directory: directory of the memory mapped files, which is created if it does not exist. The files are
+    replaced each time the engine is prepared
+    :param int worker_quantity: number of threads, or None for the number of CPUs
+    :param int chunk_size: number of elements in each chunk
+    :param bool compensated: whether to add the element strain energies with compensated summation
+    :ivar strain_energies: memory mapped strain energy of each element
+    :ivar internal_force_arrays: memory mapped internal force array of each element, shaped (element, dof, node)
+    :ivar stiffness_matrices: memory mapped stiffness matrix of each element, shaped (element, dof, node, dof, node)
+    :ivar stiffness_matrix: global stiffness matrix as a scipy.sparse.csr_matrix, overwritten by each update
+    """
+
+    out_of_core = True
+
+    def __init__(self, directory, worker_quantity=None, chunk_size=constants.ELEMENT_CHUNK_SIZE, compensated=False):
+        super().__init__(worker_quantity, chunk_size, compensated=compensated)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.chunk_slices = {}
+        self.strain_energies = None
+        self.internal_force_arrays = None
+        self.stiffness_matrices = None
+        self.data_indices = None
+        self.stiffness_matrix = None
+
+    def external_force_array(self, node_positions, current_load, balloon_internal_pressure):
+        """Return the unrolled global external force array for the current load, computed one chunk at a time.
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes, indexed by global ID
+        :param numpy.ndarray current_load: vector of current transverse load applied to the membrane (force/area)
+        :param bool balloon_internal_pressure: whether the load is an internal pressure normal to the balloon
+        """
+        external_force_array = numpy.zeros(self.global_dof_quantity)
+        for chunk in self.chunks:
+            numpy.add.at(external_force_array, chunk.element_dof_indices().ravel(),
+                         chunk.external_force_arrays(node_positions, current_load, balloon_internal_pressure).ravel())
+        return external_force_array
+
+    def memory_mapped(self, name, shape, dtype=float):
+        """Return a new array in a memory mapped file of the directory.
+
+        :param str name: name of the file, without the extension
+        :param tuple shape: shape of the array
+        :param dtype: data type of the array
+        """
+        return numpy.lib.format.open_memmap(os.path.join(self.directory, name + '.npy'), mode='w+', dtype=dtype,
+                                            shape=shape)
+
+    def prepare(self, model):
+        """Create the element block for the elements of a model with its per-element arrays in memory mapped files,
+        which are filled one chunk of elements at a time, and create the chunks and the sparse stiffness matrix.
+
+        :param model: model.Model whose mesh has been created
+        """
+        element_quantity = len(model.elements)
+        node_quantity = model.element_type.node_quantity
+        point_quantity = model.quadrature_class.point_quantity
+        node_reference_positions = numpy.zeros((model.node_quantity, 3))
+        for node in model.nodes:
+            node_reference_positions[node.global_id] = node.reference_position
+        connectivity = self.memory_mapped('connectivity', (element_quantity, node_quantity), int)
+        first_lame_parameters = self.memory_mapped('first_lame_parameters', (element_quantity,))
+        shear_moduli = self.memory_mapped('shear_moduli', (element_quantity,))
+        thicknesses = self.memory_mapped('thicknesses', (element_quantity,))
+        for start in range(0, element_quantity, self.chunk_size):
+            chunk_elements = model.elements[start:start + self.chunk_size]
+            connectivity[start:start + self.chunk_size] = [[node.global_id for node in element.nodes]
+                                                           for element in chunk_elements]
+            first_lame_parameters[start:start + self.chunk_size] = [element.material.first_lame_parameter
+                                                                    for element in chunk_elements]
+            shear_moduli[start:start + self.chunk_size] = [element.material.shear_modulus
+                                                           for element in chunk_elements]
+            thicknesses[start:start + self.chunk_size] = [element.thickness for element in chunk_elements]
+        stretch_ratios = self.memory_mapped('stretch_ratios', (element_quantity, point_quantity))
+        stretch_ratios[...] = 1.
+        plane_stress_iterations = self.memory_mapped('plane_stress_iterations', (element_quantity, point_quantity),
+                                                     int)
+        plane_stress_iterations[...] = 0
+        reference_geometry = (self.memory_mapped('reference_basis_contravariant', (element_quantity, 3, 3)),
+                              self.memory_mapped('reference_differential_areas', (element_quantity,)))
+        self.block = vectorized.ElementBlock(element_type=model.element_type,
+                                             constitutive_model=model.constitutive_model,
+                                             quadrature_class=model.quadrature_class,
+                                             connectivity=connectivity,
+                                             node_reference_positions=node_reference_positions,
+                                             first_lame_parameters=first_lame_parameters,
+                                             shear_moduli=shear_moduli,
+                                             thicknesses=thicknesses,
+                                             reference_geometry=reference_geometry,
+                                             quadrature_point_state=(stretch_ratios, plane_stress_iterations))
+        # Chunks of the mapped arrays, each with the slice of its elements in the mapped element results
+        self.element_dof_indices = self.memory_mapped('element_dof_indices', (element_quantity, 3, node_quantity),
+                                                      int)
+        self.chunks = []
+        self.chunk_slices = {}
+        for start in range(0, element_quantity, self.chunk_size):
+            element_slice = slice(start, min(start + self.chunk_size, element_quantity))
+            chunk = self.block.chunk(element_slice.start, element_slice.stop)
+            self.chunks.append(chunk)
+            self.chunk_slices[id(chunk)] = element_slice
+            self.element_dof_indices[element_slice] = chunk.element_dof_indices()
+            # The reference geometry of a preprocessed mesh is loaded with it
+            if model.mesh_tables is not None:
+                reference_geometry[0][element_slice] = model.mesh_tables['reference_basis_contravariant'][element_slice]
+                reference_geometry[1][element_slice] = model.mesh_tables['reference_differential_areas'][element_slice]
+            else:
+                reference_geometry[0][element_slice], reference_geometry[1][element_slice] = (
+                    chunk.reference_configuration(node_reference_positions))
+        self.chunk_times = numpy.zeros(len(self.chunks))
+        self.global_dof_quantity = model.global_dof_quantity
+        self.strain_energies = self.memory_mapped('strain_energies', (element_quantity,))
+        self.internal_force_arrays = self.memory_mapped('internal_force_arrays', (element_quantity, 3, node_quantity))
+        self.stiffness_matrices = self.memory_mapped('stiffness_matrices',
+                                                     (element_quantity,) + 2 * (3, node_quantity))
+        if model.mesh_tables is not None:
+            row_pointers = model.mesh_tables['row_pointers']
+            column_indices = model.mesh_tables['column_indices']
+            data_indices = model.mesh_tables['data_indices']
+        else:
+            row_pointers, column_indices, data_indices = vectorized.sparse_pattern(self.element_dof_indices,
+                                                                                   self.global_dof_quantity)
+        self.data_indices = self.memory_mapped('data_indices', numpy.shape(data_indices), int)
+        self.data_indices[...] = data_indices
+        self.stiffness_matrix = scipy.sparse.csr_matrix(
+            (numpy.zeros(len(column_indices)), column_indices, row_pointers),
+            shape=(self.global_dof_quantity, self.global_dof_quantity))
+        self.close()
+        if self.worker_quantity > 1 and len(self.chunks) > 1:
+            self.executor = ThreadPoolExecutor(max_workers=self.worker_quantity)
+
+    def strain_energy(self):
+        """Return the global strain energy as the blocked sum of the mapped element strain energies, in element
+        order."""
+        return reductions.blocked_sum(self.strain_energies, self.compensated)
+
+    def update(self, node_positions, stiffness=True):
+        """Update all elements for the current node positions, writing the element results to their mapped files, and
+        return the global strain energy, unrolled internal force array, and sparse stiffness matrix (None if not
+        computed). The global arrays are assembled from the mapped files one chunk at a time, in element order, so
+        they are bitwise identical to those of the threaded engine.
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes, indexed by global ID
+        :param bool stiffness: whether to compute the stiffness matrix
+        """
+
+        def update_chunk(chunk):
+            """Update a chunk and move its results to the mapped files."""
+            chunk.update(node_positions, stiffness=stiffness)
+            element_slice = self.chunk_slices[id(chunk)]
+            self.strain_energies[element_slice] = chunk.strain_energies
+            self.internal_force_arrays[element_slice] = chunk.internal_force_arrays
+            if stiffness:
+                self.stiffness_matrices[element_slice] = chunk.stiffness_matrices
+            chunk.strain_energies = None
+            chunk.kirchhoff_stresses = None
+            chunk.internal_force_arrays = None
+            chunk.stiffness_matrices = None
+
+        self.map(update_chunk)
+        strain_energy = self.strain_energy()
+        internal_force_array = numpy.zeros(self.global_dof_quantity)
+        for element_slice in self.chunk_slices.values():
+            numpy.add.at(internal_force_array, self.element_dof_indices[element_slice].ravel(),
+                         self.internal_force_arrays[element_slice].ravel())
+        if not stiffness:
+            return strain_energy, internal_force_array, None
+        self.stiffness_matrix.data[:] = 0.
+        for element_slice in self.chunk_slices.values():
+            numpy.add.at(self.stiffness_matrix.data, self.data_indices[element_slice].ravel(),
+                         self.stiffness_matrices[element_slice].ravel())
+        return strain_energy, internal_force_array, self.stiffness_matrix
+
+
+class ProcessEngine(ThreadedEngine):
+    """Element engine that evaluates contiguous ranges of the elements in worker processes, with the node positions,
+    quadrature point state, and element results in shared memory.
+
+    :param int worker_quantity: number of worker processes, or None for the number of CPUs
+    :param int chunk_size: number of elements each worker updates together
+    :param bool compensated: whether to add the element strain energies with compensated summation
+    :ivar list ranges: first and last (exclusive) element of the range of each worker, balanced by the element costs
+    of the last update
+    :ivar dict arrays: arrays in shared memory, by name
+    """
+
+    def __init__(self, worker_quantity=None, chunk_size=constants.ELEMENT_CHUNK_SIZE, compensated=False):
+        super().__init__(worker_quantity, chunk_size, compensated=compensated)
+        self.ranges = []
+        self.arrays = {}
+        self.memories = {}
+        self.barrier = None
+        self.connections = []
+        self.processes = []
+
+    def close(self):
+        """Stop the worker processes and release the shared memory."""
+        for connection, process in zip(self.connections, self.processes):
+            connection.send(('stop', ()))
+            process.join()
+        self.connections = []
+        self.processes = []
+        if self.block is not None and self.memories:
+            # Keep the quadrature point state after the shared memory is released
+            self.block.stretch_ratios = self.block.stretch_ratios.copy()
+            self.block.plane_stress_iterations = self.block.plane_stress_iterations.copy()
+        self.arrays = {}
+        for memory in self.memories.values():
+            memory.close()
+            memory.unlink()
+        self.memories = {}
+
+    def prepare(self, model):
+        """Create the element block for the elements of a model, move its state to shared memory, and start the
+        worker processes.
+
+        :param model: model.Model whose quadrature points have been created
+        """
+        self.close()
+        self.block = vectorized.ElementBlock.from_model(model)
+        self.element_dof_indices = self.block.element_dof_indices()
+        self.global_dof_quantity = model.global_dof_quantity
+        element_quantity = self.block.element_quantity
+        point_quantity = self.block.stretch_ratios.shape[1]
+        iteration_dtype = self.block.plane_stress_iterations.dtype
+        shapes = {'node_positions': ((model.node_quantity, 3), float),
+                  'stretch_ratios': ((element_quantity, point_quantity), float),
+                  'plane_stress_iterations': ((element_quantity, point_quantity), iteration_dtype),
+                  'element_costs': ((element_quantity,), float),
+                  'strain_energies': ((element_quantity,), float),
+                  'internal_force_arrays': ((element_quantity,) + self.element_dof_indices.shape[1:], float),
+                  'stiffness_matrices': ((element_quantity,) + 2 * self.element_dof_indices.shape[1:], float)}
+        shared_arrays = {}
+        for array_name, (shape, dtype) in shapes.items():
+            self.memories[array_name], self.arrays[array_name] = shared_array(shape, dtype)
+            shared_arrays[array_name] = (self.memories[array_name].name, shape, dtype)
+        # The quadrature point state of the block lives in shared memory
+        self.arrays['stretch_ratios'][...] = self.block.stretch_ratios
+        self.arrays['plane_stress_iterations'][...] = self.block.plane_stress_iterations
+        self.block.stretch_ratios = self.arrays['stretch_ratios']
+        self.block.plane_stress_iterations = self.arrays['plane_stress_iterations']
+        # Split the elements into one contiguous range per worker, of equal size until the costs are known
+        worker_quantity = max(min(self.worker_quantity, element_quantity), 1)
+        self.arrays['element_costs'][...] = 0.
+        self.ranges = balanced_ranges(self.arrays['element_costs'], worker_quantity)
+        self.barrier = multiprocessing.Barrier(worker_quantity + 1)
+        for _ in range(worker_quantity):
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=element_worker,
+                args=(child_connection, self.barrier, self.block, shared_arrays, self.chunk_size), daemon=True)
+            process.start()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+    def update(self, node_positions, stiffness=True):
+        """Update all elements for the current node positions on the workers, and return the global strain energy,
+        unrolled internal force array, and unrolled stiffness matrix (None if not computed).
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes, indexed by global ID
+        :param bool stiffness: whether to compute the stiffness matrix
+        """
+        self.arrays['node_positions'][...] = node_positions
+        for connection, (start, stop) in zip(self.connections, self.ranges):
+            connection.send(('update', (start, stop, stiffness)))
+        # Every worker has finished its range once all have reached the barrier
+        self.barrier.wait()
+        for connection in self.connections:
+            if connection.poll():
+                substructuring.raise_worker_error(connection.recv())
+        # Balance the ranges of the next update by the element costs of this one
+        self.ranges = balanced_ranges(self.arrays['element_costs'], len(self.connections))
+        strain_energy = reductions.blocked_sum(self.arrays['strain_energies'], self.compensated)
+        internal_force_array = vectorized.assemble_force_array(
+            self.arrays['internal_force_arrays'], self.element_dof_indices, self.global_dof_quantity)
+        if not stiffness:
+            return strain_energy, internal_force_array, None
+        stiffness_matrix = vectorized.assemble_stiffness_matrix(
+            self.arrays['stiffness_matrices'], self.element_dof_indices, self.global_dof_quantity)
+        return strain_energy, internal_force_array, stiffness_matrix
@@ -19,6 +19,20 @@ class BaseException(Exception):
         return self.message
 
 
+class ArcLengthMaxStepsExceededError(BaseException):
+    """Arc-length solver has exceeded the max number of steps without reaching the applied load.
+
+    :param int steps: number of steps performed
+    :param float load_factor: fraction of the applied load reached
+    """
+
+    def __init__(self, steps, load_factor):
+        super(ArcLengthMaxStepsExceededError, self).__init__(
+            message='Arc-length solver has exceeded the max number of steps without reaching the applied load. \n'
+                    + 'steps: ' + str(steps) + '\n'
+                    + 'load factor: ' + str(load_factor))
+
+
 class BasisMismatchError(BaseException):
     """Attempted to perform matrix operations with two covariant or two contravariant vectors
 
@@ -32,6 +46,32 @@ class BasisMismatchError(BaseException):
                                                          + 'and basis2 is type ' + basis2.type)
 
 
+class BatchIsolationError(BaseException):
+    """A model of a batch is affected by the failure of another model of the batch.
+
+    :param int model_index: index of the model in the batch
+    :param str reason: how the model is affected
+    """
+
+    def __init__(self, model_index, reason):
+        super(BatchIsolationError, self).__init__(message='A model of the batch is affected by the failure of '
+                                                          + 'another model because ' + reason + '. \n'
+                                                          + 'model index: ' + str(model_index))
+
+
+class CheckpointMismatchError(BaseException):
+    """A checkpoint cannot be resumed by the model that is restarting from it.
+
+    :param str checkpoint_path: path of the checkpoint
+    :param str reason: why the checkpoint does not match the model
+    """
+
+    def __init__(self, checkpoint_path, reason):
+        super(CheckpointMismatchError, self).__init__(message='The checkpoint cannot be resumed by this model because '
+                                                              + reason + '. \n'
+                                                              + 'checkpoint: ' + str(checkpoint_path))
+
+
 class CompletenessError(BaseException):
     """Shape functions for given class do not satisfy completeness by interpolating a linear polynomial exactly.
 
@@ -66,6 +106,39 @@ class DifferentiationError(BaseException):
                                                            + 'tolerance: ' + str(tolerance))
 
 
+class DynamicRelaxationMaxIterationsExceededError(BaseException):
+    """Dynamic relaxation solver has exceeded the max number of iterations without reaching equilibrium.
+
+    :param int iterations: number of iterations performed
+    :param float error: largest residual force in the current configuration
+    :param float tolerance: allowed tolerance for error
+    """
+
+    def __init__(self, iterations, error, tolerance):
+        super(DynamicRelaxationMaxIterationsExceededError, self).__init__(
+            message='Dynamic relaxation solver has exceeded the max number of iterations without converging. \n'
+                    + 'iterations: ' + str(iterations) + '\n'
+                    + 'error: ' + str(error) + '\n'
+                    + 'tolerance: ' + str(tolerance))
+
+
+class ImplementationMismatchError(BaseException):
+    """Two implementations of the same calculation do not give the same result.
+
+    :param str implementation: name of the implementation compared to the reference implementation
+    :param str quantity: quantity being compared
+    :param float difference: relative difference between the results of the implementations
+    :param float tolerance: allowed tolerance for error
+    """
+
+    def __init__(self, implementation, quantity, difference, tolerance):
+        super(ImplementationMismatchError, self).__init__(
+            message='The ' + implementation + ' does not match the reference implementation. \n'
+                    + 'quantity: ' + quantity + '\n'
+                    + 'relative difference: ' + str(difference) + '\n'
+                    + 'tolerance: ' + str(tolerance))
+
+
 class InvalidCoordinateError(BaseException):
     """The requested coordinate does not exist for the element.
 
@@ -80,6 +153,28 @@ class InvalidCoordinateError(BaseException):
                     + 'coordinate point_quantity: ' + str(coordinate_quantity))
 
 
+class InvalidJobDefinitionError(BaseException):
+    """A model definition submitted to the job server cannot be run.
+
+    :param str reason: what is wrong with the definition
+    """
+
+    def __init__(self, reason):
+        super(InvalidJobDefinitionError, self).__init__(message='The model definition cannot be run because '
+                                                                + reason + '.')
+
+
+class InvalidLoadCaseError(BaseException):
+    """A load case sets a parameter that cannot change between the load cases of a prepared model.
+
+    :param str parameter: name of the parameter
+    """
+
+    def __init__(self, parameter):
+        super(InvalidLoadCaseError, self).__init__(message='The parameter cannot be set by a load case. \n'
+                                                           + 'parameter: ' + str(parameter))
+
+
 class InvalidNodeError(BaseException):
     """The requested node does not exist for the element.
 
@@ -93,6 +188,17 @@ class InvalidNodeError(BaseException):
                                                        + 'node point_quantity: ' + str(node_quantity))
 
 
+class InvalidPredictorError(BaseException):
+    """The requested predictor for the initial guess of a load step does not exist.
+
+    :param str predictor: name of the requested predictor
+    """
+
+    def __init__(self, predictor):
+        super(InvalidPredictorError, self).__init__(message='The requested predictor does not exist. \n'
+                                                            + 'predictor: ' + str(predictor))
+
+
 class JacobianNegativeError(BaseException):
     """Jacobian has a negative value.
 
@@ -143,6 +249,18 @@ class MaterialSymmetryError(BaseException):
                     + str(tolerance) + '.')
 
 
+class MeshFormatError(BaseException):
+    """A mesh file cannot be read.
+
+    :param str mesh_path: path of the mesh file
+    :param str reason: what is wrong with the file
+    """
+
+    def __init__(self, mesh_path, reason):
+        super(MeshFormatError, self).__init__(message='The mesh file cannot be read because ' + reason + '. \n'
+                                                      + 'mesh file: ' + str(mesh_path))
+
+
 class NewtonMethodMaxIterationsExceededError(BaseException):
     """Newton's method solver has exceeded the max number of iterations without convergence.
 
@@ -200,6 +318,22 @@ class PlaneStressError(BaseException):
                                                        + 'F = ' + str(deformation_gradient))
 
 
+class ReproducibilityError(BaseException):
+    """A quantity changes in its last bits with the number of threads that computed it.
+
+    :param str quantity: quantity being compared
+    :param int worker_quantity: number of threads whose result differs from that of one thread
+    :param float difference: difference between the results
+    """
+
+    def __init__(self, quantity, worker_quantity, difference):
+        super(ReproducibilityError, self).__init__(
+            message='The result is not bitwise reproducible across thread counts. \n'
+                    + 'quantity: ' + quantity + '\n'
+                    + 'threads: ' + str(worker_quantity) + '\n'
+                    + 'difference: ' + str(difference))
+
+
 class StretchRatioNegativeError(BaseException):
     """Stretch ratio assigned to a negative value in Newton's method solver.
 
@@ -0,0 +1,295 @@
+"""
+mesh_readers.py contains the readers for meshes created by other tools: Gmsh .msh files, plain text node and element
+tables, and NumPy .npy and .npz arrays.
+
+Each reader returns a dictionary of the mesh inputs of model.Model, like the generators of meshes.py, with the
+connectivity of the elements read from the file as its 'connectivity_table', so the model uses the elements of the file
+instead of triangulating the nodes. Meshes of quadratic elements are read by their corner nodes, since the model
+creates the midpoint nodes itself.
+
+The readers are written for large meshes. Text is parsed in blocks by NumPy instead of line by line, and .npy arrays
+are memory mapped, so a mesh is not copied into memory until the model needs it. The boundary edges, unused nodes, and
+prescribed displacements are found with array operations.
+
+Displacements are prescribed by an array with one row of 3 components for each node, with NaN for the components that
+are not prescribed, or for Gmsh files by the physical groups of the mesh.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import os
+
+import numpy
+
+import constants
+import exceptions
+
+
+def boundary_edges(connectivity_table):
+    """Return the node IDs of the edges on the boundary of a triangle mesh, which are the edges of only one element.
+
+    :param numpy.ndarray connectivity_table: corner node IDs of each element
+    """
+    element_edges = numpy.sort(connectivity_table[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1).astype(numpy.int64)
+    # Each edge is keyed by one integer, which is much faster to find unique values of than rows
+    node_quantity = int(element_edges.max(initial=0)) + 1
+    edge_keys, counts = numpy.unique(element_edges[:, 0] * node_quantity + element_edges[:, 1], return_counts=True)
+    edge_keys = edge_keys[counts == 1]
+    return numpy.column_stack((edge_keys // node_quantity, edge_keys % node_quantity))
+
+
+def gmsh_sections(text):
+    """Return the sections of a Gmsh file as a dictionary of the text of each section, keyed by the section name.
+
+    :param str text: text of the file
+    """
+    sections = {}
+    start = text.find('$')
+    # Sections are found by searching for their markers, which is much faster than a regular expression on large files
+    while start != -1:
+        name_end = text.find('\n', start)
+        name = text[start + 1:name_end].strip()
+        end = text.find('$End' + name, name_end)
+        if end == -1:
+            break
+        sections[name] = text[name_end + 1:end].rstrip('\n')
+        start = text.find('$', end + len('$End') + len(name))
+    return sections
+
+
+def mesh_inputs(node_positions, connectivity_table, prescribed_displacements=None, membrane_side_length=None):
+    """Return the mesh inputs of model.Model for a mesh given as arrays. Nodes that are not a corner of any element are
+    removed, and the 2D node positions are the x and y coordinates.
+
+    :param numpy.ndarray node_positions: 2D or 3D reference position of each node
+    :param numpy.ndarray connectivity_table: node IDs of each element, with the corner nodes first
+    :param numpy.ndarray prescribed_displacements: prescribed displacement components of each node, with NaN for the
+    components that are not prescribed, or None to prescribe nothing
+    :param float membrane_side_length: side length of the membrane, or None for the largest side of the bounding box of
+    the 2D node positions
+    """
+    node_positions = numpy.asarray(node_positions)
+    connectivity_table = numpy.asarray(connectivity_table)[:, :3]
+    if prescribed_displacements is None:
+        prescribed_displacements = numpy.full((node_positions.shape[0], 3), numpy.nan)
+    prescribed_displacements = numpy.asarray(prescribed_displacements, dtype=float)
+    # Remove the nodes that are not corners of an element, such as the midpoint nodes of quadratic elements
+    used = numpy.zeros(node_positions.shape[0], dtype=bool)
+    used[connectivity_table] = True
+    if not used.all():
+        node_ids = numpy.full(node_positions.shape[0], -1)
+        node_ids[used] = numpy.arange(used.sum())
+        node_positions = node_positions[used]
+        prescribed_displacements = prescribed_displacements[used]
+        connectivity_table = node_ids[connectivity_table]
+    corner_node_quantity = node_positions.shape[0]
+    node_reference_positions_2d = node_positions[:, :2]
+    if node_positions.shape[1] == 3:
+        node_reference_positions_3d = node_positions
+    else:
+        node_reference_positions_3d = numpy.hstack((node_positions, numpy.zeros((corner_node_quantity, 1))))
+    if membrane_side_length is None:
+        membrane_side_length = float(numpy.ptp(node_reference_positions_2d, axis=0).max())
+    edges = numpy.asarray(node_reference_positions_2d, dtype=float)[boundary_edges(connectivity_table)]
+    # Components that are not prescribed are None
+    prescribed_components = prescribed_displacements.astype(object)
+    prescribed_components[numpy.isnan(prescribed_displacements)] = None
+    return {'node_reference_positions_2d': node_reference_positions_2d,
+            'node_reference_positions_3d': node_reference_positions_3d,
+            'edges': edges,
+            'corner_node_quantity': corner_node_quantity,
+            'prescribed_displacements': dict(enumerate(prescribed_components.tolist())),
+            'membrane_side_length': membrane_side_length,
+            'connectivity_table': connectivity_table}
+
+
+def parse_table(lines, column_quantity=None, dtype=float):
+    """Return a block of lines of numbers as an array with one row for each line, or None if the lines do not all have
+    the same number of numbers.
+
+    :param list lines: lines of the block
+    :param int column_quantity: number of numbers on each line, or None to count them on the first line
+    :param dtype: data type of the numbers, which is int for tables of tags, since integers are parsed much faster
+    """
+    if not lines:
+        return numpy.zeros((0, column_quantity or 0), dtype=dtype)
+    if column_quantity is None:
+        column_quantity = len(lines[0].split())
+    table = numpy.fromstring('\n'.join(lines), dtype=dtype, sep=' ')
+    if table.size != len(lines) * column_quantity:
+        return None
+    return table.reshape(len(lines), column_quantity)
+
+
+def read_arrays(path, mmap_mode='r', membrane_side_length=None):
+    """Read a mesh from NumPy arrays: an .npz file, or a directory of .npy files, which are memory mapped. The arrays
+    are 'node_positions' (2D or 3D position of each node), 'connectivity' (node IDs of each element), and optionally
+    'prescribed_displacements' (3 components of each node, with NaN for the components that are not prescribed).
+
+    :param str path: path of the .npz file or the directory of .npy files
+    :param str mmap_mode: memory map mode of the .npy files (see numpy.load), or None to read them into memory
+    :param float membrane_side_length: side length of the membrane, or None for the largest side of the bounding box of
+    the 2D node positions
+    """
+    if os.path.isdir(path):
+        arrays = {file_name[:-len('.npy')]: numpy.load(os.path.join(path, file_name), mmap_mode=mmap_mode)
+                  for file_name in os.listdir(path) if file_name.endswith('.npy')}
+    else:
+        with numpy.load(path) as archive:
+            arrays = dict(archive)
+    for name in ('node_positions', 'connectivity'):
+        if name not in arrays:
+            raise exceptions.MeshFormatError(path, 'it has no ' + name + ' array')
+    return mesh_inputs(arrays['node_positions'], arrays['connectivity'], arrays.get('prescribed_displacements'),
+                       membrane_side_length)
+
+
+def read_gmsh(path, prescribed_groups=None, membrane_side_length=None):
+    """Read a mesh from an ASCII Gmsh .msh file of version 2.2 or 4.1. The triangles of the file (linear or quadratic)
+    are the elements, and the nodes of the elements of each physical group (points, lines, or triangles) can be given
+    prescribed displacements.
+
+    :param str path: path of the .msh file
+    :param dict prescribed_groups: prescribed displacements of the nodes of each physical group, keyed by the name or
+    tag of the group, as a list of 3 components with None for the components that are not prescribed
+    :param float membrane_side_length: side length of the membrane, or None for the largest side of the bounding box of
+    the 2D node positions
+    """
+    with open(path) as mesh_file:
+        sections = gmsh_sections(mesh_file.read())
+    for name in ('MeshFormat', 'Nodes', 'Elements'):
+        if name not in sections:
+            raise exceptions.MeshFormatError(path, 'it has no $' + name + ' section')
+    version, file_type = sections['MeshFormat'].split()[:2]
+    if file_type != '0':
+        raise exceptions.MeshFormatError(path, 'it is a binary Gmsh file; save the mesh as ASCII')
+    if version[0] not in '24':
+        raise exceptions.MeshFormatError(path, 'Gmsh format version ' + version + ' is not supported')
+    try:
+        node_tags, node_positions, element_blocks = (read_gmsh_2 if version[0] == '2' else read_gmsh_4)(sections)
+    except (IndexError, TypeError, ValueError):
+        # Tables with missing or extra numbers are not parsed
+        raise exceptions.MeshFormatError(path, 'its nodes or elements are malformed')
+    # Map the node tags of the file to node IDs
+    node_ids = numpy.full(node_tags.max(initial=0) + 1, -1)
+    node_ids[node_tags] = numpy.arange(node_tags.size)
+    triangles = [node_ids[element_nodes] for element_type, physical_tags, element_nodes in element_blocks
+                 if element_type in constants.GMSH_TRIANGLE_TYPES]
+    if not triangles:
+        raise exceptions.MeshFormatError(path, 'it has no triangles')
+    connectivity_table = numpy.vstack([element_nodes[:, :3] for element_nodes in triangles])
+    # Prescribe the displacements of the nodes of the physical groups
+    prescribed_displacements = numpy.full((node_tags.size, 3), numpy.nan)
+    physical_names = {}
+    for line in sections.get('PhysicalNames', '').split('\n')[1:]:
+        dimension, tag, name = line.split(maxsplit=2)
+        physical_names[name.strip('"')] = int(tag)
+    for group, displacements in (prescribed_groups or {}).items():
+        tag = physical_names.get(group, group)
+        if not isinstance(tag, int):
+            raise exceptions.MeshFormatError(path, 'it has no physical group ' + str(group))
+        group_nodes = [element_nodes[physical_tags == tag].ravel()
+                       for element_type, physical_tags, element_nodes in element_blocks]
+        group_nodes = node_ids[numpy.unique(numpy.concatenate(group_nodes))]
+        for dof, displacement in enumerate(displacements):
+            if displacement is not None:
+                prescribed_displacements[group_nodes, dof] = displacement
+    return mesh_inputs(node_positions, connectivity_table, prescribed_displacements, membrane_side_length)
+
+
+def read_gmsh_2(sections):
+    """Return the node tags, node positions, and element blocks of the sections of a Gmsh file of version 2.2. Each
+    element block is a tuple of the element type, the physical tag of each element, and the node tags of each element.
+
+    :param dict sections: text of each section of the file
+    """
+    nodes = parse_table(sections['Nodes'].split('\n')[1:], 4)
+    lines = sections['Elements'].split('\n')[1:]
+    # Lines with the same number of numbers hold elements of the same type and number of tags, and are parsed as one
+    # table. Most meshes have only triangles, so all the lines are parsed at once before they are grouped
+    tables = [parse_table(lines, dtype=int)]
+    if tables[0] is None:
+        lines = numpy.array(lines)
+        line_lengths = numpy.char.count(numpy.char.strip(lines), ' ') + 1
+        tables = [parse_table(lines[line_lengths == line_length].tolist(), line_length, int)
+                  for line_length in numpy.unique(line_lengths)]
+    element_blocks = []
+    for table in tables:
+        for element_type in numpy.unique(table[:, 1]):
+            if element_type not in constants.GMSH_ELEMENT_NODE_QUANTITIES:
+                continue
+            type_table = table[table[:, 1] == element_type]
+            node_quantity = constants.GMSH_ELEMENT_NODE_QUANTITIES[element_type]
+            # The first tag is the physical tag
+            physical_tags = numpy.where(type_table[:, 2] > 0, type_table[:, 3], 0)
+            element_blocks.append((element_type, physical_tags, type_table[:, -node_quantity:]))
+    return nodes[:, 0].astype(int), nodes[:, 1:], element_blocks
+
+
+def read_gmsh_4(sections):
+    """Return the node tags, node positions, and element blocks of the sections of a Gmsh file of version 4.1. Each
+    element block is a tuple of the element type, the physical tag of each element, and the node tags of each element.
+
+    :param dict sections: text of each section of the file
+    """
+    # Physical tag of each entity, keyed by its dimension and tag
+    entity_physical_tags = {}
+    if 'Entities' in sections:
+        lines = sections['Entities'].split('\n')
+        entity_quantities = [int(quantity) for quantity in lines[0].split()]
+        line_index = 1
+        for dimension, entity_quantity in enumerate(entity_quantities):
+            for line in lines[line_index:line_index + entity_quantity]:
+                numbers = line.split()
+                # Points have a position, and other entities a bounding box, before their physical tags
+                physical_index = 4 if dimension == 0 else 7
+                if int(numbers[physical_index]) > 0:
+                    entity_physical_tags[(dimension, int(numbers[0]))] = int(numbers[physical_index + 1])
+            line_index += entity_quantity
+    lines = sections['Nodes'].split('\n')
+    block_quantity = int(lines[0].split()[0])
+    line_index = 1
+    node_tags = []
+    node_positions = []
+    for _ in range(block_quantity):
+        dimension, entity_tag, parametric, node_quantity = (int(number) for number in lines[line_index].split())
+        line_index += 1
+        node_tags.append(parse_table(lines[line_index:line_index + node_quantity], 1, int)[:, 0])
+        line_index += node_quantity
+        node_positions.append(parse_table(lines[line_index:line_index + node_quantity])[:, :3].reshape(-1, 3))
+        line_index += node_quantity
+    lines = sections['Elements'].split('\n')
+    block_quantity = int(lines[0].split()[0])
+    line_index = 1
+    element_blocks = []
+    for _ in range(block_quantity):
+        dimension, entity_tag, element_type, element_quantity = (int(number) for number in lines[line_index].split())
+        line_index += 1
+        if element_type in constants.GMSH_ELEMENT_NODE_QUANTITIES:
+            table = parse_table(lines[line_index:line_index + element_quantity],
+                                constants.GMSH_ELEMENT_NODE_QUANTITIES[element_type] + 1, int)
+            physical_tags = numpy.full(element_quantity, entity_physical_tags.get((dimension, entity_tag), 0))
+            element_blocks.append((element_type, physical_tags, table[:, 1:]))
+        line_index += element_quantity
+    return numpy.concatenate(node_tags), numpy.vstack(node_positions), element_blocks
+
+
+def read_tables(node_path, element_path, prescribed_path=None, index_base=0, membrane_side_length=None):
+    """Read a mesh from plain text tables of whitespace separated numbers, with comments after '#'.
+
+    :param str node_path: path of the node table, with the 2D or 3D position of each node on one line
+    :param str element_path: path of the element table, with the node IDs of each element on one line
+    :param str prescribed_path: path of the table of prescribed displacements, with the node ID and 3 displacement
+    components (nan for the components that are not prescribed) on each line, or None to prescribe nothing
+    :param int index_base: node ID of the first node in the element and prescribed displacement tables, such as 1 for
+    tables written by tools that count from 1
+    :param float membrane_side_length: side length of the membrane, or None for the largest side of the bounding box of
+    the 2D node positions
+    """
+    node_positions = numpy.loadtxt(node_path, dtype=float, ndmin=2)
+    connectivity_table = numpy.loadtxt(element_path, dtype=int, ndmin=2) - index_base
+    prescribed_displacements = None
+    if prescribed_path is not None:
+        prescribed_table = numpy.loadtxt(prescribed_path, dtype=float, ndmin=2)
+        prescribed_displacements = numpy.full((node_positions.shape[0], 3), numpy.nan)
+        prescribed_displacements[prescribed_table[:, 0].astype(int) - index_base] = prescribed_table[:, 1:4]
+    return mesh_inputs(node_positions, connectivity_table, prescribed_displacements, membrane_side_length)
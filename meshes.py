@@ -0,0 +1,176 @@
+"""
+meshes.py contains the generators for the meshes of the membranes that are analyzed.
+
+Each generator returns a dictionary of the mesh inputs of model.Model (2D and 3D node positions, edges, corner node
+quantity, prescribed displacements, and membrane side length), so a mesh can be passed to the model with
+model.Model(..., **mesh). The size of each mesh is set by a single integer, so coarser or finer meshes of the same body
+can be created by changing only that integer.
+
+The nodes and boundary sets of each mesh are created with array operations, without a loop over the nodes, so meshes
+of millions of nodes are generated in a fraction of a second. Each generator can grade the node spacing toward the
+boundary or the pole of its body, where the stresses change fastest: with a grading of 1 the nodes are evenly spaced,
+and with a larger grading they are closer together near the boundary or pole and farther apart elsewhere.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import gc
+
+import numpy
+
+
+def circle_node_indices(circle_node_quantities):
+    """Return the circle index and the index on its circle of each node of a mesh of concentric circles.
+
+    :param numpy.ndarray circle_node_quantities: number of nodes on each circle, where 0 is one node
+    """
+    circle_node_quantities = numpy.maximum(circle_node_quantities, 1)
+    circle_indices = numpy.repeat(numpy.arange(circle_node_quantities.size), circle_node_quantities)
+    circle_offsets = numpy.cumsum(circle_node_quantities) - circle_node_quantities
+    node_indices = numpy.arange(circle_indices.size) - circle_offsets[circle_indices]
+    return circle_indices, node_indices
+
+
+def disc(radius, circle_quantity, grading=1.):
+    """Create the mesh of a flat circular disc. Nodes are placed on concentric circles around a center node, with 6
+    more nodes on each circle than the last, so the elements have similar sizes. The disc is centered at
+    (radius, radius), so it lies in the square of side length 2 * radius used by the initial perturbation. The nodes
+    on the outer circle are fixed.
+
+    :param float radius: radius of the disc
+    :param int circle_quantity: number of concentric circles of nodes, including the center point
+    :param float grading: grading of the circle radii toward the outer circle
+    """
+    circle_indices, node_indices = circle_node_indices(6 * numpy.arange(circle_quantity))
+    # The center point is a circle of one node
+    circle_node_quantities = numpy.maximum(6 * circle_indices, 1)
+    radii = radius - graded_coordinates(circle_quantity, radius, grading)[::-1]
+    angles = 2 * numpy.pi * node_indices / circle_node_quantities
+    node_reference_positions_2d = numpy.column_stack((radius + radii[circle_indices] * numpy.cos(angles),
+                                                      radius + radii[circle_indices] * numpy.sin(angles)))
+    corner_node_quantity = node_reference_positions_2d.shape[0]
+    node_reference_positions_3d = numpy.hstack((node_reference_positions_2d, numpy.zeros((corner_node_quantity, 1))))
+    # The edges are the chords between the neighboring nodes of the outer circle
+    outer_positions = node_reference_positions_2d[circle_indices == circle_quantity - 1]
+    edges = numpy.stack((outer_positions, numpy.roll(outer_positions, -1, axis=0)), axis=1)
+    # Fix the nodes on the outer circle
+    prescribed = numpy.zeros((corner_node_quantity, 3), dtype=bool)
+    prescribed[circle_indices == circle_quantity - 1] = True
+    return {'node_reference_positions_2d': node_reference_positions_2d,
+            'node_reference_positions_3d': node_reference_positions_3d,
+            'edges': edges,
+            'corner_node_quantity': corner_node_quantity,
+            'prescribed_displacements': prescribed_displacements(prescribed, 0),
+            'membrane_side_length': 2 * radius}
+
+
+def graded_coordinates(point_quantity, length, grading, symmetric=False):
+    """Return coordinates from 0 to a length that are graded toward 0, or toward both ends if symmetric. The
+    coordinates are numpy.linspace(0, length, point_quantity) for a grading of 1.
+
+    :param int point_quantity: number of coordinates
+    :param float length: last coordinate
+    :param float grading: exponent of the grading, 1 for evenly spaced coordinates
+    :param bool symmetric: whether the coordinates are graded toward both ends
+    """
+    if grading == 1:
+        return numpy.linspace(0, length, point_quantity)
+    coordinates = numpy.linspace(0, 1, point_quantity)
+    if not symmetric:
+        return length * coordinates ** grading
+    # Grade each half toward its end, keeping the ends and the middle fixed
+    centered_coordinates = 2 * coordinates - 1
+    return length * .5 * (1 + numpy.sign(centered_coordinates) * abs(centered_coordinates) ** (1 / grading))
+
+
+def prescribed_displacements(prescribed, displacements):
+    """Return the prescribed displacements of the nodes of a mesh as the dictionary taken by model.Model, with None for
+    the components that are not prescribed.
+
+    :param numpy.ndarray prescribed: whether each component of each node is prescribed, shaped (node, 3)
+    :param displacements: prescribed displacement of each component, as an array shaped like prescribed or a number
+    """
+    node_indices = numpy.flatnonzero(prescribed.any(axis=1))
+    components = numpy.full((node_indices.size, 3), None, dtype=object)
+    components[prescribed[node_indices]] = numpy.broadcast_to(displacements, prescribed.shape)[node_indices][
+        prescribed[node_indices]]
+    # The lists of the nodes hold no reference cycles, so the garbage collector is paused while millions of them are
+    # created, instead of repeatedly scanning them
+    garbage_collection = gc.isenabled()
+    gc.disable()
+    try:
+        node_prescribed_displacements = {node_index: [None, None, None] for node_index in range(prescribed.shape[0])}
+        node_prescribed_displacements.update(zip(node_indices.tolist(), components.tolist()))
+    finally:
+        if garbage_collection:
+            gc.enable()
+    return node_prescribed_displacements
+
+
+def sphere_octant(radius, circle_quantity, grading=1.):
+    """Create the mesh of an octant of a sphere. Nodes are placed on concentric circles in the 2D plane, with one more
+    node on each circle than the last, and are projected onto the sphere in 3D. Nodes on the planes of symmetry are
+    prescribed to stay on them.
+
+    :param float radius: radius of the sphere
+    :param int circle_quantity: number of concentric circles of nodes, including the center point
+    :param float grading: grading of the circle radii toward the pole at the center point
+    """
+    circle_indices, node_indices = circle_node_indices(numpy.arange(circle_quantity) + 1)
+    radii = graded_coordinates(circle_quantity, radius, grading)
+    # Angles of each circle are evenly spaced from 0 to 90 degrees, ending exactly at 90
+    angles = numpy.where(node_indices == circle_indices, 90.,
+                         node_indices * (90 / numpy.maximum(circle_indices, 1)))
+    x_positions = radii[circle_indices] * numpy.cos(angles * numpy.pi / 180)
+    y_positions = radii[circle_indices] * numpy.sin(angles * numpy.pi / 180)
+    # Snap the nodes at the ends of each circle and on the equator onto the planes of symmetry. Snapping by
+    # position instead would snap the nodes of small circles near the pole onto it
+    x_positions[angles == 90] = 0
+    y_positions[angles == 0] = 0
+    z_positions = numpy.sqrt(abs(radius ** 2 - x_positions ** 2 - y_positions ** 2))
+    z_positions[radii[circle_indices] == radius] = 0
+    node_reference_positions_2d = numpy.column_stack((x_positions, y_positions))
+    node_reference_positions_3d = numpy.column_stack((x_positions, y_positions, z_positions))
+    corner_node_quantity = node_reference_positions_2d.shape[0]
+    edges = numpy.array([[(0, 0), (radius, 0)], [(0, 0), (0, radius)]], dtype=float)
+    # Prescribe the degrees of freedom normal to the planes of symmetry
+    return {'node_reference_positions_2d': node_reference_positions_2d,
+            'node_reference_positions_3d': node_reference_positions_3d,
+            'edges': edges,
+            'corner_node_quantity': corner_node_quantity,
+            'prescribed_displacements': prescribed_displacements(node_reference_positions_3d == 0, 0),
+            'membrane_side_length': radius}
+
+
+def square_sheet(side_length, nodes_per_side, stretch_percent=0., grading=1.):
+    """Create the mesh of a flat square sheet with a square grid of nodes. The nodes along the edges are fixed
+    transversely and displaced in plane by a percentage of their position.
+
+    :param float side_length: side length of the sheet
+    :param int nodes_per_side: number of nodes along each side of the sheet
+    :param float stretch_percent: in plane displacement of the edge nodes as a fraction of their position
+    :param float grading: grading of the grid lines toward the edges of the sheet
+    """
+    # Determine nodal positions, with the y coordinate changing fastest
+    coordinates = graded_coordinates(nodes_per_side, side_length, grading, symmetric=True)
+    node_reference_positions_2d = numpy.column_stack((numpy.repeat(coordinates, nodes_per_side),
+                                                      numpy.tile(coordinates, nodes_per_side)))
+    corner_node_quantity = node_reference_positions_2d.shape[0]
+    # Specify sets of edge endpoints
+    edge_1 = [(0, 0), (side_length, 0)]
+    edge_2 = [(side_length, 0), (side_length, side_length)]
+    edge_3 = [(side_length, side_length), (0, side_length)]
+    edge_4 = [(0, side_length), (0, 0)]
+    edges = numpy.array([edge_1, edge_2, edge_3, edge_4], dtype=float)
+    # Set prescribed displacements of the nodes along any edge
+    on_edge = ((node_reference_positions_2d == 0) | (node_reference_positions_2d == side_length)).any(axis=1)
+    prescribed = numpy.repeat(on_edge[:, None], 3, axis=1)
+    displacements = numpy.column_stack((stretch_percent * node_reference_positions_2d,
+                                        numpy.zeros(corner_node_quantity)))
+    # Convert 2D nodal positions to 3D for a flat sheet
+    node_reference_positions_3d = numpy.hstack((node_reference_positions_2d, numpy.zeros((corner_node_quantity, 1))))
+    return {'node_reference_positions_2d': node_reference_positions_2d,
+            'node_reference_positions_3d': node_reference_positions_3d,
+            'edges': edges,
+            'corner_node_quantity': corner_node_quantity,
+            'prescribed_displacements': prescribed_displacements(prescribed, displacements),
+            'membrane_side_length': side_length}
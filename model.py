@@ -3,15 +3,23 @@ model.py module contains the primary components for constructing the finite elem
 
 .. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
 """
+import os
+import tempfile
 
 import numpy
+import scipy.sparse
 from scipy.spatial import Delaunay
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 
 import constants
 import elements
+import exceptions
 import nodes
+import renumbering
+import solvers
+import substructuring
+import vectorized
 
 
 class Model:
@@ -34,7 +42,44 @@ class Model:
     :param numpy.ndarray applied_load: vector of uniform transverse load applied to the membrane (force/area)
     :param bool solve_loading_problem: whether to solve an incremental loading problem
     :param bool solve_displacement_problem: whether to solve an incremental displacement problem
+    :param bool solve_arc_length_problem: whether to solve for the load-deflection path with the arc-length method
+    :param bool solve_dynamic_relaxation_problem: whether to solve an incremental loading problem with dynamic
+    relaxation instead of Newton's method
+    :param bool solve_domain_decomposition_problem: whether to solve an incremental loading problem with the
+    subdomains of the mesh assembled and condensed in parallel worker processes
     :param bool balloon_internal_pressure: whether to solve for balloon internal pressure
+    :param str predictor: predictor used for the initial guess of each load step (constants.SECANT_PREDICTOR or
+    constants.TANGENT_PREDICTOR), or None to start each step from the last converged configuration
+    :param linear_solver: solver object used for the stiffness matrix system of each Newton iteration (see solvers.py).
+    Defaults to a solvers.DirectSolver, or to a solvers.ConjugateGradientSolver for the sparse stiffness matrix of an
+    out-of-core element engine
+    :param bool renumber_mesh: whether to renumber the nodes and elements after the mesh is created to reduce the
+    bandwidth of the stiffness matrix (for example for a solvers.BandedSolver). The outputs of a renumbered model, such
+    as the nodes and converged_displacements, are in the new numbering, and are mapped back to the input numbering with
+    input_numbering
+    :param int subdomain_quantity: number of subdomains (and worker processes) for the domain decomposition solver, or
+    None for the number of CPUs
+    :param element_engine: element engine object that updates the elements and assembles the global quantities (see
+    engine.py), or None to update the element objects one at a time
+    :param list warm_start_displacements: converged total unknown displacements of each load step of a similar analysis
+    on the same mesh (converged_displacements of its model), used as the initial guess of each load step instead of
+    the predictor
+    :param bool plot: whether to plot the membrane during the analysis and the results at the end in matplotlib
+    windows. Analyses are headless by default, so they can run in worker processes and on servers without a display
+    :param step_callback: function called with the model after each converged load step is recorded, or None
+    :param mesh_cache: caches.MeshCache that saves the preprocessed mesh (nodes, connectivity, degrees of freedom,
+    reference geometry, and sparsity pattern) to disk and loads it for later models on the same mesh, or None
+    :param str checkpoint_path: file the loading and arc-length solvers save their state to every checkpoint_interval
+    converged steps, or None to not save checkpoints. Each checkpoint replaces the last one
+    :param int checkpoint_interval: number of converged steps between checkpoints
+    :param str restart_path: checkpoint of an analysis of the same mesh with the same solver to resume from, or None to
+    start from the reference configuration. The other parameters (such as the predictor, linear solver, or step
+    quantity) can differ from the analysis that saved the checkpoint. The loading solver divides the remaining load
+    into the remaining load steps of the step quantity
+    :param numpy.ndarray connectivity_table: corner node IDs of each element, such as the connectivity read from a mesh
+    file (see mesh_readers.py), or None to triangulate the 2D node positions with Delaunay triangulation
+    :param visualization_sink: sink that is given every configuration of the membrane that would be plotted, such as
+    a visualization.FrameSink that renders frames in a separate process, or None
     """
 
     def __init__(self, material, constitutive_model, quadrature_class, element_type, degrees_of_freedom,
@@ -42,7 +87,24 @@ class Model:
                  prescribed_displacements, membrane_side_length, membrane_thickness, applied_load, step_quantity,
                  solve_loading_problem=False,
                  solve_displacement_problem=False,
-                 balloon_internal_pressure=False):
+                 solve_arc_length_problem=False,
+                 solve_dynamic_relaxation_problem=False,
+                 solve_domain_decomposition_problem=False,
+                 balloon_internal_pressure=False,
+                 predictor=None,
+                 linear_solver=None,
+                 renumber_mesh=False,
+                 subdomain_quantity=None,
+                 element_engine=None,
+                 warm_start_displacements=None,
+                 plot=False,
+                 step_callback=None,
+                 mesh_cache=None,
+                 checkpoint_path=None,
+                 checkpoint_interval=1,
+                 restart_path=None,
+                 visualization_sink=None,
+                 connectivity_table=None):
         # Inputs
         self.material = material
         self.constitutive_model = constitutive_model
@@ -53,17 +115,39 @@ class Model:
         self.node_reference_positions_3d = node_reference_positions_3d
         self.edges = edges
         self.corner_node_quantity = corner_node_quantity
-        self.prescribed_displacements = prescribed_displacements
+        # The midpoint nodes are added to a copy, so the dictionary of the caller still describes only the corner nodes
+        self.prescribed_displacements = dict(prescribed_displacements)
         self.membrane_side_length = membrane_side_length
         self.membrane_thickness = membrane_thickness
         self.applied_load = applied_load
         self.step_quantity = step_quantity
         self.solve_loading_problem = solve_loading_problem
         self.solve_displacement_problem = solve_displacement_problem
+        self.solve_arc_length_problem = solve_arc_length_problem
+        self.solve_dynamic_relaxation_problem = solve_dynamic_relaxation_problem
+        self.solve_domain_decomposition_problem = solve_domain_decomposition_problem
         self.balloon_internal_pressure = balloon_internal_pressure
+        self.predictor = predictor
+        if linear_solver is None:
+            if element_engine is not None and element_engine.out_of_core:
+                linear_solver = solvers.ConjugateGradientSolver()
+            else:
+                linear_solver = solvers.DirectSolver()
+        self.linear_solver = linear_solver
+        self.renumber_mesh = renumber_mesh
+        self.subdomain_quantity = subdomain_quantity
+        self.element_engine = element_engine
+        self.warm_start_displacements = warm_start_displacements
+        self.plot = plot
+        self.step_callback = step_callback
+        self.mesh_cache = mesh_cache
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.restart_path = restart_path
+        self.visualization_sink = visualization_sink
+        self.connectivity_table = connectivity_table
 
         # Global quantities
-        self.connectivity_table = None
         self.node_quantity = None
         self.nodes = []
         self.element_quantity = 0
@@ -73,6 +157,11 @@ class Model:
         self.known_displacements = None
         self.known_displacement_quantity = 0
         self.unknown_displacement_quantity = 0
+        self.unknown_dof_indices = None
+        # Global ID of each node, indexed by the ID the node was created with
+        self.node_renumbering = None
+        # Preprocessed mesh arrays saved to or loaded from the mesh cache
+        self.mesh_tables = None
 
         # Updating quantities
         self.unknown_displacements = None
@@ -80,20 +169,185 @@ class Model:
         self.internal_force_array = None
         self.external_force_array = None
         self.stiffness_matrix = None
+        self.global_rearranged = False
+
+        # Converged unknown displacements of each load step, used by the predictor
+        self.converged_displacements = []
 
         # Outputs
         self.load_steps = []
         self.maximum_deflections = []
+        self.newton_iterations = []
+        self.relaxation_iterations = []
 
         # Run the analysis
         self.run()
 
+    def apply_initial_perturbation(self, update=True):
+        """Perturb the unconstrained nodes in the 3 direction so the flat membrane has transverse stiffness, and update
+        the configuration of the model for the perturbed positions.
+
+        :param bool update: whether to update the elements and global quantities for the perturbed positions
+        """
+        # Perturb unconstrained nodes in the 3 direction
+        for node in self.nodes:
+            if node.prescribed_displacements[2] is None:
+                node.current_position[2] += -1e-3 * (
+                    numpy.sin(numpy.pi * node.current_position[0] / self.membrane_side_length)
+                    * numpy.sin(numpy.pi * node.current_position[1] / self.membrane_side_length))
+        if not update:
+            return
+        # Update the configuration of the model to calculate the global strain energy, internal force, and stiffness
+        # associated with the small random displacements
+        self.update_current_configuration()
+        self.update_plot()
+
+    def arc_length_solver(self):
+        """Solve for the deformation of the body along the load-deflection path using the arc-length (Riks) method.
+        The load factor multiplying the applied load is an unknown alongside the unknown displacements, which allows
+        the solver to pass limit points of the path where load control fails.
+
+        Each step predicts along the tangent of the path and corrects on the plane normal to the current increment
+        (Ramm's update of the Riks constraint). Both right hand sides of the bordered system are solved with a single
+        factorization of the stiffness matrix per iteration. The arc length of the first step matches one load step of
+        the loading solver, and is then scaled so that each step needs about
+        constants.ARC_LENGTH_DESIRED_ITERATIONS iterations. A step whose corrected load passes the applied load is
+        redone with a shorter arc length, and the last step is solved under load control so the path ends exactly at
+        the applied load. An error is raised if the applied load is not reached within
+        constants.ARC_LENGTH_MAXIMUM_STEP_FACTOR times the number of load steps.
+        """
+        if self.restart_path is not None:
+            # Resume the path and the adapted arc length from the checkpoint
+            state = self.load_checkpoint('arc_length')
+            load_factor = float(state['load_factor'])
+            arc_length = float(state['arc_length'])
+            minimum_arc_length = float(state['minimum_arc_length'])
+            previous_increment = state['previous_increment']
+            step_index = int(state['step_index'])
+        else:
+            # Initialize small random displacements for the unknown degrees of freedom
+            self.apply_initial_perturbation()
+            load_factor = 0.
+            arc_length = None
+            minimum_arc_length = None
+            previous_increment = None
+            step_index = 0
+        while True:
+            if step_index == constants.ARC_LENGTH_MAXIMUM_STEP_FACTOR * self.step_quantity:
+                raise exceptions.ArcLengthMaxStepsExceededError(steps=step_index, load_factor=load_factor)
+            print('Progress:', load_factor * 100, '%')
+            # Save the converged configuration in case the step has to be restarted with a shorter arc length
+            converged_configuration = self.store_configuration()
+            # Tangent of the path at the converged configuration. As in the loading solver, the external force is
+            # evaluated once per step in the converged configuration.
+            reference_external_force_array = self.upper_reference_external_force_array()
+            self.rearrange_global()
+            upper_stiffness_matrix = self.stiffness_matrix[:self.unknown_displacement_quantity,
+                                     :self.unknown_displacement_quantity]
+            self.linear_solver.factorize(upper_stiffness_matrix)
+            tangent_displacements = self.linear_solver.solve(reference_external_force_array)
+            tangent_norm = numpy.linalg.norm(tangent_displacements)
+            # The corrector tolerance follows the scale of the load, since the round-off error of the residual grows
+            # with the forces
+            tolerance = max(constants.NEWTON_METHOD_TOLERANCE,
+                            constants.ARC_LENGTH_RELATIVE_TOLERANCE * abs(reference_external_force_array).max())
+            # The first arc length covers the same load increment as one step of the loading solver
+            if arc_length is None:
+                arc_length = tangent_norm / self.step_quantity
+                minimum_arc_length = arc_length * constants.ARC_LENGTH_MINIMUM_FRACTION
+            # Follow the path forward by keeping the direction of the previous increment
+            direction = 1.
+            if previous_increment is not None and numpy.dot(tangent_displacements, previous_increment) < 0:
+                direction = -1.
+            load_factor_increment = direction * arc_length / tangent_norm
+            # If the predictor passes the applied load, finish the path with a load controlled step
+            if load_factor + load_factor_increment >= 1:
+                current_load = numpy.array(self.applied_load, dtype=float)
+                self.global_external_force_array(current_load)
+                self.rearrange_global_external_force_array()
+                self.unknown_displacements = (1 - load_factor) * tangent_displacements
+                self.update_current_configuration()
+                self.newton_iterations.append(self.newton_corrector())
+                self.converged_displacements.append(self.total_unknown_displacements())
+                self.record_load_step(current_load)
+                break
+            # Predictor along the tangent
+            displacement_increment = load_factor_increment * tangent_displacements
+            self.unknown_displacements = displacement_increment.copy()
+            try:
+                self.update_current_configuration()
+                iteration_quantity = 0
+                while True:
+                    # Residual for the trial load factor
+                    self.rearrange_global()
+                    upper_internal_force_array = self.internal_force_array[:self.unknown_displacement_quantity]
+                    residual = self.calculate_residual(
+                        external_force_array=(load_factor + load_factor_increment) * reference_external_force_array,
+                        internal_force_array=upper_internal_force_array)
+                    if abs(residual.flat[abs(residual).argmax()]) <= tolerance:
+                        break
+                    if iteration_quantity == constants.ARC_LENGTH_MAXIMUM_ITERATIONS:
+                        raise exceptions.NewtonMethodMaxIterationsExceededError(
+                            iterations=iteration_quantity,
+                            error=abs(residual.flat[abs(residual).argmax()]),
+                            tolerance=tolerance)
+                    # Bordered solve: both right hand sides share one factorization of the stiffness matrix
+                    upper_stiffness_matrix = self.stiffness_matrix[:self.unknown_displacement_quantity,
+                                             :self.unknown_displacement_quantity]
+                    self.linear_solver.factorize(upper_stiffness_matrix)
+                    residual_displacements, load_displacements = self.linear_solver.solve(
+                        numpy.column_stack((residual, reference_external_force_array))).T
+                    # Keep the correction on the plane normal to the current increment
+                    load_factor_correction = (-numpy.dot(displacement_increment, residual_displacements)
+                                              / numpy.dot(displacement_increment, load_displacements))
+                    self.unknown_displacements = residual_displacements + load_factor_correction * load_displacements
+                    displacement_increment += self.unknown_displacements
+                    load_factor_increment += load_factor_correction
+                    self.update_current_configuration()
+                    iteration_quantity += 1
+            except (exceptions.JacobianNegativeError, exceptions.NewtonMethodMaxIterationsExceededError):
+                # Restart the step from the converged configuration with a shorter arc length
+                self.restore_configuration(converged_configuration)
+                arc_length *= .5
+                if arc_length < minimum_arc_length:
+                    raise
+                continue
+            if load_factor + load_factor_increment > 1:
+                # The corrected step passes the applied load. Redo it from the converged configuration with the arc
+                # length shortened in proportion, until the predictor reaches the applied load and the path is
+                # finished exactly at it by the load controlled step.
+                self.restore_configuration(converged_configuration)
+                arc_length *= (1 - load_factor) / load_factor_increment
+                continue
+            # Accept the step
+            load_factor += load_factor_increment
+            previous_increment = displacement_increment
+            step_index += 1
+            self.newton_iterations.append(iteration_quantity)
+            self.converged_displacements.append(self.total_unknown_displacements())
+            self.record_load_step(load_factor * numpy.array(self.applied_load, dtype=float))
+            # Adapt the arc length to the number of iterations this step needed
+            scale = numpy.sqrt(constants.ARC_LENGTH_DESIRED_ITERATIONS / max(iteration_quantity, 1))
+            arc_length *= min(max(scale, .5), constants.ARC_LENGTH_MAXIMUM_GROWTH)
+            self.save_checkpoint('arc_length', step_index, {'load_factor': load_factor,
+                                                            'arc_length': arc_length,
+                                                            'minimum_arc_length': minimum_arc_length,
+                                                            'previous_increment': previous_increment})
+
     def calculate_node_and_dof_quantities(self):
         """Compute the total number of nodes, the total number of global degrees of freedom, and the total number of
         prescribed degrees of freedom."""
         self.node_quantity = len(self.nodes)
         self.element_quantity = len(self.elements)
         self.global_dof_quantity = self.node_quantity * self.degrees_of_freedom
+        if self.mesh_tables is not None:
+            # The degree of freedom maps were saved with the mesh
+            self.known_displacements = numpy.array(self.mesh_tables['known_displacements'], dtype=float)
+            self.known_displacement_quantity = self.known_displacements.size
+            self.unknown_displacement_quantity = self.global_dof_quantity - self.known_displacement_quantity
+            self.unknown_displacements = numpy.zeros(self.unknown_displacement_quantity)
+            self.unknown_dof_indices = numpy.array(self.mesh_tables['unknown_dof_indices'], dtype=int)
+            return
         # Create array of known displacements
         known_displacements = []
         for node_id in self.prescribed_displacements:
@@ -104,6 +358,13 @@ class Model:
         self.known_displacement_quantity = self.known_displacements.size
         self.unknown_displacement_quantity = self.global_dof_quantity - self.known_displacement_quantity
         self.unknown_displacements = numpy.array([0] * self.unknown_displacement_quantity)
+        # Global indices of the unknown degrees of freedom, in the order of the unknown displacements
+        unknown_dof_indices = []
+        for node in self.nodes:
+            for dof_index in range(self.degrees_of_freedom):
+                if node.prescribed_displacements[dof_index] is None:
+                    unknown_dof_indices.append(self.degrees_of_freedom * node.global_id + dof_index)
+        self.unknown_dof_indices = numpy.array(sorted(unknown_dof_indices), dtype=int)
 
     @staticmethod
     def calculate_residual(external_force_array, internal_force_array):
@@ -117,13 +378,15 @@ class Model:
         return residual
 
     def create_connectivity_table(self):
-        """Create connectivity table using Delaunay triangulation to connects nodes to elements."""
-        delaunay_triangulation = Delaunay(self.node_reference_positions_2d)
-        simplices = delaunay_triangulation.simplices.copy()
+        """Create connectivity table using Delaunay triangulation to connects nodes to elements, unless the
+        connectivity table was given."""
+        if self.connectivity_table is not None:
+            simplices = numpy.asarray(self.connectivity_table, dtype=int)[:, :3]
+        else:
+            delaunay_triangulation = Delaunay(self.node_reference_positions_2d)
+            simplices = delaunay_triangulation.simplices
         # Sort simplices by node ID
-        for node_set in simplices:
-            node_set.sort()
-        self.connectivity_table = simplices
+        self.connectivity_table = numpy.sort(simplices, axis=1)
 
     def create_corner_nodes(self):
         """Create corner nodes and add to the model."""
@@ -154,6 +417,41 @@ class Model:
         if self.element_type is elements.TriangularQuadraticElement:
             self.create_midpoint_nodes()
 
+    def create_mesh_from_tables(self, mesh_tables):
+        """Create the nodes, connectivity table, and elements of the model from the preprocessed mesh arrays of a model
+        on the same mesh (see preprocessing_tables), already renumbered.
+
+        :param dict mesh_tables: preprocessed mesh arrays
+        """
+        prescribed_displacements = mesh_tables['prescribed_displacements']
+        corner_node_flags = mesh_tables['corner_node_flags']
+        node_renumbering = mesh_tables.get('node_renumbering')
+        for global_id, reference_position in enumerate(mesh_tables['node_reference_positions']):
+            # Prescribed displacements are saved as NaN for the unknown degrees of freedom
+            node_prescribed_displacements = [None if numpy.isnan(displacement) else float(displacement)
+                                             for displacement in prescribed_displacements[global_id]]
+            node_class = nodes.CornerNode if corner_node_flags[global_id] else nodes.MidpointNode
+            self.nodes.append(node_class(global_id=global_id,
+                                         reference_position=numpy.array(reference_position, dtype=float),
+                                         prescribed_displacements=node_prescribed_displacements))
+        # Add the midpoint nodes to the prescribed displacements by the IDs they were created with, as
+        # create_midpoint_nodes does
+        for node_id in range(self.corner_node_quantity, len(self.nodes)):
+            global_id = node_id if node_renumbering is None else node_renumbering[node_id]
+            self.prescribed_displacements[node_id] = self.nodes[global_id].prescribed_displacements
+        for element_node_ids in mesh_tables['element_node_ids']:
+            element = self.element_type(constitutive_model=self.constitutive_model,
+                                        material=self.material,
+                                        quadrature_class=self.quadrature_class,
+                                        degrees_of_freedom=self.degrees_of_freedom,
+                                        thickness=self.membrane_thickness)
+            for global_id in element_node_ids:
+                element.nodes.append(self.nodes[global_id])
+            self.elements.append(element)
+        self.connectivity_table = mesh_tables['connectivity_table']
+        if node_renumbering is not None:
+            self.node_renumbering = numpy.array(node_renumbering, dtype=int)
+
     def create_midpoint_nodes(self):
         """Create midpoint nodes for quadratic elements."""
         # Set global ID to corner node quantity so unique IDs can be assigned to new nodes
@@ -210,6 +508,13 @@ class Model:
         for element in self.elements:
             element.create_quadrature_points()
 
+    def current_node_positions(self):
+        """Return an array of the current positions of all nodes, indexed by global ID."""
+        node_positions = numpy.zeros((self.node_quantity, 3))
+        for node in self.nodes:
+            node_positions[node.global_id] = node.current_position
+        return node_positions
+
     def displacement_solver(self):
         """Solve for the deformation of the body based on the applied prescribed displacements. Uses the Newton-Raphson
         method to increment the deformation and iteratively solve the unknown displacements at each node for each step.
@@ -249,18 +554,144 @@ class Model:
                 residual = self.calculate_residual(external_force_array=upper_external_force_array,
                                                    internal_force_array=upper_internal_force_array)
                 # Solve for the unknown displacements u = K^-1*(residual)
-                stiffness_matrix_inverse = numpy.linalg.inv(upper_stiffness_matrix)
-                self.unknown_displacements = numpy.dot(stiffness_matrix_inverse, residual)
+                self.linear_solver.factorize(upper_stiffness_matrix)
+                self.unknown_displacements = self.linear_solver.solve(residual)
                 # Update model configuration for the new displacements
                 self.update_current_configuration()
             # Update the membrane plot
             self.update_plot()
 
+    def domain_decomposition_solver(self):
+        """Solve for the deformation of the body based on the applied loading with Newton's method, as in the loading
+        solver, but with the mesh split into subdomains that are updated, assembled, and condensed to their interfaces
+        in parallel worker processes (see substructuring.py). Only the interface problem is solved by this process,
+        and no global stiffness matrix is formed.
+        """
+        # Initialize the load as a zero vector
+        current_load = numpy.array([0] * self.degrees_of_freedom, dtype=float)
+        # Initialize small random displacements for the unknown degrees of freedom
+        self.apply_initial_perturbation(update=False)
+        node_positions = self.current_node_positions()
+        # Flat view of the node positions, indexed by global degree of freedom
+        positions = node_positions.reshape(-1)
+        with substructuring.SubdomainPool(self, self.subdomain_quantity) as pool:
+            for load_step_index in range(self.step_quantity):
+                print('Progress:', load_step_index / self.step_quantity * 100, '%')
+                # Increment the current load
+                current_load += self.load_step
+                # External force in the configuration at the start of the step, as in the loading solver
+                pool.set_external_force(node_positions, current_load, self.balloon_internal_pressure)
+                # Newton-Raphson iterations on the condensed interface problem
+                iteration_quantity = 0
+                while pool.update(node_positions) > constants.NEWTON_METHOD_TOLERANCE:
+                    positions += pool.solve()
+                    iteration_quantity += 1
+                self.newton_iterations.append(iteration_quantity)
+                self.strain_energy = pool.strain_energy
+                # Copy the converged configuration to the nodes
+                for node in self.nodes:
+                    node.current_position = node_positions[node.global_id].copy()
+                # Save the maximum deflection and load size, and update the plot
+                self.record_load_step(current_load)
+            # Save the stretch ratios of the converged configuration to the quadrature points
+            self.set_quadrature_point_stretch_ratios(pool.stretch_ratios(self.element_quantity))
+
+    def dynamic_relaxation_masses(self, block, node_positions):
+        """Compute the fictitious lumped masses for dynamic relaxation in the current configuration. The mass of each
+        node bounds the largest eigenvalue of the stiffness matrix by the Gershgorin row sums of the element stiffness
+        matrices, which keeps the explicit integration with a unit time step stable. The element matrices are computed
+        in chunks and never assembled.
+
+        :param block: vectorized element block of the model
+        :param numpy.ndarray node_positions: current positions of all nodes, indexed by global ID
+        """
+        row_sums = numpy.zeros(self.global_dof_quantity)
+        for start in range(0, block.element_quantity, constants.ELEMENT_CHUNK_SIZE):
+            chunk = block.chunk(start, start + constants.ELEMENT_CHUNK_SIZE)
+            chunk.update(node_positions)
+            row_sums += vectorized.assemble_force_array(numpy.abs(chunk.stiffness_matrices).sum(axis=(3, 4)),
+                                                        chunk.element_dof_indices(), self.global_dof_quantity)
+        # Use the same mass for all degrees of freedom of a node
+        node_row_sums = row_sums.reshape((self.node_quantity, 3)).max(axis=1)
+        return numpy.repeat(constants.DYNAMIC_RELAXATION_MASS_FACTOR * node_row_sums, 3)
+
+    def dynamic_relaxation_solver(self):
+        """Solve for the deformation of the body based on the applied loading with dynamic relaxation. The load is
+        incremented as in the loading solver, and each load step is relaxed to equilibrium by explicit pseudo-time
+        integration of a fictitious dynamic system, using only internal force evaluations. Kinetic damping removes the
+        energy of the system at each peak of the kinetic energy, and the step has converged when the residual meets the
+        same tolerance as the Newton-Raphson solvers.
+
+        The element computations run on the vectorized element block, so memory grows linearly with the mesh size and
+        no global stiffness matrix is formed.
+        """
+        # Initialize the load as a zero vector
+        current_load = numpy.array([0] * self.degrees_of_freedom, dtype=float)
+        # Initialize small random displacements for the unknown degrees of freedom
+        self.apply_initial_perturbation(update=False)
+        block = vectorized.ElementBlock.from_model(self)
+        element_dof_indices = block.element_dof_indices()
+        node_positions = self.current_node_positions()
+        # Flat view of the node positions, indexed by global degree of freedom
+        positions = node_positions.reshape(-1)
+        for load_step_index in range(self.step_quantity):
+            print('Progress:', load_step_index / self.step_quantity * 100, '%')
+            # Increment the current load
+            current_load += self.load_step
+            # External force in the configuration at the start of the step, as in the loading solver
+            external_force_array = vectorized.assemble_force_array(
+                block.external_force_arrays(node_positions, current_load, self.balloon_internal_pressure),
+                element_dof_indices, self.global_dof_quantity)[self.unknown_dof_indices]
+            masses = self.dynamic_relaxation_masses(block, node_positions)[self.unknown_dof_indices]
+            velocities = numpy.zeros(self.unknown_displacement_quantity)
+            kinetic_energy = 0.
+            iteration_quantity = 0
+            while True:
+                block.update(node_positions, stiffness=False)
+                internal_force_array = vectorized.assemble_force_array(
+                    block.internal_force_arrays, element_dof_indices, self.global_dof_quantity)
+                residual = self.calculate_residual(external_force_array=external_force_array,
+                                                   internal_force_array=internal_force_array[self.unknown_dof_indices])
+                # Check for equilibrium with the residual norm used by the Newton-Raphson solvers
+                error = abs(residual.flat[abs(residual).argmax()])
+                if error <= constants.NEWTON_METHOD_TOLERANCE:
+                    break
+                if iteration_quantity == constants.DYNAMIC_RELAXATION_MAXIMUM_ITERATIONS:
+                    raise exceptions.DynamicRelaxationMaxIterationsExceededError(
+                        iterations=iteration_quantity, error=error, tolerance=constants.NEWTON_METHOD_TOLERANCE)
+                iteration_quantity += 1
+                # Explicit central difference step with a unit time step
+                new_velocities = velocities + residual / masses
+                new_kinetic_energy = .5 * numpy.dot(masses, new_velocities ** 2)
+                if new_kinetic_energy <= kinetic_energy:
+                    # Kinetic damping: move back to the kinetic energy peak, which lies between the last two steps,
+                    # and restart from rest with masses for the stiffness of the new configuration
+                    positions[self.unknown_dof_indices] += -.5 * new_velocities + .5 * residual / masses
+                    velocities = numpy.zeros(self.unknown_displacement_quantity)
+                    kinetic_energy = 0.
+                    masses = self.dynamic_relaxation_masses(block, node_positions)[self.unknown_dof_indices]
+                    continue
+                velocities = new_velocities
+                kinetic_energy = new_kinetic_energy
+                positions[self.unknown_dof_indices] += velocities
+            self.relaxation_iterations.append(iteration_quantity)
+            # Copy the relaxed configuration to the nodes
+            for node in self.nodes:
+                node.current_position = node_positions[node.global_id].copy()
+            # Save the maximum deflection and load size, and update the plot
+            self.record_load_step(current_load)
+        # Save the stretch ratios of the relaxed configuration to the quadrature points
+        self.set_quadrature_point_stretch_ratios(block.stretch_ratios)
+
     def global_external_force_array(self, current_load):
         """Update the elements, then assemble and unroll the global external force array from the current load.
 
         :param current_load: current magnitude of the applied transverse load
         """
+        if self.element_engine is not None:
+            self.external_force_array = self.element_engine.external_force_array(
+                self.current_node_positions(), current_load, self.balloon_internal_pressure)
+            return
         # Update the external force array for the elements
         for element in self.elements:
             element.update_external_force_array(current_load, self.balloon_internal_pressure)
@@ -336,25 +767,65 @@ class Model:
             strain_energy += element.strain_energy
         self.strain_energy = strain_energy
 
+    def input_numbering(self, node_quantities):
+        """Return an array of node quantities indexed by global ID (such as current_node_positions) reordered to
+        be indexed by the IDs the nodes were created with, before they were renumbered.
+
+        :param numpy.ndarray node_quantities: array with one entry per node, indexed by global ID
+        """
+        if self.node_renumbering is None:
+            return node_quantities
+        return node_quantities[self.node_renumbering]
+
+    def load_checkpoint(self, solver):
+        """Restore the configuration and results saved in the restart checkpoint, and return the saved state of the
+        solver as a dictionary of arrays.
+
+        :param str solver: name of the solver that is resuming, which must match the solver that saved the checkpoint
+        """
+        with numpy.load(self.restart_path) as checkpoint:
+            state = {name: checkpoint[name] for name in checkpoint.files}
+        if str(state['solver']) != solver:
+            raise exceptions.CheckpointMismatchError(checkpoint_path=self.restart_path,
+                                                     reason='it was saved by the ' + str(state['solver']) + ' solver')
+        stretch_ratios_shape = self.quadrature_point_stretch_ratios().shape
+        if (state['node_positions'].shape != (self.node_quantity, 3)
+                or state['stretch_ratios'].shape != stretch_ratios_shape
+                or state['converged_displacements'].shape[1] != self.unknown_displacement_quantity):
+            raise exceptions.CheckpointMismatchError(checkpoint_path=self.restart_path,
+                                                     reason='it was saved for a different mesh')
+        self.restore_configuration({'node_positions': state['node_positions'],
+                                    'stretch_ratios': state['stretch_ratios']})
+        self.load_steps = state['load_steps'].tolist()
+        self.maximum_deflections = state['maximum_deflections'].tolist()
+        self.newton_iterations = state['newton_iterations'].tolist()
+        self.converged_displacements = list(state['converged_displacements'])
+        return state
+
     def loading_solver(self):
         """Solve for the deformation of the body based on the applied loading. Uses the Newton-Raphson method to
         increment the external loading and iteratively solve the unknown displacements at each node for each step.
         """
         # Initialize the load as a zero vector
         current_load = numpy.array([0] * self.degrees_of_freedom, dtype=float)
-        # Initialize small random displacements for the unknown degrees of freedom
-        # Perturb unconstrained nodes in the 3 direction
-        for node in self.nodes:
-            if node.prescribed_displacements[2] is None:
-                node.current_position[2] += -1e-3 * (
-                    numpy.sin(numpy.pi * node.current_position[0] / self.membrane_side_length)
-                    * numpy.sin(numpy.pi * node.current_position[1] / self.membrane_side_length))
-        # Update the configuration of the model to calculate the global strain energy, internal force, and stiffness
-        # associated with the small random displacements
-        self.update_current_configuration()
-        self.update_plot()
+        first_step_index = 0
+        if self.restart_path is not None:
+            # Resume from the checkpoint, dividing the remaining load into the remaining load steps
+            state = self.load_checkpoint('loading')
+            current_load = state['current_load']
+            first_step_index = int(state['step_index'])
+            applied_load = numpy.array(self.applied_load, dtype=float)
+            # A checkpoint that has reached the applied load has no load left to divide into the remaining steps
+            if first_step_index >= self.step_quantity or numpy.allclose(
+                    current_load, applied_load, rtol=0,
+                    atol=constants.FLOATING_POINT_TOLERANCE * abs(applied_load).max(initial=0)):
+                return
+            self.load_step = (applied_load - current_load) / (self.step_quantity - first_step_index)
+        else:
+            # Initialize small random displacements for the unknown degrees of freedom
+            self.apply_initial_perturbation()
         # Increment load up to total applied load
-        for load_step_index in range(self.step_quantity):
+        for load_step_index in range(first_step_index, self.step_quantity):
             print('Progress:', load_step_index / self.step_quantity * 100, '%')
             # Increment the current load
             current_load += self.load_step
@@ -362,37 +833,47 @@ class Model:
             self.global_external_force_array(current_load)
             # Rearrange global external force array to move prescribed degrees of freedom to the end
             self.rearrange_global_external_force_array()
-            # Initialize residual to be large
-            residual = numpy.array([float('inf')] * self.degrees_of_freedom, dtype=float)
-            # Loop until the residual is within tolerance of 0
-            while abs(residual.flat[abs(residual).argmax()]) > constants.NEWTON_METHOD_TOLERANCE:
-                # Rearrange global internal force and stiffness matrix to move prescribe degrees of freedom to the end
-                self.rearrange_global()
-                # Only work with "upper" equations to calculate the residual
-                upper_external_force_array = self.external_force_array[:self.unknown_displacement_quantity]
-                upper_internal_force_array = self.internal_force_array[:self.unknown_displacement_quantity]
-                upper_stiffness_matrix = self.stiffness_matrix[:self.unknown_displacement_quantity,
-                                         :self.unknown_displacement_quantity]
-                residual = self.calculate_residual(external_force_array=upper_external_force_array,
-                                                   internal_force_array=upper_internal_force_array)
-                # Solve for the unknown displacements u = K^-1*(residual)
-                stiffness_matrix_inverse = numpy.linalg.inv(upper_stiffness_matrix)
-                self.unknown_displacements = numpy.dot(stiffness_matrix_inverse, residual)
-                # Update model configuration for the new displacements
-                self.update_current_configuration()
-            # Save the maximum deflection in the transverse direction and the load size
-            max_deflection = 0
-            for node in self.nodes:
-                node_deflection = abs(node.current_position[2])
-                if node_deflection > max_deflection:
-                    max_deflection = node_deflection
-            self.maximum_deflections.append(max_deflection)
-            self.load_steps.append(abs(current_load[2]))
-            # Update the membrane plot
-            self.update_plot()
+            # Move the model to the predicted configuration for this load step
+            self.predict_displacements(load_step_index, current_load)
+            # Iterate to equilibrium
+            self.newton_iterations.append(self.newton_corrector())
+            # Save the converged unknown displacements for the predictor of the next load step
+            self.converged_displacements.append(self.total_unknown_displacements())
+            # Save the maximum deflection and load size, and update the plot
+            self.record_load_step(current_load)
+            self.save_checkpoint('loading', load_step_index + 1, {'current_load': current_load})
+
+    def newton_corrector(self):
+        """Iterate on the unknown displacements with the Newton-Raphson method until the residual for the current
+        external force array is within tolerance of 0, and return the number of iterations performed. The external
+        force array must already be rearranged."""
+        # Initialize residual to be large
+        residual = numpy.array([float('inf')] * self.degrees_of_freedom, dtype=float)
+        # Counter for the corrector iterations
+        iteration_quantity = 0
+        # Loop until the residual is within tolerance of 0
+        while abs(residual.flat[abs(residual).argmax()]) > constants.NEWTON_METHOD_TOLERANCE:
+            # Rearrange global internal force and stiffness matrix to move prescribe degrees of freedom to the end
+            self.rearrange_global()
+            # Only work with "upper" equations to calculate the residual
+            upper_external_force_array = self.external_force_array[:self.unknown_displacement_quantity]
+            upper_internal_force_array = self.internal_force_array[:self.unknown_displacement_quantity]
+            upper_stiffness_matrix = self.stiffness_matrix[:self.unknown_displacement_quantity,
+                                     :self.unknown_displacement_quantity]
+            residual = self.calculate_residual(external_force_array=upper_external_force_array,
+                                               internal_force_array=upper_internal_force_array)
+            # Solve for the unknown displacements u = K^-1*(residual), keeping the factorization for the predictor
+            self.linear_solver.factorize(upper_stiffness_matrix)
+            self.unknown_displacements = self.linear_solver.solve(residual)
+            # Update model configuration for the new displacements
+            self.update_current_configuration()
+            iteration_quantity += 1
+        return iteration_quantity
 
     def output_results(self):
         """Provide output data at end of analysis."""
+        if not self.plot:
+            return
         # Plot maximum deflection vs. load step
         plt.figure(2)
         plt.plot(self.load_steps, self.maximum_deflections)
@@ -409,10 +890,150 @@ class Model:
         plt.ylabel('Stretch Ratio')
         plt.show()
 
+    def predict_displacements(self, load_step_index, current_load):
+        """Move the unknown degrees of freedom to the predicted configuration for the current load step, which is
+        used as the initial guess for Newton's method. Must be called after the external force array for the current
+        load has been computed and rearranged.
+
+        The secant predictor extrapolates linearly from the last two converged solutions, scaled by the ratio of the
+        current load step to the last one. The tangent (Euler) predictor solves for the displacement increment caused
+        by the load step using the stiffness matrix that was last factorized, so it does not require a new
+        factorization. A warm start moves the model to the converged solution of a similar analysis at the same load
+        step instead. If the elements cannot be updated for the predicted configuration, the model is returned to the
+        converged configuration and the step starts from it.
+
+        :param int load_step_index: index of the current load step
+        :param numpy.ndarray current_load: load vector of the current load step
+        """
+        if self.warm_start_displacements is not None and load_step_index < len(self.warm_start_displacements):
+            self.unknown_displacements = (self.warm_start_displacements[load_step_index]
+                                          - self.total_unknown_displacements())
+        elif self.predictor is None:
+            return
+        elif self.predictor == constants.SECANT_PREDICTOR:
+            # Extrapolation requires two converged load steps
+            if len(self.converged_displacements) < 2:
+                return
+            # The increment of the last step is scaled to the current load step, which differs from the last one
+            # after a restart with a different number of load steps
+            last_load_increment = self.load_steps[-1] - self.load_steps[-2]
+            if last_load_increment == 0:
+                return
+            self.unknown_displacements = ((self.converged_displacements[-1] - self.converged_displacements[-2])
+                                          * abs(self.load_step[2]) / last_load_increment)
+        elif self.predictor == constants.TANGENT_PREDICTOR:
+            # A factorized stiffness is only available once a load step has converged
+            if self.linear_solver.stiffness_matrix is None:
+                return
+            # The external force is linear in the load for a fixed configuration, and the load step is parallel to
+            # the current load, so the force increment is the fraction of the current external force added by the
+            # load step
+            upper_external_force_array = self.external_force_array[:self.unknown_displacement_quantity]
+            external_force_increment = upper_external_force_array * (numpy.linalg.norm(self.load_step)
+                                                                     / numpy.linalg.norm(current_load))
+            self.unknown_displacements = self.linear_solver.solve(external_force_increment)
+        else:
+            raise exceptions.InvalidPredictorError(predictor=self.predictor)
+        # Update model configuration for the predicted displacements, returning to the converged configuration if
+        # the prediction is too far off for the elements to be updated
+        converged_configuration = self.store_configuration()
+        try:
+            self.update_current_configuration()
+        except (exceptions.JacobianNegativeError, exceptions.NewtonMethodMaxIterationsExceededError):
+            self.restore_configuration(converged_configuration)
+
+    def prepare(self):
+        """Create the mesh, number the degrees of freedom, and create the quadrature points, which do not depend on the
+        load. With a mesh cache, a mesh that was preprocessed before is loaded from the cache, and a new mesh is saved
+        to it."""
+        mesh_key = None
+        if self.mesh_cache is not None:
+            # The key is computed before the mesh is created, which adds the midpoint nodes to the prescribed
+            # displacements of the model
+            mesh_key = self.mesh_cache.key(self)
+            self.mesh_tables = self.mesh_cache.read(mesh_key, mmap_mode='r')
+        if self.mesh_tables is not None:
+            self.create_mesh_from_tables(self.mesh_tables)
+        else:
+            self.create_mesh()
+            if self.renumber_mesh:
+                self.renumber_nodes_and_elements()
+        self.calculate_node_and_dof_quantities()
+        if mesh_key is not None and self.mesh_tables is None:
+            self.mesh_tables = self.preprocessing_tables()
+            self.mesh_cache.write(mesh_key, self.mesh_tables)
+        self.linear_solver.prepare(self)
+        # An out-of-core element engine keeps the quadrature point state of the elements in its files instead
+        if self.element_engine is None or not self.element_engine.out_of_core:
+            self.create_quadrature_points()
+        if self.element_engine is not None:
+            self.element_engine.prepare(self)
+
+    def preprocessing_tables(self):
+        """Return the preprocessed mesh as a dictionary of arrays, which create_mesh_from_tables turns back into the
+        mesh: the nodes, the connectivity, the degree of freedom maps, the reference geometry of the elements, the
+        element colors, and the sparsity pattern of the stiffness matrix. Must be called after the degrees of freedom
+        are numbered."""
+        node_reference_positions = numpy.zeros((self.node_quantity, 3))
+        prescribed_displacements = numpy.full((self.node_quantity, self.degrees_of_freedom), numpy.nan)
+        corner_node_flags = numpy.zeros(self.node_quantity, dtype=bool)
+        for node in self.nodes:
+            node_reference_positions[node.global_id] = node.reference_position
+            prescribed_displacements[node.global_id] = [numpy.nan if displacement is None else displacement
+                                                        for displacement in node.prescribed_displacements]
+            corner_node_flags[node.global_id] = isinstance(node, nodes.CornerNode)
+        element_node_ids = numpy.array([[node.global_id for node in element.nodes] for element in self.elements],
+                                       dtype=int)
+        mesh_tables = {'node_reference_positions': node_reference_positions,
+                       'prescribed_displacements': prescribed_displacements,
+                       'corner_node_flags': corner_node_flags,
+                       'element_node_ids': element_node_ids,
+                       'connectivity_table': numpy.asarray(self.connectivity_table, dtype=int),
+                       'known_displacements': self.known_displacements,
+                       'unknown_dof_indices': self.unknown_dof_indices,
+                       'element_colors': renumbering.element_colors(self.connectivity_table)}
+        if self.node_renumbering is not None:
+            mesh_tables['node_renumbering'] = self.node_renumbering
+        # Reference geometry of the elements, as computed by the element blocks of the element engines
+        element_quantity = len(element_node_ids)
+        block = vectorized.ElementBlock(element_type=self.element_type,
+                                        constitutive_model=self.constitutive_model,
+                                        quadrature_class=self.quadrature_class,
+                                        connectivity=element_node_ids,
+                                        node_reference_positions=node_reference_positions,
+                                        first_lame_parameters=numpy.zeros(element_quantity),
+                                        shear_moduli=numpy.zeros(element_quantity),
+                                        thicknesses=numpy.zeros(element_quantity))
+        mesh_tables['reference_basis_contravariant'] = block.reference_basis_contravariant
+        mesh_tables['reference_differential_areas'] = block.reference_differential_areas
+        (mesh_tables['row_pointers'], mesh_tables['column_indices'],
+         mesh_tables['data_indices']) = vectorized.sparse_pattern(block.element_dof_indices(),
+                                                                  self.global_dof_quantity)
+        return mesh_tables
+
+    def quadrature_point_stretch_ratios(self):
+        """Return a copy of the thickness stretch ratios of all quadrature points, shaped (element, quadrature
+        point)."""
+        if self.element_engine is not None:
+            return self.element_engine.block.stretch_ratios.copy()
+        return numpy.array([[quadrature_point.stretch_ratio for quadrature_point in element.quadrature_points]
+                            for element in self.elements], dtype=float)
+
     def rearrange_global(self):
         """Rearrange global quantities such that the rows and columns containing prescribed (known) degrees of
         freedom are moved to the end. We do this so the unknown degrees of freedom will be together on top so that
-        they can be solved all at once."""
+        they can be solved all at once. The global quantities are only rearranged once after each update."""
+        if self.global_rearranged:
+            return
+        self.global_rearranged = True
+        if scipy.sparse.issparse(self.stiffness_matrix):
+            # The rows and columns of a sparse stiffness matrix are permuted at once, with the unknown degrees of
+            # freedom first and the prescribed ones after them, each in their original order
+            order = numpy.concatenate((self.unknown_dof_indices, numpy.setdiff1d(
+                numpy.arange(self.global_dof_quantity), self.unknown_dof_indices)))
+            self.internal_force_array = self.internal_force_array[order]
+            self.stiffness_matrix = self.stiffness_matrix[order][:, order]
+            return
         # Counter for how many row/columns have been moved
         moved_entries_quantity = 0
         for node in self.nodes:
@@ -470,22 +1091,145 @@ class Model:
                     # Increment moved entries counter
                     moved_entries_quantity += 1
 
+    def record_load_step(self, current_load):
+        """Save the maximum deflection in the transverse direction and the load size for a converged load step, and
+        update the membrane plot.
+
+        :param numpy.ndarray current_load: load vector at which the step converged
+        """
+        max_deflection = 0
+        for node in self.nodes:
+            node_deflection = abs(node.current_position[2])
+            if node_deflection > max_deflection:
+                max_deflection = node_deflection
+        self.maximum_deflections.append(float(max_deflection))
+        self.load_steps.append(float(abs(current_load[2])))
+        # Update the membrane plot
+        self.update_plot()
+        if self.step_callback is not None:
+            self.step_callback(self)
+
+    def renumber_nodes_and_elements(self):
+        """Order the elements along a Hilbert curve through their centroids so neighboring elements are processed
+        together, and renumber the nodes in reverse Cuthill-McKee order so the stiffness matrix has a narrow band.
+        Must be called after the mesh is created, while the global IDs are still the IDs the nodes were created with.
+        """
+        # Order the elements by the 2D centroids of their corner nodes
+        corner_ids = numpy.array([[node.global_id for node in element.nodes[:3]] for element in self.elements])
+        centroids = numpy.asarray(self.node_reference_positions_2d)[corner_ids].mean(axis=1)
+        element_order = numpy.argsort(renumbering.hilbert_curve_indices(centroids), kind='stable')
+        self.elements = [self.elements[element_index] for element_index in element_order]
+        # Renumber the nodes for the connectivity of the ordered elements
+        element_node_ids = numpy.array([[node.global_id for node in element.nodes] for element in self.elements])
+        node_order = renumbering.reverse_cuthill_mckee_order(element_node_ids, len(self.nodes))
+        self.node_renumbering = numpy.empty(len(self.nodes), dtype=int)
+        self.node_renumbering[node_order] = numpy.arange(len(self.nodes))
+        # Keep the node list sorted by global ID
+        self.nodes = [self.nodes[global_id] for global_id in node_order]
+        for global_id, node in enumerate(self.nodes):
+            node.global_id = global_id
+        self.connectivity_table = self.node_renumbering[self.connectivity_table[element_order]]
+
+    def restore_configuration(self, configuration):
+        """Restore the node positions and quadrature point stretch ratios saved by store_configuration, and update the
+        model for the restored configuration.
+
+        :param dict configuration: configuration returned by store_configuration
+        """
+        for node, current_position in zip(self.nodes, configuration['node_positions']):
+            node.current_position = current_position.copy()
+        self.set_quadrature_point_stretch_ratios(configuration['stretch_ratios'])
+        # Update the model without moving any nodes
+        self.unknown_displacements = numpy.zeros(self.unknown_displacement_quantity)
+        self.update_current_configuration()
+
     def run(self):
         """Run the analysis."""
-        self.create_mesh()
-        self.calculate_node_and_dof_quantities()
-        self.create_quadrature_points()
+        self.prepare()
+        self.run_solver()
+
+    def run_solver(self):
+        """Solve the problem of the prepared model with the selected solver, and output the results."""
         if self.solve_loading_problem:
             self.loading_solver()
         elif self.solve_displacement_problem:
             self.displacement_solver()
+        elif self.solve_arc_length_problem:
+            self.arc_length_solver()
+        elif self.solve_dynamic_relaxation_problem:
+            self.dynamic_relaxation_solver()
+        elif self.solve_domain_decomposition_problem:
+            self.domain_decomposition_solver()
+        if self.element_engine is not None:
+            # Save the stretch ratios of the element engine to the quadrature points
+            self.set_quadrature_point_stretch_ratios(self.element_engine.block.stretch_ratios)
         self.output_results()
 
+    def save_checkpoint(self, solver, step_index, solver_state):
+        """Save the configuration, results, and solver state to the checkpoint file after a converged step, if
+        checkpoints are saved and the step is at the checkpoint interval. The checkpoint is written to a temporary file
+        first, so the last checkpoint survives a failure while writing.
+
+        :param str solver: name of the solver
+        :param int step_index: number of steps converged so far
+        :param dict solver_state: arrays of the state of the solver needed to resume it
+        """
+        if self.checkpoint_path is None or step_index % self.checkpoint_interval != 0:
+            return
+        checkpoint = dict(solver_state,
+                          solver=numpy.array(solver),
+                          step_index=numpy.array(step_index),
+                          node_positions=self.current_node_positions(),
+                          stretch_ratios=self.quadrature_point_stretch_ratios(),
+                          load_steps=numpy.array(self.load_steps, dtype=float),
+                          maximum_deflections=numpy.array(self.maximum_deflections, dtype=float),
+                          newton_iterations=numpy.array(self.newton_iterations, dtype=int),
+                          converged_displacements=numpy.array(self.converged_displacements, dtype=float).reshape(
+                              -1, self.unknown_displacement_quantity))
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.checkpoint_path)), suffix='.npz')
+        with os.fdopen(file_descriptor, 'wb') as checkpoint_file:
+            numpy.savez(checkpoint_file, **checkpoint)
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def set_quadrature_point_stretch_ratios(self, stretch_ratios):
+        """Set the thickness stretch ratios of all quadrature points, and of the element engine if there is one.
+
+        :param numpy.ndarray stretch_ratios: stretch ratios shaped (element, quadrature point)
+        """
+        for element_index, element in enumerate(self.elements):
+            for point_index, quadrature_point in enumerate(element.quadrature_points):
+                quadrature_point.stretch_ratio = stretch_ratios[element_index][point_index]
+        if self.element_engine is not None:
+            self.element_engine.block.stretch_ratios[...] = stretch_ratios
+
+    def store_configuration(self):
+        """Return a copy of the node positions and quadrature point stretch ratios that define the current
+        configuration, so it can be restored later."""
+        return {'node_positions': [node.current_position.copy() for node in self.nodes],
+                'stretch_ratios': self.quadrature_point_stretch_ratios()}
+
+    def total_unknown_displacements(self):
+        """Return the total displacements from the reference configuration for the unknown degrees of freedom, in the
+        same order as the unknown displacements."""
+        total_displacements = []
+        for node in self.nodes:
+            for dof_index in range(self.degrees_of_freedom):
+                if node.prescribed_displacements[dof_index] is None:
+                    total_displacements.append(node.current_position[dof_index] - node.reference_position[dof_index])
+        return numpy.array(total_displacements, dtype=float)
+
     def update_current_configuration(self):
         """Update the current configuration of all elements in the model and assemble the global quantities."""
         # Update the current positions of the nodes with the current values for the unknown displacements
         # Start index counter for progress through unknown displacements
         self.update_node_positions()
+        if self.element_engine is not None:
+            # Update the elements and assemble the global quantities with the element engine
+            self.strain_energy, self.internal_force_array, self.stiffness_matrix = self.element_engine.update(
+                self.current_node_positions())
+            self.global_rearranged = False
+            return
         # Update the configuration of the elements (response at quadrature points and integrated element response)
         for element in self.elements:
             element.update_current_configuration()
@@ -497,6 +1241,7 @@ class Model:
         self.global_strain_energy()
         self.global_internal_force_array()
         self.global_stiffness_matrix()
+        self.global_rearranged = False
 
     def update_node_positions(self):
         """Update the current positions of the nodes."""
@@ -511,7 +1256,11 @@ class Model:
                     current_index += 1
 
     def update_plot(self):
-        """Update the 3D plot for the body."""
+        """Update the 3D plot for the body, and give the configuration to the visualization sink."""
+        if self.visualization_sink is not None:
+            self.visualization_sink.update(self)
+        if not self.plot:
+            return
         fig = plt.figure(1)
         plt.cla()
         ax = fig.gca(projection='3d')
@@ -528,3 +1277,76 @@ class Model:
         ax.plot_trisurf(x_positions, y_positions, z_positions, triangles=self.connectivity_table, alpha=.5)
         plt.draw()
         plt.show(block=False)
+
+    def upper_reference_external_force_array(self):
+        """Return the "upper" part of the external force array for the full applied load in the current
+        configuration. The external force array of the model is left rearranged for the full applied load."""
+        self.global_external_force_array(numpy.array(self.applied_load, dtype=float))
+        self.rearrange_global_external_force_array()
+        return self.external_force_array[:self.unknown_displacement_quantity]
+
+
+class PreparedModel(Model):
+    """Finite element model that is prepared once and then solves any number of load cases. Creating the model
+    creates the mesh, degrees of freedom, and quadrature points without solving, and each load case is solved from
+    the reference configuration, so repeated analyses on the same mesh skip the preprocessing.
+
+    Takes the same parameters as Model, which set the defaults of the load cases.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(PreparedModel, self).__init__(*args, **kwargs)
+        # Values of the load case parameters given to the model, which every load case starts from
+        self.load_case_defaults = {parameter: getattr(self, parameter) for parameter in constants.LOAD_CASE_PARAMETERS}
+
+    def reset(self):
+        """Return the model to the reference configuration and clear the results of the last load case."""
+        for node in self.nodes:
+            node.current_position = node.reference_position.copy()
+        self.set_quadrature_point_stretch_ratios(numpy.ones(self.quadrature_point_stretch_ratios().shape))
+        # Global quantities of the last configuration
+        self.unknown_displacements = numpy.zeros(self.unknown_displacement_quantity)
+        self.strain_energy = None
+        self.internal_force_array = None
+        self.external_force_array = None
+        self.stiffness_matrix = None
+        self.global_rearranged = False
+        # The last factorized stiffness belongs to the last load case
+        self.linear_solver.stiffness_matrix = None
+        # Outputs
+        self.converged_displacements = []
+        self.load_steps = []
+        self.maximum_deflections = []
+        self.newton_iterations = []
+        self.relaxation_iterations = []
+
+    def run(self):
+        """Prepare the model without solving a load case."""
+        self.prepare()
+
+    def solve(self, load_case=None):
+        """Solve a load case from the reference configuration. The results are saved as for Model.
+
+        :param dict load_case: values of the parameters of Model in constants.LOAD_CASE_PARAMETERS for this load case.
+        Parameters that are not given take the values the model was created with, so a load case never inherits the
+        parameters of the load case before it. If one of the solve_*_problem parameters is given, the other solvers are
+        not selected
+        """
+        if load_case is None:
+            load_case = {}
+        for parameter in load_case:
+            if parameter not in constants.LOAD_CASE_PARAMETERS:
+                raise exceptions.InvalidLoadCaseError(parameter=parameter)
+        self.reset()
+        for parameter, value in self.load_case_defaults.items():
+            setattr(self, parameter, value)
+        if any(parameter.startswith('solve_') for parameter in load_case):
+            self.solve_loading_problem = False
+            self.solve_displacement_problem = False
+            self.solve_arc_length_problem = False
+            self.solve_dynamic_relaxation_problem = False
+            self.solve_domain_decomposition_problem = False
+        for parameter, value in load_case.items():
+            setattr(self, parameter, value)
+        self.load_step = self.applied_load / self.step_quantity
+        self.run_solver()
@@ -0,0 +1,297 @@
+"""
+multigrid.py contains the multigrid solvers for the stiffness matrix system of each Newton-Raphson iteration.
+
+The stiffness matrix is solved with the conjugate gradient method, preconditioned by one multigrid V-cycle per
+iteration. The V-cycle smooths the error on the fine level with symmetric Gauss-Seidel sweeps, and corrects the smooth
+part of the error on coarser levels, so the number of iterations stays nearly independent of the mesh size. The coarse
+level stiffness matrices are Galerkin products P^T*K*P of the fine level stiffness matrix, where the prolongation P
+interpolates coarse level displacements with the element shape functions.
+
+The coarse levels of MultigridSolver are coarser meshes created by the same generator as the fine mesh. The coarse
+level of PMultigridSolver is the same mesh of quadratic elements restricted to linear displacements (p-multigrid).
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import functools
+
+import numpy
+import scipy.linalg
+import scipy.sparse
+import scipy.sparse.linalg
+from scipy.spatial import cKDTree, Delaunay
+
+import constants
+import elements
+import solvers
+
+
+def coarse_meshes(generator, size_parameter, **parameters):
+    """Create the meshes of the coarse levels of a multigrid hierarchy with the same generator as the fine mesh. The
+    size of each level is half the size of the next finer level (rounded up), so meshes with odd sizes are nested.
+
+    :param generator: mesh generator function from meshes.py
+    :param str size_parameter: name of the integer parameter of the generator that sets the size of the mesh
+    :param parameters: parameters of the generator for the fine mesh
+    :return: list of the coarse meshes, from finest to coarsest
+    """
+    meshes = []
+    size = parameters[size_parameter]
+    while (size + 1) // 2 >= constants.MULTIGRID_COARSEST_SIZE:
+        size = (size + 1) // 2
+        parameters[size_parameter] = size
+        meshes.append(generator(**parameters))
+    return meshes
+
+
+def linear_prolongation_matrix(model):
+    """Return the sparse matrix that interpolates the displacements of the corner nodes of a model with quadratic
+    elements to all of its nodes, with the linear shape functions evaluated at the positions of the quadratic element
+    nodes. Corner nodes are interpolated from themselves and midpoint nodes from the two corner nodes of their edge.
+
+    :param model: model.Model with quadratic elements whose mesh has been created
+    :return: prolongation matrix for the nodes and global IDs of the corner nodes, which index its columns
+    """
+    element_node_ids = numpy.array([[node.global_id for node in element.nodes] for element in model.elements])
+    corner_ids = numpy.unique(element_node_ids[:, :3])
+    # Column of each corner node
+    corner_indices = numpy.zeros(len(model.nodes), dtype=int)
+    corner_indices[corner_ids] = numpy.arange(len(corner_ids))
+    # Value of each linear shape function at each node of the quadratic element
+    natural_positions = numpy.array(elements.TriangularQuadraticElement.node_positions, dtype=float)
+    values = numpy.array([elements.TriangularLinearElement.shape_functions(
+        node_index, (natural_positions[:, 0], natural_positions[:, 1]))
+        for node_index in range(elements.TriangularLinearElement.node_quantity)]).T
+    rows = numpy.repeat(element_node_ids, values.shape[1], axis=1).ravel()
+    columns = numpy.tile(corner_indices[element_node_ids[:, :3]], (1, values.shape[0])).ravel()
+    entries = numpy.tile(values.ravel(), len(element_node_ids))
+    # Nodes shared by elements are interpolated the same way by each of them, so duplicates are dropped
+    nonzero = entries != 0
+    pairs, unique_indices = numpy.unique(numpy.stack((rows[nonzero], columns[nonzero]), axis=1), axis=0,
+                                         return_index=True)
+    node_prolongation = scipy.sparse.csr_matrix(
+        (entries[nonzero][unique_indices], (pairs[:, 0], pairs[:, 1])), shape=(len(model.nodes), len(corner_ids)))
+    return node_prolongation, corner_ids
+
+
+def mesh_unknown_dof_indices(mesh, degrees_of_freedom=3):
+    """Return the sorted global indices of the degrees of freedom of a mesh that are not prescribed.
+
+    :param dict mesh: mesh returned by a generator from meshes.py
+    :param int degrees_of_freedom: number of degrees of freedom at each node
+    """
+    unknown_dof_indices = []
+    for node_id in range(mesh['corner_node_quantity']):
+        for dof_index in range(degrees_of_freedom):
+            if mesh['prescribed_displacements'][node_id][dof_index] is None:
+                unknown_dof_indices.append(degrees_of_freedom * node_id + dof_index)
+    return numpy.array(unknown_dof_indices, dtype=int)
+
+
+def model_node_positions_2d(model):
+    """Return the 2D reference positions of all nodes of a model, indexed by global ID. Midpoint nodes are placed at
+    the midpoint of their corner nodes in the 2D plane.
+
+    :param model: model.Model whose mesh has been created
+    """
+    # Input ID of each global ID
+    if model.node_renumbering is None:
+        input_ids = numpy.arange(len(model.nodes))
+    else:
+        input_ids = numpy.argsort(model.node_renumbering)
+    node_reference_positions_2d = numpy.asarray(model.node_reference_positions_2d, dtype=float)
+    positions = numpy.zeros((len(model.nodes), 2))
+    for element in model.elements:
+        corners = element.nodes[:3]
+        for node in corners:
+            positions[node.global_id] = node_reference_positions_2d[input_ids[node.global_id]]
+        # Midpoint nodes follow the corner node pairs (0, 1), (1, 2), (2, 0)
+        for midpoint_index, node in enumerate(element.nodes[3:]):
+            positions[node.global_id] = .5 * (
+                node_reference_positions_2d[input_ids[corners[midpoint_index].global_id]]
+                + node_reference_positions_2d[input_ids[corners[(midpoint_index + 1) % 3].global_id]])
+    return positions
+
+
+def prolongation_matrix(fine_positions_2d, coarse_positions_2d, degrees_of_freedom=3):
+    """Return the sparse matrix that interpolates the displacements of the nodes of a coarse mesh to the nodes of a
+    fine mesh with the linear shape functions of the coarse elements. Fine nodes outside the coarse mesh (for example
+    on a curved boundary) are extrapolated from the closest coarse element.
+
+    :param numpy.ndarray fine_positions_2d: 2D reference positions of the fine nodes
+    :param numpy.ndarray coarse_positions_2d: 2D reference positions of the coarse nodes
+    :param int degrees_of_freedom: number of degrees of freedom at each node
+    """
+    # Coarse elements are connected by Delaunay triangulation, as in the model
+    triangulation = Delaunay(coarse_positions_2d)
+    simplices = numpy.sort(triangulation.simplices, axis=1)
+    element_indices = triangulation.find_simplex(fine_positions_2d)
+    outside = element_indices < 0
+    if outside.any():
+        centroids = coarse_positions_2d[simplices].mean(axis=1)
+        element_indices[outside] = cKDTree(centroids).query(fine_positions_2d[outside])[1]
+    # Natural coordinates of each fine node in its coarse element
+    corners = coarse_positions_2d[simplices[element_indices]]
+    jacobians = numpy.stack((corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]), axis=2)
+    natural_positions = numpy.linalg.solve(jacobians, (fine_positions_2d - corners[:, 0])[:, :, None])[:, :, 0]
+    node_quantity = elements.TriangularLinearElement.node_quantity
+    values = numpy.array([elements.TriangularLinearElement.shape_functions(
+        node_index, (natural_positions[:, 0], natural_positions[:, 1])) for node_index in range(node_quantity)]).T
+    node_prolongation = scipy.sparse.csr_matrix(
+        (values.ravel(), (numpy.repeat(numpy.arange(len(fine_positions_2d)), node_quantity),
+                          simplices[element_indices].ravel())),
+        shape=(len(fine_positions_2d), len(coarse_positions_2d)))
+    # Each degree of freedom is interpolated separately
+    return scipy.sparse.kron(node_prolongation, scipy.sparse.identity(degrees_of_freedom), format='csr')
+
+
+class MultigridSolver(solvers.DirectSolver):
+    """Solver that uses the conjugate gradient method preconditioned by a geometric multigrid V-cycle. The coarse
+    levels are created by the same mesh generator as the fine mesh (see coarse_meshes).
+
+    If the conjugate gradient method does not converge (for example if the stiffness matrix is not positive definite
+    past a limit point), the stiffness matrix is factorized directly and that factorization is used for all solves
+    until the next call to factorize.
+
+    :param list coarse_meshes: meshes of the coarse levels, from finest to coarsest
+    :param int smoothing_steps: number of Gauss-Seidel sweeps before and after each coarse level correction
+    :ivar list prolongations: prolongation matrices from each coarse level to the next finer level
+    :ivar list stiffness_matrices: sparse stiffness matrix of each level, from finest to coarsest
+    :ivar int iterations: conjugate gradient iterations performed by the last solve
+    :ivar int fallback_quantity: number of times the solver has fallen back to a direct factorization
+    """
+
+    def __init__(self, coarse_meshes, smoothing_steps=constants.MULTIGRID_SMOOTHING_STEPS):
+        super(MultigridSolver, self).__init__()
+        self.coarse_meshes = coarse_meshes
+        self.smoothing_steps = smoothing_steps
+        self.prolongations = []
+        self.stiffness_matrices = []
+        self.lower_triangles = []
+        self.upper_triangles = []
+        self.direct_factorization = None
+        self.iterations = 0
+        self.fallback_quantity = 0
+
+    def add_geometric_levels(self, fine_positions_2d, fine_unknown_dof_indices, degrees_of_freedom):
+        """Add the prolongation matrices of the coarse meshes below a level.
+
+        :param numpy.ndarray fine_positions_2d: 2D reference positions of the nodes of the level
+        :param numpy.ndarray fine_unknown_dof_indices: indices of the degrees of freedom of the level that are solved
+        :param int degrees_of_freedom: number of degrees of freedom at each node
+        """
+        for mesh in self.coarse_meshes:
+            coarse_positions_2d = numpy.asarray(mesh['node_reference_positions_2d'], dtype=float)
+            coarse_unknown_dof_indices = mesh_unknown_dof_indices(mesh, degrees_of_freedom)
+            prolongation = prolongation_matrix(fine_positions_2d, coarse_positions_2d, degrees_of_freedom)
+            # Keep the unknown degrees of freedom of both levels, dropping coarse ones that do not reach the fine level
+            prolongation = prolongation[fine_unknown_dof_indices][:, coarse_unknown_dof_indices]
+            coupled = prolongation.getnnz(axis=0) > 0
+            self.prolongations.append(prolongation[:, coupled].tocsr())
+            fine_positions_2d = coarse_positions_2d
+            fine_unknown_dof_indices = coarse_unknown_dof_indices[coupled]
+
+    def factorize(self, stiffness_matrix):
+        """Create the stiffness matrices of the coarse levels and factorize the coarsest one.
+
+        :param numpy.ndarray stiffness_matrix: square stiffness matrix of the unknown degrees of freedom
+        """
+        self.stiffness_matrix = stiffness_matrix
+        self.direct_factorization = None
+        self.set_operators(scipy.sparse.csr_matrix(stiffness_matrix))
+
+    def prepare(self, model):
+        """Create the prolongation matrices between the levels for the mesh of the model.
+
+        :param model: model.Model whose degrees of freedom have been numbered
+        """
+        self.prolongations = []
+        self.add_geometric_levels(model_node_positions_2d(model), model.unknown_dof_indices, model.degrees_of_freedom)
+
+    def set_operators(self, stiffness_matrix):
+        """Create the Galerkin stiffness matrices of all levels from the fine level stiffness matrix, and factorize the
+        coarsest one.
+
+        :param scipy.sparse.csr_matrix stiffness_matrix: sparse fine level stiffness matrix
+        """
+        self.stiffness_matrices = [stiffness_matrix]
+        for prolongation in self.prolongations:
+            self.stiffness_matrices.append((prolongation.T.dot(self.stiffness_matrices[-1]).dot(prolongation)).tocsr())
+        # Triangles for the forward and backward Gauss-Seidel sweeps
+        self.lower_triangles = [scipy.sparse.tril(matrix, format='csr') for matrix in self.stiffness_matrices[:-1]]
+        self.upper_triangles = [scipy.sparse.triu(matrix, format='csr') for matrix in self.stiffness_matrices[:-1]]
+        self.factorization = scipy.linalg.lu_factor(self.stiffness_matrices[-1].toarray())
+
+    def solve(self, right_hand_side):
+        """Solve the system for one right hand side, or for each column of a 2D right hand side.
+
+        :param numpy.ndarray right_hand_side: right hand side vector or matrix
+        """
+        right_hand_side = numpy.asarray(right_hand_side, dtype=float)
+        if right_hand_side.ndim == 2:
+            return numpy.column_stack([self.solve(column) for column in right_hand_side.T])
+        if self.direct_factorization is None:
+            solution, self.iterations = solvers.conjugate_gradient(
+                self.stiffness_matrices[0], right_hand_side, functools.partial(self.v_cycle, 0))
+            if solution is not None:
+                return solution
+            self.fallback_quantity += 1
+            self.direct_factorization = scipy.linalg.lu_factor(self.stiffness_matrix)
+        return scipy.linalg.lu_solve(self.direct_factorization, right_hand_side)
+
+    def v_cycle(self, level, right_hand_side):
+        """Approximately solve the system of a level with one multigrid V-cycle, starting from zero.
+
+        :param int level: index of the level, 0 for the fine level
+        :param numpy.ndarray right_hand_side: right hand side vector of the level
+        """
+        if level == len(self.prolongations):
+            return scipy.linalg.lu_solve(self.factorization, right_hand_side)
+        stiffness_matrix = self.stiffness_matrices[level]
+        prolongation = self.prolongations[level]
+        # Pre-smoothing with forward Gauss-Seidel sweeps
+        solution = numpy.zeros_like(right_hand_side)
+        for _ in range(self.smoothing_steps):
+            solution += scipy.sparse.linalg.spsolve_triangular(
+                self.lower_triangles[level], right_hand_side - stiffness_matrix.dot(solution), lower=True)
+        # Coarse level correction
+        coarse_residual = prolongation.T.dot(right_hand_side - stiffness_matrix.dot(solution))
+        solution += prolongation.dot(self.v_cycle(level + 1, coarse_residual))
+        # Post-smoothing with backward Gauss-Seidel sweeps, so the V-cycle is symmetric
+        for _ in range(self.smoothing_steps):
+            solution += scipy.sparse.linalg.spsolve_triangular(
+                self.upper_triangles[level], right_hand_side - stiffness_matrix.dot(solution), lower=False)
+        return solution
+
+
+class PMultigridSolver(MultigridSolver):
+    """Solver for models with quadratic elements that uses the conjugate gradient method preconditioned by a p-multigrid
+    V-cycle. The coarse level is the stiffness of the same mesh restricted to linear displacements on the corner nodes,
+    so no coarse mesh is needed. Geometric levels can be added below the linear level with coarse meshes of the corner
+    nodes (see coarse_meshes).
+
+    :param list coarse_meshes: meshes of the geometric levels below the linear level, from finest to coarsest
+    :param int smoothing_steps: number of Gauss-Seidel sweeps before and after each coarse level correction
+    """
+
+    def __init__(self, coarse_meshes=(), smoothing_steps=constants.MULTIGRID_SMOOTHING_STEPS):
+        super(PMultigridSolver, self).__init__(coarse_meshes=coarse_meshes, smoothing_steps=smoothing_steps)
+
+    def prepare(self, model):
+        """Create the prolongation matrix from the linear to the quadratic level, and the prolongation matrices of any
+        geometric levels, for the mesh of the model.
+
+        :param model: model.Model with quadratic elements whose degrees of freedom have been numbered
+        """
+        degrees_of_freedom = model.degrees_of_freedom
+        node_prolongation, corner_ids = linear_prolongation_matrix(model)
+        prolongation = scipy.sparse.kron(node_prolongation, scipy.sparse.identity(degrees_of_freedom), format='csr')
+        # Unknown degrees of freedom of the corner nodes, numbered by column of the corner node
+        corner_unknown_dof_indices = numpy.array(
+            [degrees_of_freedom * corner_index + dof_index for corner_index, global_id in enumerate(corner_ids)
+             for dof_index in range(degrees_of_freedom)
+             if model.nodes[global_id].prescribed_displacements[dof_index] is None], dtype=int)
+        prolongation = prolongation[model.unknown_dof_indices][:, corner_unknown_dof_indices]
+        coupled = prolongation.getnnz(axis=0) > 0
+        self.prolongations = [prolongation[:, coupled].tocsr()]
+        self.add_geometric_levels(model_node_positions_2d(model)[corner_ids], corner_unknown_dof_indices[coupled],
+                                  degrees_of_freedom)
@@ -103,6 +103,9 @@ class QuadraturePoint:
         stretch_ratio = self.stretch_ratio
         # Set iteration counter
         current_iteration = 0
+        # The tolerance follows the stiffness of the material, which sets the round-off error of the stress
+        tolerance = max(constants.NEWTON_METHOD_TOLERANCE, constants.PLANE_STRESS_RELATIVE_TOLERANCE * (
+            element.material.first_lame_parameter + 2 * element.material.shear_modulus))
         while True:
             test_deformation_gradient = self.deformation_gradient + stretch_ratio * numpy.outer(
                 self.current_configuration.midsurface_basis[2],
@@ -116,7 +119,7 @@ class QuadraturePoint:
                 element.reference_configuration.midsurface_basis_contravariant[2].T)
             # Check if kirchhoff stress is within tolerance of 0:
             error = abs(0 - kirchhoff_stress_contravariant_33)
-            if error < constants.NEWTON_METHOD_TOLERANCE:
+            if error < tolerance:
                 break
             tangent_moduli_contravariant_3333 = element.constitutive_model.tangent_moduli_contravariant(
                 material=element.material,
@@ -135,7 +138,7 @@ class QuadraturePoint:
             if current_iteration == max_iterations:
                 raise exceptions.NewtonMethodMaxIterationsExceededError(iterations=max_iterations,
                                                                         error=error,
-                                                                        tolerance=constants.NEWTON_METHOD_TOLERANCE)
+                                                                        tolerance=tolerance)
             # Increment the iteration counter
             else:
                 current_iteration += 1
@@ -0,0 +1,66 @@
+"""
+reductions.py contains the reproducible summations of the global quantities of a model.
+
+Floating point addition is not associative, so a sum that adds values in an order set by the scheduling of threads can
+change in the last bits between runs and worker counts. The sums here add the values in an order set only by their
+position: blocks of a fixed number of values are summed, and the block sums are added in order. Neumaier's compensated
+summation can be used to add the block sums and the element contributions to the global arrays, which carries the
+rounding error of each addition so the sum is accurate as well as reproducible.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import numpy
+
+import constants
+
+
+def blocked_sum(values, compensated=False, block_size=constants.REDUCTION_BLOCK_SIZE):
+    """Return the sum of an array, computed as the ordered sum of the sums of fixed blocks of its values.
+
+    :param numpy.ndarray values: array of values to add
+    :param bool compensated: whether to add the block sums with compensated summation
+    :param int block_size: number of values in each block
+    """
+    values = numpy.ravel(values)
+    if values.size == 0:
+        return 0.
+    block_sums = numpy.add.reduceat(values, numpy.arange(0, values.size, block_size))
+    if compensated:
+        return compensated_sum(block_sums)
+    return float(numpy.cumsum(block_sums)[-1])
+
+
+def compensated_add(totals, compensations, indices, values):
+    """Add values to entries of an array with Neumaier's compensated summation, in place. The rounding error of each
+    addition is added to the compensations, so the compensated total is totals + compensations.
+
+    :param numpy.ndarray totals: array of totals to add to
+    :param numpy.ndarray compensations: array of the rounding errors of the totals
+    :param numpy.ndarray indices: indices of the entries to add to, each at most once
+    :param numpy.ndarray values: values to add
+    """
+    current_totals = totals[indices]
+    new_totals = current_totals + values
+    # The rounding error is recovered from the larger of the two terms
+    compensations[indices] += numpy.where(numpy.abs(current_totals) >= numpy.abs(values),
+                                          (current_totals - new_totals) + values,
+                                          (values - new_totals) + current_totals)
+    totals[indices] = new_totals
+
+
+def compensated_sum(values):
+    """Return the sum of an array with Neumaier's compensated summation, adding the values in order.
+
+    :param numpy.ndarray values: array of values to add
+    """
+    total = 0.
+    compensation = 0.
+    for value in numpy.ravel(values).tolist():
+        new_total = total + value
+        # The rounding error is recovered from the larger of the two terms
+        if abs(total) >= abs(value):
+            compensation += (total - new_total) + value
+        else:
+            compensation += (value - new_total) + total
+        total = new_total
+    return total + compensation
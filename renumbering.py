@@ -0,0 +1,86 @@
+"""
+renumbering.py contains the orderings used to renumber the nodes and elements of a mesh.
+
+Nodes are renumbered in reverse Cuthill-McKee order, which reduces the bandwidth of the stiffness matrix for banded
+solvers. Elements are ordered along a Hilbert curve through their centroids, so elements that are close in space are
+close in memory and share nodes with their neighbors in the element loops. Elements are also colored so that no two
+elements of a color share a node, which lets the elements of a color be assembled concurrently.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import numpy
+import scipy.sparse
+import scipy.sparse.csgraph
+
+import constants
+
+
+def element_colors(element_node_ids):
+    """Return a color for every element such that no two elements of the same color share a node, so the elements of
+    one color can be assembled concurrently. Elements are colored greedily in order with the lowest free color.
+
+    :param numpy.ndarray element_node_ids: array of the global IDs of the nodes of each element
+    """
+    element_node_ids = numpy.asarray(element_node_ids)
+    # Bit mask of the colors of the elements that contain each node
+    node_color_masks = [0] * (int(element_node_ids.max()) + 1)
+    colors = numpy.empty(len(element_node_ids), dtype=int)
+    for element_index, node_ids in enumerate(element_node_ids.tolist()):
+        used_colors = 0
+        for node_id in node_ids:
+            used_colors |= node_color_masks[node_id]
+        # Lowest bit that is not set
+        color = (~used_colors & (used_colors + 1)).bit_length() - 1
+        colors[element_index] = color
+        for node_id in node_ids:
+            node_color_masks[node_id] |= 1 << color
+    return colors
+
+
+def hilbert_curve_indices(points, order=constants.HILBERT_CURVE_ORDER):
+    """Return the distance along a Hilbert curve of each 2D point. The curve fills a square grid of 2^order cells per
+    side that covers the bounding box of the points.
+
+    :param numpy.ndarray points: array of 2D points
+    :param int order: order of the Hilbert curve
+    """
+    points = numpy.asarray(points, dtype=float)
+    side = 2 ** order
+    # Grid cell of each point
+    minimum = points.min(axis=0)
+    extent = (points.max(axis=0) - minimum).max()
+    if extent == 0:
+        extent = 1.
+    cells = numpy.minimum(((points - minimum) / extent * side).astype(numpy.int64), side - 1)
+    x = cells[:, 0]
+    y = cells[:, 1]
+    distances = numpy.zeros(len(points), dtype=numpy.int64)
+    # Descend from the largest quadrants to the cells, rotating each quadrant into the orientation of the curve
+    s = side // 2
+    while s > 0:
+        rx = ((x & s) > 0).astype(numpy.int64)
+        ry = ((y & s) > 0).astype(numpy.int64)
+        distances += s * s * ((3 * rx) ^ ry)
+        # Reflect the lower right quadrant, then swap the coordinates of both lower quadrants
+        reflect = (ry == 0) & (rx == 1)
+        x = numpy.where(reflect, side - 1 - x, x)
+        y = numpy.where(reflect, side - 1 - y, y)
+        x, y = numpy.where(ry == 0, y, x), numpy.where(ry == 0, x, y)
+        s //= 2
+    return distances
+
+
+def reverse_cuthill_mckee_order(element_node_ids, node_quantity):
+    """Return the node IDs in reverse Cuthill-McKee order of the graph that connects the nodes of each element.
+
+    :param numpy.ndarray element_node_ids: array of the global IDs of the nodes of each element
+    :param int node_quantity: number of nodes in the mesh
+    """
+    element_node_ids = numpy.asarray(element_node_ids)
+    nodes_per_element = element_node_ids.shape[1]
+    # Every pair of nodes in an element is connected
+    rows = numpy.repeat(element_node_ids, nodes_per_element, axis=1).ravel()
+    columns = numpy.tile(element_node_ids, (1, nodes_per_element)).ravel()
+    graph = scipy.sparse.coo_matrix((numpy.ones(rows.size), (rows, columns)),
+                                    shape=(node_quantity, node_quantity)).tocsr()
+    return scipy.sparse.csgraph.reverse_cuthill_mckee(graph, symmetric_mode=True)
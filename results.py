@@ -0,0 +1,233 @@
+"""
+results.py contains the results writer, which streams the full field results of every converged load step of an
+analysis to disk, and the reader of the written results.
+
+The results of an analysis are a directory with one raw little endian binary file for each field. Each load step
+appends one chunk to the file of each field, so the file of a field is an array shaped (step, ...) that is read back
+memory mapped without copying. The fields of a load step are copied on the solver thread and written by a background
+thread, so the solver does not wait for the disk. A JSON manifest holds the data type and shape of every field and the
+number of steps written, and is replaced after every step, so the results can be read while the analysis runs.
+
+When the writer is closed, it also writes an XDMF file of the load steps as a time series, which ParaView opens
+directly. It reads the mesh, node positions, displacements, and element strain energies from the binary files.
+
+Nodes are in the input numbering (the order of the node reference positions given to the model), and the connectivity
+is mapped to it.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import json
+import os
+import queue
+import tempfile
+import threading
+
+import numpy
+
+import constants
+import elements
+
+
+def element_fields(model):
+    """Return the strain energy of every element, and the contravariant Kirchhoff stress and thickness stretch ratio of
+    every quadrature point, for the current configuration of a model.
+
+    :param model: model.Model whose elements have been updated for the current configuration
+    """
+    if model.element_engine is not None:
+        # The element engine keeps the state of its quadrature points, so the stresses are evaluated on a copy of its
+        # block without the stiffness matrices
+        block = model.element_engine.block
+        block = block.subset(numpy.arange(block.element_quantity))
+        block.update(model.current_node_positions(), stiffness=False)
+        return {'strain_energies': block.strain_energies,
+                'kirchhoff_stresses': block.kirchhoff_stresses,
+                'stretch_ratios': block.stretch_ratios}
+    return {'strain_energies': numpy.array([element.strain_energy for element in model.elements], dtype=float),
+            'kirchhoff_stresses': numpy.array([[quadrature_point.kirchhoff_stress
+                                                for quadrature_point in element.quadrature_points]
+                                               for element in model.elements], dtype=float),
+            'stretch_ratios': model.quadrature_point_stretch_ratios()}
+
+
+def read_results(path, mmap_mode='r'):
+    """Return the results written by a results writer as a dictionary of arrays: the mesh ('node_reference_positions'
+    and 'connectivity') and every field, shaped (step, ...). Fields can be read while the analysis is running, and
+    hold the steps written so far.
+
+    :param str path: directory of the results
+    :param str mmap_mode: memory map mode of the arrays (see numpy.memmap), or None to read them into memory
+    """
+    with open(os.path.join(path, 'manifest.json')) as manifest_file:
+        manifest = json.load(manifest_file)
+    arrays = {}
+    for name, field in list(manifest['mesh'].items()) + list(manifest['fields'].items()):
+        shape = tuple(field['shape'])
+        if name in manifest['fields']:
+            shape = (manifest['step_quantity'],) + shape
+        file_path = os.path.join(path, name + '.bin')
+        if mmap_mode is None or 0 in shape:
+            arrays[name] = numpy.fromfile(file_path, dtype=field['dtype'],
+                                          count=int(numpy.prod(shape))).reshape(shape)
+        else:
+            arrays[name] = numpy.memmap(file_path, dtype=field['dtype'], mode=mmap_mode, shape=shape)
+    return arrays
+
+
+class ResultsWriter:
+    """Writer that streams the fields of every converged load step of a model to a results directory from a background
+    thread. Give its record_step method to the model as its step_callback, and close the writer after the analysis.
+
+    :param str path: directory of the results, which is created if it does not exist
+    :param tuple fields: names of the fields to write at each step, from 'node_positions', 'displacements',
+    'strain_energies', 'kirchhoff_stresses', and 'stretch_ratios'. The load of each step is always written
+    :ivar int step_quantity: number of steps written to disk
+    """
+
+    def __init__(self, path, fields=constants.RESULTS_FIELDS):
+        self.path = path
+        self.fields = fields
+        os.makedirs(path, exist_ok=True)
+        self.manifest = None
+        self.element_type = None
+        self.step_quantity = 0
+        self.loads = []
+        self.error = None
+        self.steps = queue.Queue()
+        self.thread = threading.Thread(target=self.write_steps, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        """Wait for the queued steps to be written and write the XDMF file. Raises the error of the background
+        thread if writing failed."""
+        if self.thread is not None:
+            self.steps.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            raise self.error
+        if self.manifest is not None:
+            self.write_xdmf()
+
+    def record_step(self, model):
+        """Copy the fields of the last converged load step of a model and queue them to be written.
+
+        :param model: model.Model that has recorded a converged load step
+        """
+        node_positions = model.input_numbering(model.current_node_positions())
+        step = {'load': numpy.array(model.load_steps[-1], dtype=float)}
+        if 'node_positions' in self.fields:
+            step['node_positions'] = node_positions
+        if 'displacements' in self.fields:
+            node_reference_positions = numpy.zeros((model.node_quantity, 3))
+            for node in model.nodes:
+                node_reference_positions[node.global_id] = node.reference_position
+            step['displacements'] = node_positions - model.input_numbering(node_reference_positions)
+        if any(name in self.fields for name in ('strain_energies', 'kirchhoff_stresses', 'stretch_ratios')):
+            for name, values in element_fields(model).items():
+                if name in self.fields:
+                    step[name] = numpy.array(values, dtype=float)
+        if self.manifest is None:
+            self.start(model, step)
+        self.steps.put(step)
+
+    def start(self, model, step):
+        """Write the mesh of a model and start the manifest for the fields of its first step.
+
+        :param model: model.Model whose mesh is written
+        :param dict step: fields of the first step
+        """
+        node_reference_positions = numpy.zeros((model.node_quantity, 3))
+        for node in model.nodes:
+            node_reference_positions[node.global_id] = node.reference_position
+        node_reference_positions = model.input_numbering(node_reference_positions)
+        connectivity = numpy.array([[node.global_id for node in element.nodes] for element in model.elements],
+                                   dtype=int)
+        if model.node_renumbering is not None:
+            # Map the global IDs to the input numbering
+            input_ids = numpy.empty(model.node_quantity, dtype=int)
+            input_ids[model.node_renumbering] = numpy.arange(model.node_quantity)
+            connectivity = input_ids[connectivity]
+        self.element_type = model.element_type
+        self.manifest = {'step_quantity': 0, 'loads': [], 'mesh': {}, 'fields': {}}
+        for name, array in (('node_reference_positions', node_reference_positions), ('connectivity', connectivity)):
+            array = numpy.asarray(array, dtype='<i8' if array.dtype.kind in 'iu' else '<f8')
+            array.tofile(os.path.join(self.path, name + '.bin'))
+            self.manifest['mesh'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape)}
+        for name, array in step.items():
+            self.manifest['fields'][name] = {'dtype': '<f8', 'shape': list(array.shape)}
+            # Start the file of each field empty
+            open(os.path.join(self.path, name + '.bin'), 'wb').close()
+        self.write_manifest()
+
+    def write_manifest(self):
+        """Replace the manifest of the results with the steps written so far."""
+        self.manifest['step_quantity'] = self.step_quantity
+        self.manifest['loads'] = self.loads
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.path, suffix='.json')
+        with os.fdopen(file_descriptor, 'w') as manifest_file:
+            json.dump(self.manifest, manifest_file)
+        os.replace(temporary_path, os.path.join(self.path, 'manifest.json'))
+
+    def write_steps(self):
+        """Write the queued steps until the writer is closed. Runs in the background thread."""
+        while True:
+            step = self.steps.get()
+            if step is None:
+                return
+            if self.error is not None:
+                # Steps after an error are dropped
+                continue
+            try:
+                for name, array in step.items():
+                    with open(os.path.join(self.path, name + '.bin'), 'ab') as field_file:
+                        numpy.asarray(array, dtype='<f8').tofile(field_file)
+                self.step_quantity += 1
+                self.loads.append(float(step['load']))
+                self.write_manifest()
+            except OSError as error:
+                self.error = error
+
+    def write_xdmf(self):
+        """Write the XDMF file of the written steps as a time series of the load, with the node positions as the
+        geometry and the displacements and element strain energies as attributes."""
+        node_quantity = self.manifest['mesh']['node_reference_positions']['shape'][0]
+        element_quantity, element_node_quantity = self.manifest['mesh']['connectivity']['shape']
+        topology_type = 'Tri_6' if self.element_type is elements.TriangularQuadraticElement else 'Triangle'
+
+        def data_item(name, dimensions, step_index=0):
+            """Return the XDMF data item of a chunk of a binary field file."""
+            field = self.manifest['mesh'].get(name, self.manifest['fields'].get(name))
+            number_type = 'Int' if field['dtype'] == '<i8' else 'Float'
+            seek = step_index * 8 * int(numpy.prod(field['shape']))
+            return ('<DataItem Format="Binary" Endian="Little" NumberType="' + number_type + '" Precision="8" Seek="'
+                    + str(seek) + '" Dimensions="' + ' '.join(str(size) for size in dimensions) + '">' + name
+                    + '.bin</DataItem>')
+
+        lines = ['<?xml version="1.0" ?>',
+                 '<Xdmf Version="2.0">',
+                 '<Domain>',
+                 '<Grid Name="membrane" GridType="Collection" CollectionType="Temporal">']
+        for step_index, load in enumerate(self.loads):
+            geometry = 'node_positions' if 'node_positions' in self.manifest['fields'] else 'node_reference_positions'
+            lines += ['<Grid Name="step ' + str(step_index) + '" GridType="Uniform">',
+                      '<Time Value="' + repr(load) + '"/>',
+                      '<Topology TopologyType="' + topology_type + '" NumberOfElements="' + str(element_quantity)
+                      + '">',
+                      data_item('connectivity', (element_quantity, element_node_quantity)),
+                      '</Topology>',
+                      '<Geometry GeometryType="XYZ">',
+                      data_item(geometry, (node_quantity, 3), step_index if geometry == 'node_positions' else 0),
+                      '</Geometry>']
+            if 'displacements' in self.manifest['fields']:
+                lines += ['<Attribute Name="displacements" AttributeType="Vector" Center="Node">',
+                          data_item('displacements', (node_quantity, 3), step_index),
+                          '</Attribute>']
+            if 'strain_energies' in self.manifest['fields']:
+                lines += ['<Attribute Name="strain_energies" AttributeType="Scalar" Center="Cell">',
+                          data_item('strain_energies', (element_quantity,), step_index),
+                          '</Attribute>']
+            lines.append('</Grid>')
+        lines += ['</Grid>', '</Domain>', '</Xdmf>']
+        with open(os.path.join(self.path, 'results.xdmf'), 'w') as xdmf_file:
+            xdmf_file.write('\n'.join(lines) + '\n')
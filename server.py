@@ -0,0 +1,461 @@
+"""
+server.py contains the local job server, a long-lived process that runs membrane analyses submitted by other tools.
+
+Clients connect over a Unix socket or a localhost TCP port and send requests as lines of JSON. A submit request holds a
+model definition (see model_parameters); the job is queued for a pool of warm worker processes, and the server streams
+the events of the job back to the client as lines of JSON: 'accepted', one 'progress' event for each converged load
+step, and finally 'done' with the results or 'error' with the error message. A status request returns the numbers of
+workers, queued jobs, and running jobs.
+
+The worker processes are started once, with the model modules already imported, and each keeps the prepared models of
+the last constants.JOB_SERVER_MODEL_CACHE_SIZE meshes it has solved, so jobs on the same mesh skip the preprocessing.
+
+Definitions are checked before they are queued. Only the parameters, classes, and mesh functions listed in
+constants.py are accepted, so clients cannot make the server read or write files, except that mesh files can be read
+from the mesh directory the server was started with. Each job is solved with the full load case of its definition,
+with the defaults of model.Model for the parameters it does not give, so a job never inherits the parameters of the
+job its worker ran before. If a worker process dies, its job fails and a new worker is started. When the server
+stops, its queued and running jobs fail and its workers are stopped, or terminated if they do not stop in time.
+
+Run the server with: python server.py --socket membrane_jobs.sock
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import argparse
+import asyncio
+import collections
+import inspect
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import socket
+
+import numpy
+
+import constants
+import constitutive_models
+import elements
+import exceptions
+import materials
+import mesh_readers
+import meshes
+import model
+import quadrature
+
+
+def job_worker(connection, mesh_directory=None):
+    """Run the jobs sent by the server until it is told to stop, sending the progress of each load step and the
+    results or error of each job back to the server.
+
+    :param connection: end of the pipe to the server process
+    :param str mesh_directory: directory mesh files are read from, or None if mesh files cannot be read
+    """
+    # Workers forked from a running server inherit its signal handling, which only wakes its event loop, so the
+    # default handling is restored for the server to be able to terminate them
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    prepared_models = collections.OrderedDict()
+    while True:
+        command, arguments = connection.recv()
+        if command == 'stop':
+            break
+        job_id, definition = arguments
+
+        def send_progress(analysis):
+            """Send the last converged load step of the analysis to the server."""
+            connection.send(('progress', job_id, {'step': len(analysis.load_steps) - 1,
+                                                  'load': float(analysis.load_steps[-1]),
+                                                  'maximum_deflection': float(analysis.maximum_deflections[-1])}))
+
+        try:
+            parameters = model_parameters(definition, mesh_directory)
+            load_case = dict(load_case_parameters(parameters), step_callback=send_progress)
+            # Jobs with the same mesh, material, and quadrature share a prepared model
+            preparation_key = json.dumps({name: value for name, value in definition.items()
+                                          if name not in constants.LOAD_CASE_PARAMETERS}, sort_keys=True)
+            if preparation_key in prepared_models:
+                prepared_models.move_to_end(preparation_key)
+            else:
+                prepared_models[preparation_key] = model.PreparedModel(plot=False, **parameters)
+                if len(prepared_models) > constants.JOB_SERVER_MODEL_CACHE_SIZE:
+                    prepared_models.popitem(last=False)
+            analysis = prepared_models[preparation_key]
+            analysis.solve(load_case)
+            connection.send(('done', job_id, {
+                'load_steps': numpy.asarray(analysis.load_steps, dtype=float).tolist(),
+                'maximum_deflections': numpy.asarray(analysis.maximum_deflections, dtype=float).tolist(),
+                'newton_iterations': numpy.asarray(analysis.newton_iterations, dtype=int).tolist(),
+                'node_positions': analysis.input_numbering(analysis.current_node_positions()).tolist()}))
+        except Exception as error:
+            # Invalid definitions and failed analyses end the job, not the worker
+            connection.send(('error', job_id, type(error).__name__ + ': ' + str(error)))
+    connection.close()
+
+
+def load_case_parameters(parameters):
+    """Return the full load case of a job: the value of every parameter in constants.LOAD_CASE_PARAMETERS, from the
+    keyword arguments of model.Model of the job or the defaults of model.Model.
+
+    :param dict parameters: keyword arguments of model.Model
+    """
+    signature = inspect.signature(model.Model).parameters
+    return {name: parameters[name] if name in parameters else signature[name].default
+            for name in constants.LOAD_CASE_PARAMETERS}
+
+
+def mesh_path(path, mesh_directory):
+    """Return the real path of a mesh file given by a client, which must be inside the mesh directory of the server.
+
+    :param str path: path of the mesh file, relative to the mesh directory
+    :param str mesh_directory: directory mesh files are read from, or None if mesh files cannot be read
+    """
+    if mesh_directory is None:
+        raise exceptions.InvalidJobDefinitionError('the server has no mesh directory to read mesh files from')
+    mesh_directory = os.path.realpath(mesh_directory)
+    path = os.path.realpath(os.path.join(mesh_directory, str(path)))
+    if os.path.commonpath((mesh_directory, path)) != mesh_directory:
+        raise exceptions.InvalidJobDefinitionError('the mesh file ' + path + ' is outside the mesh directory')
+    return path
+
+
+def model_parameters(definition, mesh_directory=None):
+    """Return the keyword arguments of model.Model for a model definition decoded from JSON.
+
+    The definition holds the keyword arguments of model.Model in constants.JOB_SERVER_PARAMETERS, with these values
+    replaced by JSON values:
+
+    - mesh: {'generator': name of a function of meshes.py, 'parameters': its arguments}, {'reader': name of a function
+      of mesh_readers.py, 'parameters': its arguments, with paths relative to the mesh directory}, or a dictionary of
+      the mesh inputs of model.Model with lists for the arrays
+    - material: name of a material class of materials.py, or {'name', 'first_lame_parameter', 'shear_modulus'} of a
+      materials.Custom material
+    - constitutive_model, element_type, and quadrature_class: names of the classes in their modules
+    - applied_load: list of the 3 load components
+
+    :param dict definition: model definition
+    :param str mesh_directory: directory mesh files are read from, or None if mesh files cannot be read
+    """
+    validate_definition(definition, mesh_directory)
+    parameters = dict(definition)
+    mesh = parameters.pop('mesh')
+    if 'generator' in mesh:
+        mesh = getattr(meshes, mesh['generator'])(**mesh.get('parameters', {}))
+    elif 'reader' in mesh:
+        reader_parameters = {name: mesh_path(value, mesh_directory) if name.endswith('path') and value is not None
+                             else value for name, value in mesh.get('parameters', {}).items()}
+        mesh = getattr(mesh_readers, mesh['reader'])(**reader_parameters)
+    else:
+        mesh = dict(mesh)
+        for name in ('node_reference_positions_2d', 'node_reference_positions_3d', 'edges'):
+            mesh[name] = numpy.array(mesh[name], dtype=float)
+        if mesh.get('connectivity_table') is not None:
+            mesh['connectivity_table'] = numpy.array(mesh['connectivity_table'], dtype=int)
+        # JSON object keys are strings
+        mesh['prescribed_displacements'] = {int(node_id): prescribed_displacements for node_id, prescribed_displacements
+                                            in mesh['prescribed_displacements'].items()}
+    parameters.update(mesh)
+    material = parameters['material']
+    if isinstance(material, str):
+        parameters['material'] = getattr(materials, material)
+    else:
+        parameters['material'] = materials.Custom(**material)
+    parameters['constitutive_model'] = getattr(constitutive_models, parameters['constitutive_model'])
+    parameters['element_type'] = getattr(elements, parameters['element_type'])
+    parameters['quadrature_class'] = getattr(quadrature, parameters['quadrature_class'])
+    parameters['applied_load'] = numpy.array(parameters['applied_load'], dtype=float)
+    return parameters
+
+
+def submit(definition, socket_path=None, host='127.0.0.1', port=None):
+    """Submit a job to a running job server and yield its events as they arrive, until it is done or fails.
+
+    :param dict definition: model definition (see model_parameters)
+    :param str socket_path: path of the Unix socket of the server, or None to connect over TCP
+    :param str host: host of the server for TCP
+    :param int port: port of the server for TCP
+    """
+    if socket_path is not None:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socket_path)
+    else:
+        client = socket.create_connection((host, port))
+    with client, client.makefile('rw') as stream:
+        stream.write(json.dumps({'command': 'submit', 'definition': definition}) + '\n')
+        stream.flush()
+        for line in stream:
+            event = json.loads(line)
+            yield event
+            if event['event'] in ('done', 'error'):
+                break
+
+
+def validate_definition(definition, mesh_directory=None):
+    """Check that a model definition only sets the parameters, classes, and mesh functions the job server accepts, and
+    gives every required parameter of model.Model. Raises exceptions.InvalidJobDefinitionError if it does not.
+
+    :param dict definition: model definition (see model_parameters)
+    :param str mesh_directory: directory mesh files are read from, or None if mesh files cannot be read
+    """
+    if not isinstance(definition, dict):
+        raise exceptions.InvalidJobDefinitionError('it is not a JSON object')
+    for name in definition:
+        if name not in constants.JOB_SERVER_PARAMETERS:
+            raise exceptions.InvalidJobDefinitionError('the parameter ' + str(name) + ' is not accepted')
+    for name, parameter in inspect.signature(model.Model).parameters.items():
+        if (parameter.default is inspect.Parameter.empty and name not in constants.JOB_SERVER_MESH_INPUTS
+                and name not in definition):
+            raise exceptions.InvalidJobDefinitionError('the required parameter ' + name + ' is missing')
+    if 'mesh' not in definition or not isinstance(definition['mesh'], dict):
+        raise exceptions.InvalidJobDefinitionError('the mesh is missing')
+    mesh = definition['mesh']
+    if 'generator' in mesh:
+        if mesh['generator'] not in constants.JOB_SERVER_MESH_GENERATORS:
+            raise exceptions.InvalidJobDefinitionError('the mesh generator ' + str(mesh['generator'])
+                                                       + ' is not accepted')
+    elif 'reader' in mesh:
+        if mesh['reader'] not in constants.JOB_SERVER_MESH_READERS:
+            raise exceptions.InvalidJobDefinitionError('the mesh reader ' + str(mesh['reader']) + ' is not accepted')
+        for name, value in mesh.get('parameters', {}).items():
+            if name.endswith('path') and value is not None:
+                mesh_path(value, mesh_directory)
+    else:
+        for name in mesh:
+            if name not in constants.JOB_SERVER_MESH_INPUTS:
+                raise exceptions.InvalidJobDefinitionError('the mesh input ' + str(name) + ' is not accepted')
+    for name, class_names in constants.JOB_SERVER_CLASSES.items():
+        if name == 'material' and isinstance(definition[name], dict):
+            continue
+        if definition[name] not in class_names:
+            raise exceptions.InvalidJobDefinitionError('the ' + name + ' ' + str(definition[name]) + ' is not accepted')
+
+
+class JobServer:
+    """Asynchronous server that queues the submitted jobs for a pool of warm worker processes and streams their events
+    to the clients.
+
+    :param int worker_quantity: number of worker processes, or None for the number of CPUs
+    :param str socket_path: path of the Unix socket to listen on, or None to listen on a TCP port
+    :param str host: host to listen on for TCP
+    :param int port: port to listen on for TCP, or 0 for any free port
+    :param str mesh_directory: directory that mesh files named by clients are read from, or None to not read mesh files
+    :ivar int port: port the server listens on for TCP, once started
+    """
+
+    def __init__(self, worker_quantity=None, socket_path=None, host='127.0.0.1', port=0, mesh_directory=None):
+        if worker_quantity is None:
+            worker_quantity = os.cpu_count()
+        self.worker_quantity = worker_quantity
+        self.socket_path = socket_path
+        self.host = host
+        self.port = port
+        self.mesh_directory = mesh_directory
+        self.server = None
+        # Worker process of each pipe connection
+        self.processes = {}
+        self.idle_connections = collections.deque()
+        self.pending_jobs = collections.deque()
+        # Job running on each busy connection
+        self.running_jobs = {}
+        # Event queue of each queued or running job
+        self.job_events = {}
+        self.job_ids = itertools.count()
+
+    async def close(self):
+        """Stop accepting clients, fail the queued and running jobs, and stop the worker processes. Busy workers are
+        terminated, and idle workers that do not stop within constants.JOB_SERVER_SHUTDOWN_TIMEOUT seconds are
+        terminated too, or killed if they do not end after that."""
+        loop = asyncio.get_running_loop()
+        for job_id in list(self.job_events):
+            self.end_job(job_id, 'the job server stopped')
+        self.pending_jobs.clear()
+        # Let the clients receive the errors of their jobs
+        await asyncio.sleep(0)
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for connection, process in self.processes.items():
+            loop.remove_reader(connection.fileno())
+            if connection in self.running_jobs:
+                process.terminate()
+            else:
+                try:
+                    connection.send(('stop', ()))
+                except OSError:
+                    process.terminate()
+        for connection, process in self.processes.items():
+            # Wait without blocking the event loop
+            await loop.run_in_executor(None, process.join, constants.JOB_SERVER_SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                await loop.run_in_executor(None, process.join, constants.JOB_SERVER_SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.kill()
+                await loop.run_in_executor(None, process.join)
+            connection.close()
+        self.processes = {}
+        self.running_jobs = {}
+        self.idle_connections.clear()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def end_job(self, job_id, message):
+        """Fail a queued or running job with an error event.
+
+        :param int job_id: ID of the job
+        :param str message: error message of the job
+        """
+        events = self.job_events.pop(job_id, None)
+        if events is not None:
+            events.put_nowait({'event': 'error', 'job_id': job_id, 'message': message})
+
+    async def handle_client(self, reader, writer):
+        """Answer the requests of a client until it disconnects.
+
+        :param asyncio.StreamReader reader: stream of the requests of the client
+        :param asyncio.StreamWriter writer: stream of the responses to the client
+        """
+        try:
+            async for line in reader:
+                request = json.loads(line)
+                if request['command'] == 'status':
+                    await self.send(writer, {'event': 'status', 'workers': len(self.processes),
+                                             'queued': len(self.pending_jobs),
+                                             'running': len(self.running_jobs)})
+                elif request['command'] == 'submit':
+                    try:
+                        validate_definition(request['definition'], self.mesh_directory)
+                    except exceptions.InvalidJobDefinitionError as error:
+                        await self.send(writer, {'event': 'error', 'message': str(error)})
+                        continue
+                    job_id = next(self.job_ids)
+                    events = asyncio.Queue()
+                    self.job_events[job_id] = events
+                    self.pending_jobs.append((job_id, request['definition']))
+                    await self.send(writer, {'event': 'accepted', 'job_id': job_id})
+                    self.start_jobs()
+                    # Stream the events of the job until it ends
+                    while True:
+                        event = await events.get()
+                        await self.send(writer, event)
+                        if event['event'] in ('done', 'error'):
+                            break
+                else:
+                    await self.send(writer, {'event': 'error', 'message': 'unknown command: ' + request['command']})
+        except (ConnectionError, json.JSONDecodeError, KeyError, asyncio.CancelledError):
+            # Clients with invalid requests are disconnected, and clients still connected when the server stops end
+            pass
+        finally:
+            writer.close()
+
+    def receive(self, connection):
+        """Pass a message from a worker to the event queue of its job, and give the worker a new job once its job has
+        ended. If the worker has died, its job fails and the worker is replaced.
+
+        :param connection: end of the pipe to the worker process
+        """
+        try:
+            message_type, job_id, content = connection.recv()
+        except (EOFError, OSError):
+            self.replace_worker(connection)
+            return
+        if message_type == 'progress':
+            event = dict(content, event='progress', job_id=job_id)
+        elif message_type == 'done':
+            event = {'event': 'done', 'job_id': job_id, 'results': content}
+        else:
+            event = {'event': 'error', 'job_id': job_id, 'message': content}
+        if job_id in self.job_events:
+            self.job_events[job_id].put_nowait(event)
+        if message_type != 'progress':
+            self.job_events.pop(job_id, None)
+            del self.running_jobs[connection]
+            self.idle_connections.append(connection)
+            self.start_jobs()
+
+    def replace_worker(self, connection):
+        """Fail the job of a worker that has died, and start a new worker in its place.
+
+        :param connection: end of the pipe to the dead worker process
+        """
+        loop = asyncio.get_running_loop()
+        loop.remove_reader(connection.fileno())
+        process = self.processes.pop(connection)
+        process.join()
+        connection.close()
+        if connection in self.idle_connections:
+            self.idle_connections.remove(connection)
+        job_id = self.running_jobs.pop(connection, None)
+        if job_id is not None:
+            self.end_job(job_id, 'the worker process running the job exited with code ' + str(process.exitcode))
+        self.start_worker()
+        self.start_jobs()
+
+    @staticmethod
+    async def send(writer, event):
+        """Send an event to a client as a line of JSON.
+
+        :param asyncio.StreamWriter writer: stream of the responses to the client
+        :param dict event: event to send
+        """
+        writer.write((json.dumps(event) + '\n').encode())
+        await writer.drain()
+
+    async def serve_forever(self):
+        """Start the server and answer clients until the server process receives SIGINT or SIGTERM."""
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stop.set)
+        await self.start()
+        try:
+            await stop.wait()
+        finally:
+            await self.close()
+
+    async def start(self):
+        """Start the worker processes and listen for clients."""
+        for _ in range(self.worker_quantity):
+            self.start_worker()
+        if self.socket_path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host=self.host, port=self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+        print('Job server listening on', self.socket_path if self.socket_path is not None
+              else self.host + ':' + str(self.port))
+
+    def start_jobs(self):
+        """Send queued jobs to the idle workers."""
+        while self.pending_jobs and self.idle_connections:
+            connection = self.idle_connections.popleft()
+            job_id, definition = self.pending_jobs.popleft()
+            self.running_jobs[connection] = job_id
+            connection.send(('job', (job_id, definition)))
+
+    def start_worker(self):
+        """Start a worker process and add it to the idle workers."""
+        parent_connection, child_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=job_worker, args=(child_connection, self.mesh_directory), daemon=True)
+        process.start()
+        # The worker holds its own end of the pipe
+        child_connection.close()
+        asyncio.get_running_loop().add_reader(parent_connection.fileno(), self.receive, parent_connection)
+        self.processes[parent_connection] = process
+        self.idle_connections.append(parent_connection)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the local job server for membrane analyses.')
+    parser.add_argument('--socket', help='path of the Unix socket to listen on')
+    parser.add_argument('--host', default='127.0.0.1', help='host to listen on for TCP')
+    parser.add_argument('--port', type=int, default=0, help='port to listen on for TCP')
+    parser.add_argument('--workers', type=int, help='number of worker processes')
+    parser.add_argument('--mesh-directory', help='directory that mesh files named by clients are read from')
+    arguments = parser.parse_args()
+    job_server = JobServer(worker_quantity=arguments.workers, socket_path=arguments.socket, host=arguments.host,
+                           port=arguments.port, mesh_directory=arguments.mesh_directory)
+    asyncio.run(job_server.serve_forever())
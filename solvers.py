@@ -0,0 +1,307 @@
+"""
+solvers.py contains the linear solvers used for the stiffness matrix system of each Newton-Raphson iteration.
+
+Every solver is used in three stages: prepare is called once with the model after its degrees of freedom are numbered,
+factorize is called with the "upper" stiffness matrix of the unknown degrees of freedom, and solve may then be called
+any number of times with right hand sides for that matrix.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import numpy
+import scipy.linalg
+import scipy.linalg.lapack
+import scipy.sparse
+import scipy.sparse.linalg
+
+import constants
+
+
+def conjugate_gradient(matrix, right_hand_side, preconditioner):
+    """Solve a symmetric positive definite system with the preconditioned conjugate gradient method, starting from
+    zero. The solution is None if the method breaks down because the matrix or the preconditioner is not positive
+    definite, or if it does not converge within constants.ITERATIVE_SOLVER_MAXIMUM_ITERATIONS iterations.
+
+    :param matrix: dense or sparse matrix of the system
+    :param numpy.ndarray right_hand_side: right hand side vector
+    :param preconditioner: function that applies the inverse of the preconditioner to a residual vector
+    :return: solution and number of iterations performed
+    """
+    solution = numpy.zeros_like(right_hand_side)
+    residual = right_hand_side.copy()
+    tolerance = constants.ITERATIVE_SOLVER_TOLERANCE * numpy.linalg.norm(right_hand_side)
+    preconditioned_residual = preconditioner(residual)
+    direction = preconditioned_residual.copy()
+    residual_product = numpy.dot(residual, preconditioned_residual)
+    for iteration in range(constants.ITERATIVE_SOLVER_MAXIMUM_ITERATIONS + 1):
+        if numpy.linalg.norm(residual) <= tolerance:
+            return solution, iteration
+        matrix_direction = matrix.dot(direction)
+        curvature = numpy.dot(direction, matrix_direction)
+        # The matrix or the preconditioner is not positive definite
+        if curvature <= 0 or residual_product <= 0:
+            return None, iteration
+        step = residual_product / curvature
+        solution += step * direction
+        residual -= step * matrix_direction
+        preconditioned_residual = preconditioner(residual)
+        next_residual_product = numpy.dot(residual, preconditioned_residual)
+        direction = preconditioned_residual + next_residual_product / residual_product * direction
+        residual_product = next_residual_product
+    return None, constants.ITERATIVE_SOLVER_MAXIMUM_ITERATIONS
+
+
+def infinity_norm(matrix, block_size=constants.MATRIX_NORM_BLOCK_SIZE):
+    """Return the infinity norm (largest absolute row sum) of a dense matrix, computed one block of rows at a time so
+    only a block of rows is copied.
+
+    :param numpy.ndarray matrix: dense matrix
+    :param int block_size: number of rows in each block
+    """
+    return max((float(abs(matrix[start:start + block_size]).sum(axis=1).max())
+                for start in range(0, matrix.shape[0], block_size)), default=0.)
+
+
+class DirectSolver:
+    """Solver that factorizes the stiffness matrix with an LU decomposition in double precision.
+
+    :ivar numpy.ndarray stiffness_matrix: stiffness matrix that was last factorized
+    :ivar factorization: LU factorization of the stiffness matrix
+    """
+
+    def __init__(self):
+        self.stiffness_matrix = None
+        self.factorization = None
+
+    def factorize(self, stiffness_matrix):
+        """Factorize the stiffness matrix for the following solves.
+
+        :param numpy.ndarray stiffness_matrix: square stiffness matrix of the unknown degrees of freedom
+        """
+        self.stiffness_matrix = stiffness_matrix
+        self.factorization = scipy.linalg.lu_factor(stiffness_matrix)
+
+    def prepare(self, model):
+        """Prepare the solver for the mesh of a model. Called once after the degrees of freedom of the model are
+        numbered. Direct solvers only need the stiffness matrix, so nothing is done.
+
+        :param model: model.Model whose degrees of freedom have been numbered
+        """
+        pass
+
+    def solve(self, right_hand_side):
+        """Solve the factorized system for one right hand side, or for each column of a 2D right hand side.
+
+        :param numpy.ndarray right_hand_side: right hand side vector or matrix
+        """
+        return scipy.linalg.lu_solve(self.factorization, right_hand_side)
+
+
+class MixedPrecisionSolver(DirectSolver):
+    """Solver that factorizes the stiffness matrix in single precision, which halves the memory and bandwidth of the
+    factorization, and recovers double precision accuracy by iterative refinement. The residuals of the refinement are
+    computed in double precision with the assembled stiffness matrix.
+
+    If the refinement stalls because the matrix is too ill-conditioned for a single precision factorization, the
+    matrix is factorized again in double precision, and that factorization is used for all solves until the next
+    call to factorize.
+
+    :param int max_iterations: max refinement iterations before falling back to double precision
+    :ivar numpy.ndarray stiffness_matrix: stiffness matrix that was last factorized
+    :ivar factorization: single precision LU factorization of the stiffness matrix
+    :ivar float matrix_norm: infinity norm of the stiffness matrix, which scales the backward error of the solves
+    :ivar double_precision_factorization: double precision LU factorization, only created after a fallback
+    :ivar int refinement_iterations: refinement iterations performed by the last solve
+    :ivar int fallback_quantity: number of times the solver has fallen back to double precision
+    """
+
+    def __init__(self, max_iterations=10):
+        super(MixedPrecisionSolver, self).__init__()
+        self.max_iterations = max_iterations
+        self.matrix_norm = 0.
+        self.double_precision_factorization = None
+        self.refinement_iterations = 0
+        self.fallback_quantity = 0
+
+    def factorize(self, stiffness_matrix):
+        """Factorize the stiffness matrix in single precision for the following solves.
+
+        :param numpy.ndarray stiffness_matrix: square stiffness matrix of the unknown degrees of freedom
+        """
+        self.stiffness_matrix = stiffness_matrix
+        self.matrix_norm = infinity_norm(stiffness_matrix)
+        # The single precision copy is overwritten by its factorization, so no double precision factors are stored
+        self.factorization = scipy.linalg.lu_factor(stiffness_matrix.astype(numpy.float32), overwrite_a=True,
+                                                    check_finite=False)
+        self.double_precision_factorization = None
+
+    def solve(self, right_hand_side):
+        """Solve the factorized system for one right hand side, or for each column of a 2D right hand side, to double
+        precision accuracy.
+
+        :param numpy.ndarray right_hand_side: right hand side vector or matrix
+        """
+        if self.double_precision_factorization is not None:
+            return scipy.linalg.lu_solve(self.double_precision_factorization, right_hand_side)
+        right_hand_side = numpy.asarray(right_hand_side, dtype=float)
+        solution = self.single_precision_solve(right_hand_side)
+        previous_error = float('inf')
+        self.refinement_iterations = 0
+        while True:
+            # Residual in double precision with the assembled matrix
+            residual = right_hand_side - numpy.dot(self.stiffness_matrix, solution)
+            error = abs(residual).max()
+            scale = self.matrix_norm * abs(solution).max() + abs(right_hand_side).max()
+            if error <= constants.ITERATIVE_REFINEMENT_TOLERANCE * scale:
+                return solution
+            # Fall back to double precision if the refinement has stalled or is taking too long
+            if (error > constants.ITERATIVE_REFINEMENT_STALL_RATIO * previous_error
+                    or self.refinement_iterations == self.max_iterations):
+                self.fallback_quantity += 1
+                self.double_precision_factorization = scipy.linalg.lu_factor(self.stiffness_matrix)
+                return scipy.linalg.lu_solve(self.double_precision_factorization, right_hand_side)
+            solution += self.single_precision_solve(residual)
+            previous_error = error
+            self.refinement_iterations += 1
+
+    def single_precision_solve(self, right_hand_side):
+        """Solve with the single precision factorization and return the result in double precision.
+
+        :param numpy.ndarray right_hand_side: right hand side vector or matrix
+        """
+        return scipy.linalg.lu_solve(self.factorization, right_hand_side.astype(numpy.float32),
+                                     check_finite=False).astype(float)
+
+
+class BandedSolver(DirectSolver):
+    """Solver that factorizes only the band of the stiffness matrix, which is narrow after the nodes are renumbered
+    in reverse Cuthill-McKee order (see the renumber_mesh parameter of model.Model). A banded Cholesky factorization is
+    used while the stiffness matrix is symmetric positive definite, and a banded LU factorization otherwise (for
+    example past a limit point).
+
+    :ivar numpy.ndarray stiffness_matrix: stiffness matrix that was last factorized
+    :ivar factorization: banded Cholesky factor, or banded LU factors and pivots
+    :ivar bool cholesky: whether the last factorization is a Cholesky factorization
+    :ivar int bandwidth: number of diagonals on each side of the main diagonal that can be nonzero, from the mesh
+    """
+
+    def __init__(self):
+        super(BandedSolver, self).__init__()
+        self.cholesky = False
+        self.bandwidth = 0
+
+    def factorize(self, stiffness_matrix):
+        """Factorize the band of the stiffness matrix for the following solves.
+
+        :param numpy.ndarray stiffness_matrix: square stiffness matrix of the unknown degrees of freedom
+        """
+        self.stiffness_matrix = stiffness_matrix
+        size = len(stiffness_matrix)
+        bandwidth = self.bandwidth
+        # Diagonals of the band: band_diagonals[bandwidth + offset] is the diagonal at the offset above the main one
+        band_diagonals = [numpy.diagonal(stiffness_matrix, offset) for offset in range(-bandwidth, bandwidth + 1)]
+        # Try a Cholesky factorization of the upper band if the band is symmetric
+        tolerance = constants.FLOATING_POINT_TOLERANCE * max(abs(diagonal).max(initial=0)
+                                                             for diagonal in band_diagonals)
+        if all(numpy.allclose(band_diagonals[bandwidth + offset], band_diagonals[bandwidth - offset], rtol=0,
+                              atol=tolerance) for offset in range(1, bandwidth + 1)):
+            # Upper band storage: band[u + i - j, j] = K[i, j] for j >= i
+            band = numpy.zeros((bandwidth + 1, size))
+            for offset in range(bandwidth + 1):
+                band[bandwidth - offset, offset:] = band_diagonals[bandwidth + offset]
+            try:
+                self.factorization = scipy.linalg.cholesky_banded(band, check_finite=False)
+                self.cholesky = True
+                return
+            except numpy.linalg.LinAlgError:
+                pass
+        # LU factorization, with storage for the fill of the pivoting: band[l + u + i - j, j] = K[i, j]
+        self.cholesky = False
+        band = numpy.zeros((3 * bandwidth + 1, size))
+        for offset in range(-bandwidth, bandwidth + 1):
+            band[2 * bandwidth - offset, max(offset, 0):size + min(offset, 0)] = band_diagonals[bandwidth + offset]
+        lu, pivots, info = scipy.linalg.lapack.dgbtrf(band, bandwidth, bandwidth, overwrite_ab=True)
+        if info > 0:
+            raise numpy.linalg.LinAlgError('Singular matrix')
+        self.factorization = (lu, pivots)
+
+    def prepare(self, model):
+        """Compute the bandwidth of the stiffness matrix of the unknown degrees of freedom from the mesh of a model,
+        as the largest distance between two unknown degrees of freedom of the same element.
+
+        :param model: model.Model whose degrees of freedom have been numbered
+        """
+        degrees_of_freedom = model.degrees_of_freedom
+        # Index of each global degree of freedom among the unknown ones, or -1 if it is prescribed
+        unknown_indices = numpy.full(model.global_dof_quantity, -1)
+        unknown_indices[model.unknown_dof_indices] = numpy.arange(len(model.unknown_dof_indices))
+        element_node_ids = numpy.array([[node.global_id for node in element.nodes] for element in model.elements],
+                                       dtype=int)
+        element_unknown_indices = unknown_indices[
+            (degrees_of_freedom * element_node_ids[:, :, None] + numpy.arange(degrees_of_freedom)).reshape(
+                len(element_node_ids), -1)]
+        known = element_unknown_indices < 0
+        largest = numpy.where(known, -1, element_unknown_indices).max(axis=1)
+        smallest = numpy.where(known, model.global_dof_quantity, element_unknown_indices).min(axis=1)
+        self.bandwidth = int(max((largest - smallest).max(initial=0), 0))
+
+    def solve(self, right_hand_side):
+        """Solve the factorized system for one right hand side, or for each column of a 2D right hand side.
+
+        :param numpy.ndarray right_hand_side: right hand side vector or matrix
+        """
+        if self.cholesky:
+            return scipy.linalg.cho_solve_banded((self.factorization, False), right_hand_side, check_finite=False)
+        lu, pivots = self.factorization
+        solution, info = scipy.linalg.lapack.dgbtrs(lu, self.bandwidth, self.bandwidth, right_hand_side, pivots)
+        return solution
+
+
+class ConjugateGradientSolver(DirectSolver):
+    """Solver that uses the conjugate gradient method preconditioned by the diagonal of the stiffness matrix, which
+    only needs products of the stiffness matrix with vectors. Sparse stiffness matrices, such as the one assembled by
+    the out-of-core element engine, are solved without being made dense.
+
+    If the conjugate gradient method does not converge (for example if the stiffness matrix is not positive definite
+    past a limit point), the stiffness matrix is factorized with a sparse LU decomposition, and that factorization is
+    used for all solves until the next call to factorize.
+
+    :ivar stiffness_matrix: stiffness matrix that was last factorized, as a scipy.sparse.csr_matrix
+    :ivar numpy.ndarray diagonal: diagonal of the stiffness matrix
+    :ivar factorization: sparse LU factorization of the stiffness matrix, only created after a fallback
+    :ivar int iterations: conjugate gradient iterations performed by the last solve
+    :ivar int fallback_quantity: number of times the solver has fallen back to a sparse LU factorization
+    """
+
+    def __init__(self):
+        super(ConjugateGradientSolver, self).__init__()
+        self.diagonal = None
+        self.iterations = 0
+        self.fallback_quantity = 0
+
+    def factorize(self, stiffness_matrix):
+        """Keep the stiffness matrix and its diagonal for the following solves.
+
+        :param stiffness_matrix: square dense or sparse stiffness matrix of the unknown degrees of freedom
+        """
+        self.stiffness_matrix = scipy.sparse.csr_matrix(stiffness_matrix)
+        self.diagonal = self.stiffness_matrix.diagonal()
+        self.factorization = None
+
+    def solve(self, right_hand_side):
+        """Solve the system for one right hand side, or for each column of a 2D right hand side.
+
+        :param numpy.ndarray right_hand_side: right hand side vector or matrix
+        """
+        right_hand_side = numpy.asarray(right_hand_side, dtype=float)
+        if right_hand_side.ndim == 2:
+            return numpy.column_stack([self.solve(column) for column in right_hand_side.T])
+        # The preconditioner is only positive definite if the diagonal is positive
+        if self.factorization is None and (self.diagonal > 0).all():
+            solution, self.iterations = conjugate_gradient(self.stiffness_matrix, right_hand_side,
+                                                           lambda residual: residual / self.diagonal)
+            if solution is not None:
+                return solution
+        if self.factorization is None:
+            self.fallback_quantity += 1
+            self.factorization = scipy.sparse.linalg.splu(self.stiffness_matrix.tocsc())
+        return self.factorization.solve(right_hand_side)
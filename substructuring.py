@@ -0,0 +1,308 @@
+"""
+substructuring.py contains the domain decomposition solver that splits the membrane into non-overlapping subdomains,
+each owned by a worker process.
+
+Every worker keeps the vectorized element block of its subdomain, updates its elements for the current node positions,
+assembles its local stiffness matrix, and condenses out its interior degrees of freedom. The condensed interface
+stiffness (Schur complement) S = K_BB - K_BI*K_II^-1*K_IB and interface residual g = r_B - K_BI*K_II^-1*r_I of every
+subdomain are summed by the parent process, which solves the interface problem with the conjugate gradient method. The
+workers then recover their interior displacements from the interface displacements. The element updates, assembly,
+and factorizations of all subdomains run at the same time.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import multiprocessing
+import os
+
+import numpy
+import scipy.linalg
+
+import renumbering
+import solvers
+import vectorized
+
+
+def partition_elements(model, subdomain_quantity):
+    """Split the elements of a model into subdomains of consecutive elements along a Hilbert curve through their
+    centroids, so each subdomain is compact and the interfaces between them are short.
+
+    :param model: model.Model whose mesh has been created
+    :param int subdomain_quantity: number of subdomains
+    :return: list of arrays of element indices, one for each subdomain
+    """
+    centroids = numpy.array([numpy.mean([node.reference_position[:2] for node in element.nodes[:3]], axis=0)
+                             for element in model.elements])
+    element_order = numpy.argsort(renumbering.hilbert_curve_indices(centroids), kind='stable')
+    subdomain_quantity = max(1, min(subdomain_quantity, len(model.elements)))
+    return [numpy.sort(element_indices) for element_indices in numpy.array_split(element_order, subdomain_quantity)]
+
+
+def raise_worker_error(message):
+    """Raise the error sent by a worker process, if the message is an error.
+
+    :param tuple message: message received from a worker
+    """
+    if message[0] == 'error':
+        # Errors are sent as their class and attributes, since the error classes cannot be unpickled directly
+        error_class, arguments, attributes = message[1:]
+        error = error_class.__new__(error_class)
+        error.args = arguments
+        error.__dict__.update(attributes)
+        raise error
+
+
+def subdomain_worker(connection, subdomain):
+    """Run the commands sent by the parent process for one subdomain until it is told to stop.
+
+    :param connection: end of the pipe to the parent process
+    :param Subdomain subdomain: subdomain owned by the worker
+    """
+    while True:
+        command, arguments = connection.recv()
+        if command == 'stop':
+            break
+        try:
+            connection.send(('result', getattr(subdomain, command)(*arguments)))
+        except Exception as error:
+            connection.send(('error', type(error), error.args, error.__dict__))
+    connection.close()
+
+
+class Subdomain:
+    """Subdomain of the mesh, with its own element block and local numbering of its nodes and degrees of freedom.
+
+    :param block: vectorized.ElementBlock of the elements of the subdomain, in local node numbering
+    :param numpy.ndarray interior_dof_indices: local indices of the unknown degrees of freedom of the nodes that belong
+    only to this subdomain
+    :param numpy.ndarray interface_dof_indices: local indices of the unknown degrees of freedom of the nodes shared with
+    other subdomains
+    :ivar numpy.ndarray external_force_array: local external force array for the current load step
+    :ivar factorization: LU factorization of the interior stiffness matrix K_II
+    :ivar numpy.ndarray interior_coupling: K_II^-1*K_IB
+    :ivar numpy.ndarray interior_displacements: K_II^-1*r_I
+    """
+
+    def __init__(self, block, interior_dof_indices, interface_dof_indices):
+        self.block = block
+        self.interior_dof_indices = interior_dof_indices
+        self.interface_dof_indices = interface_dof_indices
+        self.element_dof_indices = block.element_dof_indices()
+        self.local_dof_quantity = 3 * (self.block.connectivity.max() + 1)
+        self.external_force_array = None
+        self.factorization = None
+        self.interior_coupling = None
+        self.interior_displacements = None
+
+    def back_substitute(self, interface_displacements):
+        """Return the interior displacements u_I = K_II^-1*(r_I - K_IB*u_B) for the interface displacements.
+
+        :param numpy.ndarray interface_displacements: displacements of the interface degrees of freedom of this
+        subdomain
+        """
+        return self.interior_displacements - numpy.dot(self.interior_coupling, interface_displacements)
+
+    def condense(self, node_positions):
+        """Update the elements for the current positions of the local nodes, assemble the local stiffness matrix and
+        residual, and condense out the interior degrees of freedom.
+
+        :param numpy.ndarray node_positions: current 3D positions of the local nodes
+        :return: strain energy, largest interior residual, interface residual, Schur complement, and condensed
+        interface residual of the subdomain
+        """
+        self.block.update(node_positions)
+        stiffness_matrix = vectorized.assemble_stiffness_matrix(self.block.stiffness_matrices,
+                                                                self.element_dof_indices, self.local_dof_quantity)
+        residual = self.external_force_array - vectorized.assemble_force_array(
+            self.block.internal_force_arrays, self.element_dof_indices, self.local_dof_quantity)
+        interior = self.interior_dof_indices
+        interface = self.interface_dof_indices
+        interior_residual = residual[interior]
+        interface_residual = residual[interface]
+        interface_interior_stiffness = stiffness_matrix[numpy.ix_(interface, interior)]
+        # Condense out the interior degrees of freedom
+        self.factorization = scipy.linalg.lu_factor(stiffness_matrix[numpy.ix_(interior, interior)])
+        self.interior_coupling = scipy.linalg.lu_solve(self.factorization,
+                                                       stiffness_matrix[numpy.ix_(interior, interface)])
+        self.interior_displacements = scipy.linalg.lu_solve(self.factorization, interior_residual)
+        schur_complement = (stiffness_matrix[numpy.ix_(interface, interface)]
+                            - numpy.dot(interface_interior_stiffness, self.interior_coupling))
+        condensed_residual = interface_residual - numpy.dot(interface_interior_stiffness,
+                                                            self.interior_displacements)
+        return (self.block.strain_energies.sum(), abs(interior_residual).max(initial=0), interface_residual,
+                schur_complement, condensed_residual)
+
+    def set_external_force(self, node_positions, current_load, balloon_internal_pressure):
+        """Compute the local external force array for the current load in the current configuration.
+
+        :param numpy.ndarray node_positions: current 3D positions of the local nodes
+        :param numpy.ndarray current_load: vector of current transverse load applied to the membrane (force/area)
+        :param bool balloon_internal_pressure: whether the load is an internal pressure normal to the balloon
+        """
+        self.external_force_array = vectorized.assemble_force_array(
+            self.block.external_force_arrays(node_positions, current_load, balloon_internal_pressure),
+            self.element_dof_indices, self.local_dof_quantity)
+
+    def stretch_ratios(self):
+        """Return the thickness stretch ratios of the quadrature points of the subdomain."""
+        return self.block.stretch_ratios
+
+
+class SubdomainPool:
+    """Worker processes that own the subdomains of a model, and the interface problem that couples them.
+
+    :param model: model.Model whose degrees of freedom have been numbered
+    :param int subdomain_quantity: number of subdomains and worker processes, or None for the number of CPUs
+    :ivar list element_indices: indices of the elements of each subdomain
+    :ivar list node_ids: global IDs of the local nodes of each subdomain
+    :ivar numpy.ndarray interface_dof_indices: sorted global indices of the unknown interface degrees of freedom
+    :ivar float strain_energy: strain energy of the model in the last configuration
+    :ivar int iterations: conjugate gradient iterations of the last interface solve
+    """
+
+    def __init__(self, model, subdomain_quantity=None):
+        if subdomain_quantity is None:
+            subdomain_quantity = os.cpu_count()
+        block = vectorized.ElementBlock.from_model(model)
+        self.element_indices = partition_elements(model, subdomain_quantity)
+        # Nodes shared by elements of more than one subdomain are interface nodes
+        self.node_ids = [numpy.unique(block.connectivity[element_indices])
+                         for element_indices in self.element_indices]
+        subdomain_counts = numpy.bincount(numpy.concatenate(self.node_ids), minlength=model.node_quantity)
+        unknown = numpy.zeros(model.global_dof_quantity, dtype=bool)
+        unknown[model.unknown_dof_indices] = True
+        interface = numpy.repeat(subdomain_counts > 1, 3) & unknown
+        self.interface_dof_indices = numpy.flatnonzero(interface)
+        self.global_dof_quantity = model.global_dof_quantity
+        self.strain_energy = None
+        self.iterations = 0
+        self.interior_global_dof_indices = []
+        self.interface_positions = []
+        self.schur_complements = []
+        self.condensed_residuals = []
+        self.connections = []
+        self.processes = []
+        for element_indices, node_ids in zip(self.element_indices, self.node_ids):
+            local_dofs = (3 * node_ids[:, None] + numpy.arange(3)[None, :]).ravel()
+            interior_dof_indices = numpy.flatnonzero(unknown[local_dofs] & ~interface[local_dofs])
+            interface_dof_indices = numpy.flatnonzero(interface[local_dofs])
+            self.interior_global_dof_indices.append(local_dofs[interior_dof_indices])
+            self.interface_positions.append(numpy.searchsorted(self.interface_dof_indices,
+                                                               local_dofs[interface_dof_indices]))
+            subdomain_block = vectorized.ElementBlock(
+                element_type=block.element_type,
+                constitutive_model=block.constitutive_model,
+                quadrature_class=block.quadrature_class,
+                connectivity=numpy.searchsorted(node_ids, block.connectivity[element_indices]),
+                node_reference_positions=numpy.array([model.nodes[global_id].reference_position
+                                                      for global_id in node_ids], dtype=float),
+                first_lame_parameters=block.first_lame_parameters[element_indices],
+                shear_moduli=block.shear_moduli[element_indices],
+                thicknesses=block.thicknesses[element_indices])
+            subdomain_block.stretch_ratios[...] = block.stretch_ratios[element_indices]
+            subdomain = Subdomain(subdomain_block, interior_dof_indices, interface_dof_indices)
+            parent_connection, child_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=subdomain_worker, args=(child_connection, subdomain),
+                                              daemon=True)
+            process.start()
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the worker processes."""
+        for connection, process in zip(self.connections, self.processes):
+            connection.send(('stop', ()))
+            process.join()
+        self.connections = []
+        self.processes = []
+
+    def command(self, command, arguments):
+        """Send a command to every worker, so the workers run it at the same time, and return their results.
+
+        :param str command: name of the Subdomain method to run
+        :param list arguments: tuple of arguments for each subdomain
+        """
+        for connection, subdomain_arguments in zip(self.connections, arguments):
+            connection.send((command, subdomain_arguments))
+        results = []
+        for connection in self.connections:
+            message = connection.recv()
+            raise_worker_error(message)
+            results.append(message[1])
+        return results
+
+    def set_external_force(self, node_positions, current_load, balloon_internal_pressure):
+        """Compute the external force of every subdomain for the current load in the current configuration.
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes, indexed by global ID
+        :param numpy.ndarray current_load: vector of current transverse load applied to the membrane (force/area)
+        :param bool balloon_internal_pressure: whether the load is an internal pressure normal to the balloon
+        """
+        self.command('set_external_force', [(node_positions[node_ids], current_load, balloon_internal_pressure)
+                                            for node_ids in self.node_ids])
+
+    def solve(self):
+        """Solve the interface problem assembled by the last update, and return the displacement increment of every
+        unknown degree of freedom, indexed by global degree of freedom."""
+        interface_quantity = len(self.interface_dof_indices)
+        schur_complement = numpy.zeros((interface_quantity, interface_quantity))
+        condensed_residual = numpy.zeros(interface_quantity)
+        for positions, subdomain_schur_complement, subdomain_residual in zip(
+                self.interface_positions, self.schur_complements, self.condensed_residuals):
+            schur_complement[numpy.ix_(positions, positions)] += subdomain_schur_complement
+            condensed_residual[positions] += subdomain_residual
+        interface_displacements = numpy.zeros(interface_quantity)
+        if interface_quantity:
+            # Conjugate gradient method with a diagonal preconditioner, or a direct solve if it breaks down
+            diagonal = schur_complement.diagonal().copy()
+            diagonal[diagonal == 0] = 1
+            interface_displacements, self.iterations = solvers.conjugate_gradient(
+                schur_complement, condensed_residual, lambda residual: residual / diagonal)
+            if interface_displacements is None:
+                interface_displacements = scipy.linalg.solve(schur_complement, condensed_residual)
+        interior_displacements = self.command(
+            'back_substitute', [(interface_displacements[positions],) for positions in self.interface_positions])
+        displacements = numpy.zeros(self.global_dof_quantity)
+        displacements[self.interface_dof_indices] = interface_displacements
+        for global_dof_indices, subdomain_displacements in zip(self.interior_global_dof_indices,
+                                                               interior_displacements):
+            displacements[global_dof_indices] = subdomain_displacements
+        return displacements
+
+    def stretch_ratios(self, element_quantity):
+        """Return the thickness stretch ratios of the quadrature points of all elements, in model element order.
+
+        :param int element_quantity: number of elements in the model
+        """
+        results = self.command('stretch_ratios', [()] * len(self.connections))
+        stretch_ratios = numpy.zeros((element_quantity, results[0].shape[1]))
+        for element_indices, subdomain_stretch_ratios in zip(self.element_indices, results):
+            stretch_ratios[element_indices] = subdomain_stretch_ratios
+        return stretch_ratios
+
+    def update(self, node_positions):
+        """Update every subdomain for the current node positions and condense out the interior degrees of freedom.
+        Returns the largest residual of the unknown degrees of freedom.
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes, indexed by global ID
+        """
+        results = self.command('condense', [(node_positions[node_ids],) for node_ids in self.node_ids])
+        interface_residual = numpy.zeros(len(self.interface_dof_indices))
+        error = 0.
+        self.strain_energy = 0.
+        self.schur_complements = []
+        self.condensed_residuals = []
+        for positions, result in zip(self.interface_positions, results):
+            strain_energy, interior_error, subdomain_interface_residual, schur_complement, condensed_residual = result
+            self.strain_energy += strain_energy
+            error = max(error, interior_error)
+            # Interface residuals are partial sums over the elements of each subdomain
+            interface_residual[positions] += subdomain_interface_residual
+            self.schur_complements.append(schur_complement)
+            self.condensed_residuals.append(condensed_residual)
+        return max(error, abs(interface_residual).max(initial=0))
@@ -0,0 +1,159 @@
+"""
+sweeps.py contains the runner for parameter sweeps, which run the same membrane analysis for every combination of a
+grid of parameter values in a pool of worker processes.
+
+The cases are grouped by mesh, and the mesh of each group is generated once and shared by all of its cases. The cases of
+a group are split into chains of consecutive cases of the grid, which differ in one parameter, and each chain runs in
+one worker process. Consecutive cases of a chain that differ only in their load case are solved by the same
+model.PreparedModel, so the mesh is only preprocessed once for them. Every case in a chain is warm started from the
+converged solution of the case before it, and solved again from the reference configuration if the warm start fails.
+The load and maximum deflection of every converged load step of every case are collected into one table.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import inspect
+import itertools
+import math
+import multiprocessing
+import os
+
+import numpy
+
+import constants
+import exceptions
+import materials
+import model
+
+
+def parameter_grid(grid):
+    """Return every combination of the values of a parameter grid, as a list of dictionaries of parameter values. The
+    last parameter varies fastest, so consecutive combinations differ in one parameter.
+
+    :param dict grid: list of values of each parameter
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+
+
+def run_chain(chain):
+    """Run the headless analyses of a chain of cases on the same mesh in order, warm starting each case from the
+    converged solution of the case before it, and return the case index, results, and error message of each case.
+    A prepared model is reused by consecutive cases that differ only in their load case.
+
+    :param tuple chain: mesh (dictionary of mesh inputs of model.Model) and list of the case index and model.Model
+    keyword arguments of each case
+    """
+    mesh, cases = chain
+    chain_results = []
+    warm_start_displacements = None
+    analysis = None
+    preparation = None
+    for case_index, model_parameters in cases:
+        load_case = {name: value for name, value in model_parameters.items()
+                     if name in constants.LOAD_CASE_PARAMETERS}
+        case_preparation = {name: value for name, value in model_parameters.items()
+                            if name not in constants.LOAD_CASE_PARAMETERS}
+        try:
+            if analysis is None or not same_parameters(case_preparation, preparation):
+                analysis = model.PreparedModel(plot=False, **mesh, **model_parameters)
+                preparation = case_preparation
+            try:
+                analysis.solve(dict(load_case, warm_start_displacements=warm_start_displacements))
+            except exceptions.BaseException:
+                if warm_start_displacements is None:
+                    raise
+                # The warm start may be too far from the solution, so solve again from the reference configuration
+                analysis.solve(dict(load_case, warm_start_displacements=None))
+        except exceptions.BaseException as error:
+            # The next case starts from the reference configuration
+            chain_results.append((case_index, None, str(error)))
+            warm_start_displacements = None
+            continue
+        warm_start_displacements = analysis.converged_displacements
+        chain_results.append((case_index, {'load_steps': analysis.load_steps,
+                                           'maximum_deflections': analysis.maximum_deflections}, None))
+    return chain_results
+
+
+def same_parameters(parameters_1, parameters_2):
+    """Return whether two dictionaries of model parameters are equal. Arrays are compared by value, and other
+    objects (such as materials) by identity or equality.
+
+    :param dict parameters_1: first parameters
+    :param dict parameters_2: second parameters
+    """
+    if parameters_1.keys() != parameters_2.keys():
+        return False
+    for name, value in parameters_1.items():
+        other_value = parameters_2[name]
+        if isinstance(value, numpy.ndarray) or isinstance(other_value, numpy.ndarray):
+            if not numpy.array_equal(value, other_value):
+                return False
+        elif value is not other_value and value != other_value:
+            return False
+    return True
+
+
+def sweep(parameters, grid, mesh_generator, mesh_parameters, worker_quantity=None):
+    """Run the analysis for every combination of the values of a parameter grid in a pool of worker processes, and
+    return the table of results and the error message of every case that failed.
+
+    The table is a dictionary of columns with one row per converged load step: 'case' (index of the combination in
+    parameter_grid(grid)), one column for each parameter of the grid, 'load', and 'maximum_deflection'.
+
+    :param dict parameters: keyword arguments of model.Model for every case, other than the mesh inputs
+    :param dict grid: list of values of each swept parameter. A parameter is a keyword argument of model.Model, the
+    first_lame_parameter or shear_modulus of the material, or a parameter of the mesh generator
+    :param mesh_generator: function that returns the mesh inputs of model.Model (see meshes.py)
+    :param dict mesh_parameters: parameters of the mesh generator for every case
+    :param int worker_quantity: number of worker processes, or None for the number of CPUs
+    """
+    if worker_quantity is None:
+        worker_quantity = os.cpu_count()
+    mesh_parameter_names = inspect.signature(mesh_generator).parameters
+    material_parameter_names = ('first_lame_parameter', 'shear_modulus')
+    cases = parameter_grid(grid)
+    # Group the cases by their mesh parameters
+    groups = {}
+    case_materials = {}
+    for case_index, case in enumerate(cases):
+        model_parameters = dict(parameters)
+        for name, value in case.items():
+            if name not in mesh_parameter_names and name not in material_parameter_names:
+                model_parameters[name] = value
+        if any(name in case for name in material_parameter_names):
+            # Cases with the same material parameters share the material, so they can share a prepared model
+            material = parameters['material']
+            material_key = (case.get('first_lame_parameter', material.first_lame_parameter),
+                            case.get('shear_modulus', material.shear_modulus))
+            if material_key not in case_materials:
+                case_materials[material_key] = materials.Custom(material.name, *material_key)
+            model_parameters['material'] = case_materials[material_key]
+        mesh_key = tuple((name, value) for name, value in case.items() if name in mesh_parameter_names)
+        groups.setdefault(mesh_key, []).append((case_index, model_parameters))
+    # Generate the mesh of each group once, and split the group into chains in proportion to its size
+    chains = []
+    for mesh_key, group_cases in groups.items():
+        mesh = mesh_generator(**dict(mesh_parameters, **dict(mesh_key)))
+        chain_quantity = min(math.ceil(worker_quantity * len(group_cases) / len(cases)), len(group_cases))
+        for chain_indices in numpy.array_split(numpy.arange(len(group_cases)), chain_quantity):
+            chains.append((mesh, [group_cases[index] for index in chain_indices]))
+    if worker_quantity > 1 and len(chains) > 1:
+        with multiprocessing.Pool(min(worker_quantity, len(chains))) as pool:
+            chain_results = pool.map(run_chain, chains)
+    else:
+        chain_results = [run_chain(chain) for chain in chains]
+    # Collect the results of every case in case order
+    table = {name: [] for name in ['case'] + list(grid) + ['load', 'maximum_deflection']}
+    errors = {}
+    for case_index, results, error in sorted(itertools.chain.from_iterable(chain_results), key=lambda row: row[0]):
+        if error is not None:
+            errors[case_index] = error
+            continue
+        for load, maximum_deflection in zip(results['load_steps'], results['maximum_deflections']):
+            table['case'].append(case_index)
+            for name in grid:
+                table[name].append(cases[case_index][name])
+            table['load'].append(load)
+            table['maximum_deflection'].append(maximum_deflection)
+    return {name: numpy.array(values) for name, values in table.items()}, errors
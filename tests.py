@@ -7,13 +7,82 @@ tests.py module contains all verification tests used to ensure correctness of th
 import random
 
 import numpy
+import scipy.sparse
 from scipy.integrate import dblquad
 
+import batch
 import constants
 import constitutive_models
+import engine
 import exceptions
 import materials
 import operations
+import reductions
+import vectorized
+
+
+def batch_failed_model(prepared_model, shear_modulus_factor=1e-6):
+    """Check that a model of a batch that fails, because its shear modulus is too small for its plane stress solve to
+    converge, is marked as failed without stopping the other model of the batch, whose results must equal those of a
+    batch of that model alone.
+
+    :param prepared_model: model.PreparedModel whose load case the healthy model of the batch solves
+    :param float shear_modulus_factor: factor of the shear modulus of the prepared model that gives the failing model
+    """
+    shear_modulus = prepared_model.material.shear_modulus
+    failing_batch = batch.BatchSolver(prepared_model,
+                                      shear_moduli=[shear_modulus, shear_modulus_factor * shear_modulus])
+    failing_batch.solve()
+    healthy_batch = batch.BatchSolver(prepared_model, shear_moduli=[shear_modulus])
+    healthy_batch.solve()
+    if not failing_batch.failed[1]:
+        raise exceptions.BatchIsolationError(model_index=1,
+                                             reason='the model with the small shear modulus did not fail')
+    if failing_batch.failed[0] != healthy_batch.failed[0]:
+        raise exceptions.BatchIsolationError(model_index=0, reason='its failure changed')
+    for quantity in ['load_steps', 'maximum_deflections', 'newton_iterations']:
+        difference = relative_difference(getattr(failing_batch, quantity)[0], getattr(healthy_batch, quantity)[0])
+        if not difference <= constants.IMPLEMENTATION_TOLERANCE:
+            raise exceptions.BatchIsolationError(model_index=0, reason='its ' + quantity.replace('_', ' ')
+                                                                       + ' changed by ' + str(difference))
+
+
+def blocked_sum_reproducibility(model, worker_quantities=(2, 3, 4), chunk_size=4):
+    """Check that the global strain energy and internal force array assembled by the threaded element engine in
+    reproducible mode are bitwise identical for any number of threads, with and without compensated summation, and
+    that the strain energy is the blocked sum of the element strain energies in element order.
+
+    :param model: model.Model whose element objects are in the current configuration
+    :param tuple worker_quantities: numbers of threads to compare against one thread
+    :param int chunk_size: number of elements in each chunk, small so the chunks are spread over the threads
+    """
+    node_positions = model.current_node_positions()
+    stretch_ratios = model.quadrature_point_stretch_ratios()
+    for compensated in [False, True]:
+        results = []
+        for worker_quantity in (1,) + tuple(worker_quantities):
+            element_engine = engine.ThreadedEngine(worker_quantity=worker_quantity, chunk_size=chunk_size,
+                                                   compensated=compensated)
+            element_engine.prepare(model)
+            element_engine.block.stretch_ratios[...] = stretch_ratios
+            strain_energy, internal_force_array, _ = element_engine.update(node_positions, stiffness=False)
+            element_strain_energies = numpy.concatenate([chunk.strain_energies for chunk in element_engine.chunks])
+            element_engine.close()
+            if strain_energy != reductions.blocked_sum(element_strain_energies, compensated):
+                raise exceptions.ReproducibilityError(
+                    quantity='strain energy', worker_quantity=worker_quantity,
+                    difference=strain_energy - reductions.blocked_sum(element_strain_energies, compensated))
+            results.append((worker_quantity, strain_energy, internal_force_array))
+        # Compare the results of each number of threads against those of one thread
+        _, serial_strain_energy, serial_internal_force_array = results[0]
+        for worker_quantity, strain_energy, internal_force_array in results[1:]:
+            if strain_energy != serial_strain_energy:
+                raise exceptions.ReproducibilityError(quantity='strain energy', worker_quantity=worker_quantity,
+                                                      difference=strain_energy - serial_strain_energy)
+            if not numpy.array_equal(internal_force_array, serial_internal_force_array):
+                raise exceptions.ReproducibilityError(
+                    quantity='internal force array', worker_quantity=worker_quantity,
+                    difference=abs(internal_force_array - serial_internal_force_array).max())
 
 
 def deformation_gradient_physical(jacobian):
@@ -35,6 +104,55 @@ def deformation_gradient_plane_stress(deformation_gradient):
         raise exceptions.PlaneStressError(deformation_gradient=deformation_gradient)
 
 
+def element_block(model):
+    """Check that the vectorized element block of a model computes the strain energy, internal force array, and
+    stiffness matrix of each element object in the current configuration.
+
+    :param model: model.Model whose element objects are in the current configuration
+    """
+    block = vectorized.ElementBlock.from_model(model)
+    block.update(model.current_node_positions())
+    comparisons = [('strain energies', block.strain_energies,
+                    [element.strain_energy for element in model.elements]),
+                   ('internal force arrays', block.internal_force_arrays,
+                    [element.internal_force_array for element in model.elements]),
+                   ('stiffness matrices', block.stiffness_matrices,
+                    [element.stiffness_matrix for element in model.elements])]
+    for quantity, block_values, element_values in comparisons:
+        difference = relative_difference(block_values, numpy.array(element_values, dtype=float))
+        if difference > constants.IMPLEMENTATION_TOLERANCE:
+            raise exceptions.ImplementationMismatchError(implementation='vectorized element block',
+                                                         quantity=quantity, difference=difference,
+                                                         tolerance=constants.IMPLEMENTATION_TOLERANCE)
+
+
+def element_engine(model, element_engine):
+    """Check that an element engine assembles the global strain energy, internal force array, and stiffness matrix
+    that the model assembles from its element objects in the current configuration.
+
+    :param model: model.Model without an element engine, whose element objects are in the current configuration
+    :param element_engine: element engine to check (see engine.py). It is prepared for the model and closed
+    """
+    element_engine.prepare(model)
+    # Start the plane stress solves of the engine from the stretch ratios of the element objects
+    element_engine.block.stretch_ratios[...] = model.quadrature_point_stretch_ratios()
+    strain_energy, internal_force_array, stiffness_matrix = element_engine.update(model.current_node_positions())
+    element_engine.close()
+    if scipy.sparse.issparse(stiffness_matrix):
+        stiffness_matrix = stiffness_matrix.toarray()
+    # Assemble the global quantities from the element objects
+    model.update_global()
+    comparisons = [('strain energy', strain_energy, model.strain_energy),
+                   ('internal force array', internal_force_array, model.internal_force_array),
+                   ('stiffness matrix', stiffness_matrix, model.stiffness_matrix)]
+    for quantity, engine_value, model_value in comparisons:
+        difference = relative_difference(engine_value, model_value)
+        if difference > constants.IMPLEMENTATION_TOLERANCE:
+            raise exceptions.ImplementationMismatchError(implementation=element_engine.__class__.__name__,
+                                                         quantity=quantity, difference=difference,
+                                                         tolerance=constants.IMPLEMENTATION_TOLERANCE)
+
+
 def gauss_quadrature(quadrature_class):
     """Check numerical integration using Gauss quadrature against exact integration for an isoparametric
     triangular element for first and second order polynomials.
@@ -464,6 +582,16 @@ def rank_stiffness_matrix(element, stiffness_matrix):
     rank = numpy.linalg.matrix_rank(reshaped_stiffness_matrix, tol=1e-10)
 
 
+def relative_difference(value, comparison_value):
+    """Return the largest difference between two arrays relative to the largest magnitude of the comparison array.
+
+    :param numpy.ndarray value: array to compare
+    :param numpy.ndarray comparison_value: array to compare against, with the same shape
+    """
+    scale = max(numpy.abs(comparison_value).max(), constants.FLOATING_POINT_TOLERANCE)
+    return numpy.abs(numpy.asarray(value) - comparison_value).max() / scale
+
+
 def shape_functions(element_class):
     """Verify that the shape functions for the given triangular element class are implemented correctly by checking that
     they satisfy partition of unity and that the derivatives satisfy partition of nullity.
@@ -0,0 +1,432 @@
+"""
+vectorized.py contains array implementations of the element computations, which evaluate the quadrature point
+kinematics, plane stress, material response, and element arrays of many elements at once.
+
+The computations follow the element, quadrature point, and configuration classes exactly, so the results agree with
+the object implementation to floating point precision. All state (the thickness stretch ratio of every quadrature
+point) is kept in arrays, so a block of elements needs no Element or QuadraturePoint objects.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import numpy
+
+import constants
+import exceptions
+import tests
+
+
+class ElementBlock:
+    """Block of elements of the same type, quadrature, and constitutive model, stored as arrays.
+
+    :param element_type: element class of all elements in the block
+    :param constitutive_model: constitutive model class that describes the material behavior
+    :param quadrature_class: quadrature class used by all elements in the block
+    :param numpy.ndarray connectivity: array of global node IDs for each element, ordered as the element nodes
+    :param numpy.ndarray node_reference_positions: array of 3D reference positions of all nodes in the model
+    :param numpy.ndarray first_lame_parameters: first Lame parameter of each element
+    :param numpy.ndarray shear_moduli: shear modulus of each element
+    :param numpy.ndarray thicknesses: thickness of each element
+    :param tuple reference_geometry: contravariant reference basis and reference differential area of each element
+    (see reference_configuration) computed before for the same elements, or None to compute them
+    :param tuple quadrature_point_state: arrays to hold the stretch ratios and plane stress iterations of the quadrature
+    points, shaped (element, quadrature point), or None to create them. Given arrays are used as they are
+    :ivar numpy.ndarray stretch_ratios: thickness stretch ratio of each quadrature point, saved as the initial guess for
+    the next plane stress solve
+    :ivar numpy.ndarray plane_stress_iterations: Newton iterations of the last plane stress solve at each quadrature
+    point
+    :ivar numpy.ndarray strain_energies: strain energy of each element
+    :ivar numpy.ndarray kirchhoff_stresses: contravariant Kirchhoff stress at each quadrature point
+    :ivar numpy.ndarray internal_force_arrays: internal force array of each element, shaped (dof, node)
+    :ivar numpy.ndarray stiffness_matrices: stiffness matrix of each element, shaped (dof, node, dof, node)
+    :ivar numpy.ndarray failed_elements: whether the plane stress solve of each element did not converge or its
+    Jacobian is not positive in the last update that did not raise errors for them
+    """
+
+    def __init__(self, element_type, constitutive_model, quadrature_class, connectivity, node_reference_positions,
+                 first_lame_parameters, shear_moduli, thicknesses, reference_geometry=None,
+                 quadrature_point_state=None):
+        self.element_type = element_type
+        self.constitutive_model = constitutive_model
+        self.quadrature_class = quadrature_class
+        self.connectivity = numpy.asarray(connectivity, dtype=int)
+        self.element_quantity = self.connectivity.shape[0]
+        self.first_lame_parameters = numpy.asarray(first_lame_parameters, dtype=float)
+        self.shear_moduli = numpy.asarray(shear_moduli, dtype=float)
+        self.thicknesses = numpy.asarray(thicknesses, dtype=float)
+
+        # Shape function tables at the quadrature points
+        self.weights = numpy.array(quadrature_class.point_weights, dtype=float)
+        self.shape_functions = numpy.array(
+            [[element_type.shape_functions(node_index=node_index, position=position)
+              for node_index in range(element_type.node_quantity)]
+             for position in quadrature_class.point_positions], dtype=float)
+        self.shape_function_derivatives = numpy.array(
+            [[[element_type.shape_function_derivatives(node_index=node_index, position=position,
+                                                       coordinate_index=coordinate_index)
+               for coordinate_index in range(element_type.dimension)]
+              for node_index in range(element_type.node_quantity)]
+             for position in quadrature_class.point_positions], dtype=float)
+
+        # Reference configuration, computed at the first quadrature point as in the element classes
+        if reference_geometry is None:
+            reference_geometry = self.reference_configuration(node_reference_positions)
+        self.reference_basis_contravariant, self.reference_differential_areas = reference_geometry
+
+        # Quadrature point state
+        if quadrature_point_state is None:
+            quadrature_point_state = (numpy.ones((self.element_quantity, quadrature_class.point_quantity)),
+                                      numpy.zeros((self.element_quantity, quadrature_class.point_quantity), dtype=int))
+        self.stretch_ratios, self.plane_stress_iterations = quadrature_point_state
+
+        # Properties that change with each deformation
+        self.strain_energies = None
+        self.kirchhoff_stresses = None
+        self.internal_force_arrays = None
+        self.stiffness_matrices = None
+        self.failed_elements = None
+
+    @classmethod
+    def from_model(cls, model):
+        """Create a block holding all elements of a model, with the quadrature point state of the element objects.
+
+        :param model: model whose elements are copied into the block. The reference geometry of its preprocessed
+        mesh tables is used if it has them
+        """
+        connectivity = [[node.global_id for node in element.nodes] for element in model.elements]
+        reference_geometry = None
+        if model.mesh_tables is not None:
+            reference_geometry = (model.mesh_tables['reference_basis_contravariant'],
+                                  model.mesh_tables['reference_differential_areas'])
+        node_reference_positions = numpy.zeros((model.node_quantity, 3))
+        for node in model.nodes:
+            node_reference_positions[node.global_id] = node.reference_position
+        block = cls(element_type=model.element_type,
+                    constitutive_model=model.constitutive_model,
+                    quadrature_class=model.quadrature_class,
+                    connectivity=connectivity,
+                    node_reference_positions=node_reference_positions,
+                    first_lame_parameters=[element.material.first_lame_parameter for element in model.elements],
+                    shear_moduli=[element.material.shear_modulus for element in model.elements],
+                    thicknesses=[element.thickness for element in model.elements],
+                    reference_geometry=reference_geometry)
+        for element_index, element in enumerate(model.elements):
+            for point_index, quadrature_point in enumerate(element.quadrature_points):
+                block.stretch_ratios[element_index][point_index] = quadrature_point.stretch_ratio
+        return block
+
+    def chunk(self, start, stop):
+        """Return a block for the elements in [start, stop) that shares the state arrays of this block, so updates of
+        the chunk are seen by the whole block.
+
+        :param int start: index of the first element of the chunk
+        :param int stop: index after the last element of the chunk
+        """
+        chunk = ElementBlock.__new__(ElementBlock)
+        chunk.__dict__.update(self.__dict__)
+        for name in ('connectivity', 'first_lame_parameters', 'shear_moduli', 'thicknesses',
+                     'reference_basis_contravariant', 'reference_differential_areas', 'stretch_ratios',
+                     'plane_stress_iterations'):
+            setattr(chunk, name, getattr(self, name)[start:stop])
+        chunk.element_quantity = chunk.connectivity.shape[0]
+        chunk.strain_energies = None
+        chunk.kirchhoff_stresses = None
+        chunk.internal_force_arrays = None
+        chunk.stiffness_matrices = None
+        chunk.failed_elements = None
+        return chunk
+
+    def element_dof_indices(self):
+        """Return the global degree of freedom index of every entry of the element force arrays, shaped
+        (element, dof, node)."""
+        return 3 * self.connectivity[:, None, :] + numpy.arange(3)[None, :, None]
+
+    def external_force_arrays(self, node_positions, current_load, balloon_internal_pressure):
+        """Compute the external force array of every element for the current load.
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes in the model
+        :param numpy.ndarray current_load: vector of current transverse load applied to the membrane (force/area), or
+        one vector for each element
+        :param bool balloon_internal_pressure: whether the load is an internal pressure normal to the balloon
+        """
+        current_load = numpy.asarray(current_load, dtype=float)
+        if balloon_internal_pressure:
+            # Load points from the origin through the element centroid
+            centroid_directions = node_positions[self.connectivity].sum(axis=1)
+            load_vectors = current_load[..., 2, None] * (centroid_directions
+                                                         / numpy.linalg.norm(centroid_directions, axis=1)[:, None])
+        else:
+            load_vectors = numpy.broadcast_to(current_load, (self.element_quantity, 3))
+        integrated_shape_functions = numpy.dot(self.weights, self.shape_functions)
+        return (.5 * self.reference_differential_areas[:, None, None] * load_vectors[:, :, None]
+                * integrated_shape_functions[None, None, :])
+
+    def reference_configuration(self, node_reference_positions):
+        """Compute the contravariant reference basis and the reference differential area of every element.
+
+        :param numpy.ndarray node_reference_positions: array of 3D reference positions of all nodes in the model
+        """
+        reference_positions = numpy.asarray(node_reference_positions, dtype=float)[self.connectivity]
+        midsurface_basis = numpy.einsum('nc,enl->ecl', self.shape_function_derivatives[0], reference_positions)
+        metric = numpy.einsum('ecl,edl->ecd', midsurface_basis, midsurface_basis)
+        differential_areas = numpy.sqrt(numpy.linalg.det(metric))
+        normals = numpy.cross(midsurface_basis[:, 0], midsurface_basis[:, 1]) / differential_areas[:, None]
+        basis_contravariant = numpy.empty((self.element_quantity, 3, 3))
+        basis_contravariant[:, :2] = numpy.einsum('ecd,edl->ecl', numpy.linalg.inv(metric), midsurface_basis)
+        basis_contravariant[:, 2] = normals
+        return basis_contravariant, differential_areas
+
+    def set_subset_state(self, element_indices, subset):
+        """Copy the quadrature point state of a subset of this block back to this block.
+
+        :param numpy.ndarray element_indices: indices of the elements of the subset
+        :param subset: block returned by subset(element_indices)
+        """
+        self.stretch_ratios[element_indices] = subset.stretch_ratios
+        self.plane_stress_iterations[element_indices] = subset.plane_stress_iterations
+
+    def subset(self, element_indices):
+        """Return a block for the elements with the given indices. Unlike a chunk, the state arrays of the subset are
+        copies, so its updated state must be copied back to this block with set_subset_state.
+
+        :param numpy.ndarray element_indices: indices of the elements of the subset
+        """
+        subset = ElementBlock.__new__(ElementBlock)
+        subset.__dict__.update(self.__dict__)
+        for name in ('connectivity', 'first_lame_parameters', 'shear_moduli', 'thicknesses',
+                     'reference_basis_contravariant', 'reference_differential_areas', 'stretch_ratios',
+                     'plane_stress_iterations'):
+            setattr(subset, name, getattr(self, name)[element_indices])
+        subset.element_quantity = subset.connectivity.shape[0]
+        subset.strain_energies = None
+        subset.kirchhoff_stresses = None
+        subset.internal_force_arrays = None
+        subset.stiffness_matrices = None
+        subset.failed_elements = None
+        return subset
+
+    def update(self, node_positions, stiffness=True, max_iterations=15, raise_errors=True):
+        """Update the quadrature points for the current node positions, and compute the strain energy, internal force
+        array, and (optionally) stiffness matrix of every element.
+
+        :param numpy.ndarray node_positions: current 3D positions of all nodes in the model
+        :param bool stiffness: whether to compute the element stiffness matrices
+        :param int max_iterations: max plane stress iterations before assuming the solution has diverged
+        :param bool raise_errors: whether to raise an error if the plane stress solve of an element does not converge or
+        its Jacobian is not positive. Otherwise the element is marked in failed_elements, its results are not
+        meaningful, and the other elements are computed as usual
+        """
+        current_positions = numpy.asarray(node_positions, dtype=float)[self.connectivity]
+        # Current midsurface basis, metric, and normal at each quadrature point
+        midsurface_basis = numpy.einsum('qnc,enl->eqcl', self.shape_function_derivatives, current_positions)
+        metric = numpy.einsum('eqcl,eqdl->eqcd', midsurface_basis, midsurface_basis)
+        differential_areas = numpy.sqrt(numpy.linalg.det(metric))
+        normals = (numpy.cross(midsurface_basis[:, :, 0], midsurface_basis[:, :, 1])
+                   / differential_areas[:, :, None])
+        midsurface_basis_contravariant = numpy.einsum('eqcd,eqdl->eqcl', numpy.linalg.inv(metric), midsurface_basis)
+        # In-plane deformation gradient
+        in_plane_deformation_gradients = numpy.einsum('eqcl,ecm->eqlm', midsurface_basis,
+                                                      self.reference_basis_contravariant[:, :2])
+        reference_normals = self.reference_basis_contravariant[:, 2]
+        transverse_deformation_gradients = normals[:, :, :, None] * reference_normals[:, None, None, :]
+        first_lame_parameters = self.first_lame_parameters[:, None]
+        shear_moduli = self.shear_moduli[:, None]
+        # Enforce plane stress
+        stretch_ratios, converged = self.enforce_plane_stress(in_plane_deformation_gradients,
+                                                              transverse_deformation_gradients, normals,
+                                                              max_iterations, raise_errors)
+        deformation_gradients = (in_plane_deformation_gradients
+                                 + stretch_ratios[:, :, None, None] * transverse_deformation_gradients)
+        jacobians = numpy.linalg.det(deformation_gradients)
+        if raise_errors:
+            tests.deformation_gradient_physical(jacobian=jacobians.min())
+            self.failed_elements = numpy.zeros(self.element_quantity, dtype=bool)
+        else:
+            self.failed_elements = ~(converged & (jacobians > 0)).all(axis=1)
+            # Give the failed elements no thickness stretch instead of a diverged one. Their results are not meaningful
+            stretch_ratios[self.failed_elements] = 1.
+            deformation_gradients[self.failed_elements] = (in_plane_deformation_gradients
+                                                           + transverse_deformation_gradients)[self.failed_elements]
+        # Full current basis, including the transverse basis vectors for the stretch ratio
+        basis = numpy.concatenate((midsurface_basis, (normals * stretch_ratios[:, :, None])[:, :, None]), axis=2)
+        basis_contravariant = numpy.concatenate(
+            (midsurface_basis_contravariant, (normals / stretch_ratios[:, :, None])[:, :, None]), axis=2)
+        # Material response
+        strain_energy_densities = self.constitutive_model.strain_energy_density_array(
+            first_lame_parameters, shear_moduli, deformation_gradients)
+        first_piola_kirchhoff_stresses = self.constitutive_model.first_piola_kirchhoff_stress_array(
+            first_lame_parameters, shear_moduli, deformation_gradients)
+        kirchhoff_stresses_lab = numpy.einsum('eqik,eqjk->eqij', first_piola_kirchhoff_stresses,
+                                              deformation_gradients)
+        self.kirchhoff_stresses = numpy.einsum('eqia,eqab,eqjb->eqij', basis_contravariant, kirchhoff_stresses_lab,
+                                               basis_contravariant)
+        # Scale for isoparametric triangle and multiply by the thickness and differential area
+        scale = .5 * self.thicknesses * self.reference_differential_areas
+        self.strain_energies = scale * numpy.dot(strain_energy_densities, self.weights)
+        self.internal_force_arrays = scale[:, None, None] * numpy.einsum(
+            'q,eqcj,eqji,qac->eia', self.weights, self.kirchhoff_stresses[:, :, :2, :], basis,
+            self.shape_function_derivatives)
+        if not stiffness:
+            self.stiffness_matrices = None
+            return
+        tangent_moduli = self.constitutive_model.tangent_moduli_array(first_lame_parameters, shear_moduli,
+                                                                      deformation_gradients)
+        tangent_moduli_contravariant = contravariant_tangent_moduli(
+            lab_tangent_moduli(deformation_gradients, first_piola_kirchhoff_stresses, tangent_moduli),
+            numpy.broadcast_to(self.reference_basis_contravariant[:, None], basis.shape))
+        tangent_moduli_effective_2d = (
+            tangent_moduli_contravariant[..., :2, :2, :2, :2]
+            - tangent_moduli_contravariant[..., :2, :2, 2, 2][..., None, None]
+            * tangent_moduli_contravariant[..., 2, 2, :2, :2][..., None, None, :, :]
+            / tangent_moduli_contravariant[..., 2, 2, 2, 2][..., None, None, None, None])
+        material_integrand = 2 * numpy.einsum('eqABCD,eqBi,eqDk->eqAiCk', tangent_moduli_effective_2d,
+                                              midsurface_basis, midsurface_basis)
+        stiffness_matrices = numpy.einsum('q,eqAiCk,qaA,qbC->eiakb', self.weights, material_integrand,
+                                          self.shape_function_derivatives, self.shape_function_derivatives)
+        # The geometric term is summed over the unused fourth coordinate index in the element class
+        geometric_integrand = .5 * self.element_type.dimension * numpy.einsum(
+            'q,eqAC,qaA,qbC->eab', self.weights, self.kirchhoff_stresses[:, :, :2, :2],
+            self.shape_function_derivatives, self.shape_function_derivatives)
+        stiffness_matrices += geometric_integrand[:, None, :, None, :] * numpy.eye(3)[None, :, None, :, None]
+        self.stiffness_matrices = scale[:, None, None, None, None] * stiffness_matrices
+
+    def enforce_plane_stress(self, in_plane_deformation_gradients, transverse_deformation_gradients, normals,
+                             max_iterations, raise_errors=True):
+        """Solve for the thickness stretch ratio of every quadrature point that makes the transverse Kirchhoff stress
+        zero with Newton's method, starting from the saved stretch ratios. Each quadrature point stops iterating once it
+        converges, exactly as in QuadraturePoint.enforce_plane_stress. Return the stretch ratios and whether each
+        quadrature point converged.
+
+        :param numpy.ndarray in_plane_deformation_gradients: deformation gradients without the transverse part
+        :param numpy.ndarray transverse_deformation_gradients: outer products of the current and reference normals
+        :param numpy.ndarray normals: current unit normals of the midsurface
+        :param int max_iterations: max iterations before assuming the solution has diverged
+        :param bool raise_errors: whether to raise an error if a quadrature point has not converged after the max
+        iterations, instead of returning it as not converged
+        """
+        stretch_ratios = self.stretch_ratios.copy()
+        iterations = numpy.zeros(stretch_ratios.shape, dtype=int)
+        reference_normals = self.reference_basis_contravariant[:, 2]
+        first_lame_parameters = numpy.broadcast_to(self.first_lame_parameters[:, None], stretch_ratios.shape)
+        shear_moduli = numpy.broadcast_to(self.shear_moduli[:, None], stretch_ratios.shape)
+        # The tolerance follows the stiffness of the material, which sets the round-off error of the stress
+        tolerances = numpy.maximum(constants.NEWTON_METHOD_TOLERANCE, constants.PLANE_STRESS_RELATIVE_TOLERANCE * (
+            first_lame_parameters + 2 * shear_moduli))
+        converged = numpy.ones(stretch_ratios.shape, dtype=bool)
+        current_iteration = 0
+        while True:
+            deformation_gradients = (in_plane_deformation_gradients
+                                     + stretch_ratios[:, :, None, None] * transverse_deformation_gradients)
+            first_piola_kirchhoff_stresses = self.constitutive_model.first_piola_kirchhoff_stress_array(
+                first_lame_parameters, shear_moduli, deformation_gradients)
+            kirchhoff_stresses_33 = numpy.einsum('eqi,eqij,ej->eq', normals, first_piola_kirchhoff_stresses,
+                                                 reference_normals) / stretch_ratios
+            # Check if kirchhoff stress is within tolerance of 0
+            errors = numpy.abs(kirchhoff_stresses_33)
+            active = errors >= tolerances
+            if not active.any():
+                break
+            # Compute C^3333 for the quadrature points that have not converged
+            element_indices = numpy.nonzero(active)[0]
+            tangent_moduli = self.constitutive_model.tangent_moduli_array(
+                first_lame_parameters[active], shear_moduli[active], deformation_gradients[active])
+            tangent_moduli_lab = lab_tangent_moduli(deformation_gradients[active],
+                                                    first_piola_kirchhoff_stresses[active], tangent_moduli)
+            tangent_moduli_contravariant_3333 = contravariant_tangent_moduli(
+                tangent_moduli_lab, reference_normals[element_indices][:, None, :])[:, 0, 0, 0, 0]
+            delta_stretch = - kirchhoff_stresses_33[active] / (2 * stretch_ratios[active]
+                                                               * tangent_moduli_contravariant_3333)
+            stretch_ratios[active] += delta_stretch
+            iterations[active] += 1
+            # If there is a negative (unphysical) stretch ratio, adjust it to be a very small positive value
+            stretch_ratios[stretch_ratios < 0] = 1e-6
+            # If the loop has reached the max number of iterations, raise an error or stop the remaining points
+            if current_iteration == max_iterations:
+                if raise_errors:
+                    raise exceptions.NewtonMethodMaxIterationsExceededError(iterations=max_iterations,
+                                                                            error=errors.max(),
+                                                                            tolerance=tolerances.max())
+                converged = ~active
+                break
+            current_iteration += 1
+        # Save the stretch ratios as an initial guess for next time
+        self.stretch_ratios[...] = stretch_ratios
+        self.plane_stress_iterations[...] = iterations
+        return stretch_ratios, converged
+
+
+def assemble_force_array(element_force_arrays, element_dof_indices, global_dof_quantity):
+    """Assemble the unrolled global force array from the element force arrays. The contributions are added in element
+    order, so the result does not depend on how the elements were evaluated.
+
+    :param numpy.ndarray element_force_arrays: force array of each element, shaped (element, dof, node)
+    :param numpy.ndarray element_dof_indices: global degree of freedom index of each entry of the element force arrays
+    :param int global_dof_quantity: number of global degrees of freedom
+    """
+    return numpy.bincount(element_dof_indices.ravel(), weights=element_force_arrays.ravel(),
+                          minlength=global_dof_quantity)
+
+
+def assemble_stiffness_matrix(element_stiffness_matrices, element_dof_indices, global_dof_quantity):
+    """Assemble the unrolled global stiffness matrix from the element stiffness matrices. The contributions are added
+    in element order, so the result does not depend on how the elements were evaluated.
+
+    :param numpy.ndarray element_stiffness_matrices: stiffness matrix of each element, shaped
+    (element, dof, node, dof, node)
+    :param numpy.ndarray element_dof_indices: global degree of freedom index of each entry of the element force arrays
+    :param int global_dof_quantity: number of global degrees of freedom
+    """
+    element_dof_indices = element_dof_indices.reshape(len(element_dof_indices), -1)
+    matrix_indices = element_dof_indices[:, :, None] * global_dof_quantity + element_dof_indices[:, None, :]
+    return numpy.bincount(matrix_indices.ravel(), weights=element_stiffness_matrices.ravel(),
+                          minlength=global_dof_quantity ** 2).reshape(global_dof_quantity, global_dof_quantity)
+
+
+def contravariant_tangent_moduli(tangent_moduli_lab, basis_contravariant):
+    """Contract each index of the lab frame tangent moduli with the contravariant basis vectors, C^ijkl.
+
+    :param numpy.ndarray tangent_moduli_lab: lab frame tangent moduli C_IJKL, shaped (..., 3, 3, 3, 3)
+    :param numpy.ndarray basis_contravariant: contravariant basis vectors as rows, shaped (..., basis, 3)
+    """
+    result = numpy.einsum('...IJKL,...lL->...IJKl', tangent_moduli_lab, basis_contravariant)
+    result = numpy.einsum('...IJKl,...kK->...IJkl', result, basis_contravariant)
+    result = numpy.einsum('...IJkl,...jJ->...Ijkl', result, basis_contravariant)
+    return numpy.einsum('...Ijkl,...iI->...ijkl', result, basis_contravariant)
+
+
+def lab_tangent_moduli(deformation_gradients, first_piola_kirchhoff_stresses, tangent_moduli):
+    """Compute the lab frame tangent moduli C_IJKL from the tangent moduli C_iJkL, as in
+    Neohookean.tangent_moduli_contravariant.
+
+    :param numpy.ndarray deformation_gradients: deformation gradients, shaped (..., 3, 3)
+    :param numpy.ndarray first_piola_kirchhoff_stresses: first Piola-Kirchhoff stresses, shaped (..., 3, 3)
+    :param numpy.ndarray tangent_moduli: tangent moduli C_iJkL, shaped (..., 3, 3, 3, 3)
+    """
+    deformation_gradient_inverses = numpy.linalg.inv(deformation_gradients)
+    second_piola_kirchhoff_stresses = numpy.matmul(deformation_gradient_inverses, first_piola_kirchhoff_stresses)
+    result = numpy.einsum('...Ii,...iJkL->...IJkL', deformation_gradient_inverses, tangent_moduli)
+    result = numpy.einsum('...Kk,...IJkL->...IJKL', deformation_gradient_inverses, result)
+    inverse_products = numpy.matmul(deformation_gradient_inverses,
+                                    numpy.swapaxes(deformation_gradient_inverses, -1, -2))
+    result -= inverse_products[..., :, None, :, None] * second_piola_kirchhoff_stresses[..., None, :, None, :]
+    return .5 * result
+
+
+def sparse_pattern(element_dof_indices, global_dof_quantity):
+    """Return the compressed sparse row pattern of the unrolled global stiffness matrix (row pointers and column
+    indices), and the index in the sparse data array of every entry of the element stiffness matrices, shaped
+    (element, entry).
+
+    :param numpy.ndarray element_dof_indices: global degree of freedom index of each entry of the element force arrays
+    :param int global_dof_quantity: number of global degrees of freedom
+    """
+    element_dof_indices = element_dof_indices.reshape(len(element_dof_indices), -1)
+    element_dof_quantity = element_dof_indices.shape[1]
+    # Unrolled matrix index of every entry of the element stiffness matrices
+    rows = numpy.repeat(element_dof_indices, element_dof_quantity, axis=1)
+    columns = numpy.tile(element_dof_indices, (1, element_dof_quantity))
+    matrix_indices = rows * global_dof_quantity + columns
+    # Each distinct matrix index is one entry of the data array, in row major order
+    nonzero_indices, data_indices = numpy.unique(matrix_indices.ravel(), return_inverse=True)
+    row_pointers = numpy.searchsorted(nonzero_indices // global_dof_quantity, numpy.arange(global_dof_quantity + 1))
+    column_indices = nonzero_indices % global_dof_quantity
+    return row_pointers, column_indices, data_indices.reshape(matrix_indices.shape)
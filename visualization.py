@@ -0,0 +1,107 @@
+"""
+visualization.py contains the visualization sinks, which render the deformation of the membrane during an analysis
+without slowing down the solver.
+
+A sink is given to the model as its visualization_sink, and the model gives it every configuration it would plot. The
+frame sink keeps one frame of every few configurations, copies the node positions of the frame, and streams them to
+a render process through a bounded queue. The render process draws each frame with matplotlib and saves it as an image
+file. The solver never waits for the renderer: when the queue is full, the frame is dropped.
+
+.. moduleauthor:: Tyler Ryan <tyler.ryan@engineering.ucla.edu>
+"""
+import multiprocessing
+import os
+import queue
+
+import numpy
+
+import constants
+
+
+def render_frames(frames, directory, connectivity_table, image_format):
+    """Render the frames from a queue to image files until None is received. Runs in the render process.
+
+    :param frames: multiprocessing.Queue of the frame index, load, and node positions of each frame
+    :param str directory: directory of the image files
+    :param numpy.ndarray connectivity_table: corner node IDs of each element
+    :param str image_format: file extension of the image format, such as 'png'
+    """
+    # The render process has no display
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    figure = plt.figure()
+    while True:
+        frame = frames.get()
+        if frame is None:
+            break
+        frame_index, load, node_positions = frame
+        figure.clear()
+        ax = figure.add_subplot(projection='3d')
+        ax.plot_trisurf(node_positions[:, 0], node_positions[:, 1], node_positions[:, 2],
+                        triangles=connectivity_table, alpha=.5)
+        ax.set_title('Load: ' + format(load, '.6g'))
+        figure.savefig(os.path.join(directory, 'frame_' + format(frame_index, '05d') + '.' + image_format))
+    plt.close(figure)
+
+
+class FrameSink:
+    """Visualization sink that renders every decimation-th configuration of a model to an image file in a separate
+    process.
+
+    :param str directory: directory of the image files, which is created if it does not exist
+    :param int decimation: number of configurations per rendered frame
+    :param str image_format: file extension of the image format, such as 'png'
+    :ivar int frame_quantity: number of frames sent to the render process
+    :ivar int dropped_frame_quantity: number of frames dropped because the render process was behind
+    """
+
+    def __init__(self, directory, decimation=constants.FRAME_DECIMATION, image_format='png'):
+        self.directory = directory
+        self.decimation = decimation
+        self.image_format = image_format
+        os.makedirs(directory, exist_ok=True)
+        self.frames = None
+        self.process = None
+        self.configuration_quantity = 0
+        self.frame_quantity = 0
+        self.dropped_frame_quantity = 0
+
+    def close(self):
+        """Wait for the render process to render the queued frames, and stop it."""
+        if self.process is None:
+            return
+        self.frames.put(None)
+        self.process.join()
+        self.frames.close()
+        self.process = None
+        self.frames = None
+
+    def start(self, model):
+        """Start the render process for the mesh of a model.
+
+        :param model: model.Model whose configurations are rendered
+        """
+        self.frames = multiprocessing.Queue(maxsize=constants.FRAME_QUEUE_SIZE)
+        self.process = multiprocessing.Process(target=render_frames,
+                                               args=(self.frames, self.directory,
+                                                     numpy.asarray(model.connectivity_table), self.image_format),
+                                               daemon=True)
+        self.process.start()
+
+    def update(self, model):
+        """Send the current configuration of a model to the render process if it is a frame.
+
+        :param model: model.Model in the configuration to render
+        """
+        self.configuration_quantity += 1
+        if (self.configuration_quantity - 1) % self.decimation != 0:
+            return
+        if self.process is None:
+            self.start(model)
+        load = float(model.load_steps[-1]) if model.load_steps else 0.
+        try:
+            self.frames.put_nowait((self.frame_quantity, load, model.current_node_positions()))
+            self.frame_quantity += 1
+        except queue.Full:
+            self.dropped_frame_quantity += 1